@@ -0,0 +1,4 @@
+"""
+Having a conftest.py file in the root of the repo makes pytest add the
+root to sys.path, so the tests can import taxdata and pipeline.py.
+"""
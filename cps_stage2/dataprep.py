@@ -10,6 +10,10 @@ def dataprep(data, factors, targets, year, weights=None):
     factors: growth factors
     targets: aggregate targets
     year: year LP is being solved for
+
+    Returns
+    -------
+    A1 and A2, the coefficient matrices for r and s, and b, the targets
     """
 
     def target(target_val, pop, factor, value):
@@ -227,5 +231,4 @@ def dataprep(data, factors, targets, year, weights=None):
     A1 = np.array(one_half_lhs)
     A2 = np.array(-one_half_lhs)
 
-    # save arrays as .npz files
-    np.savez(str(str(year) + "_input.npz"), A1=A1, A2=A2, b=b)
+    return A1, A2, b
@@ -1,5 +1,6 @@
-import subprocess
 from taxdata import cps
+from taxdata.cps.create import CPS_FILES
+from taxdata.datafiles import write_data
 from pathlib import Path
 
 CUR_PATH = Path(__file__).resolve().parent
@@ -8,20 +9,19 @@ DATA_PATH = Path(CUR_PATH, "data")
 raw_cps = cps.create(
     datapath=DATA_PATH,
     exportcsv=False,
-    exportpkl=True,
+    exportcache=True,
     exportraw=False,
     validate=False,
     benefits=True,
     verbose=True,
+    # convert each of the default CPS files in its own process
+    workers=len(CPS_FILES),
+    exportfactors=True,
 )
 print("Exporting raw file")
-raw_output_path = Path(DATA_PATH, "cps_raw.csv")
-raw_cps.to_csv(raw_output_path)
-subprocess.check_call(["gzip", "-nf", str(raw_output_path)])
+write_data(raw_cps, Path(DATA_PATH, "cps_raw.csv.gz"))
 # clean up and export final file
 print("Cleaning file")
 final_cps = cps.finalprep(raw_cps)
-final_output_path = Path(DATA_PATH, "cps.csv")
-final_cps.to_csv(final_output_path, index=False)
-subprocess.check_call(["gzip", "-nf", str(final_output_path)])
+write_data(final_cps, Path(DATA_PATH, "cps.csv.gz"), index=False)
 print("Done!")
@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
-from taxdata import cps, puf
+from taxdata import cps, puf, features
 from taxdata.matching import statmatch
+from taxdata.datafiles import write_data
 from pathlib import Path
 
 CUR_PATH = Path(__file__).resolve().parent
@@ -45,29 +46,32 @@ CAP_VARS = ["e00300", "e00400", "e00600"]
 
 def dataprep(data):
     """
-    Prep data for matching
+    Prep data for matching. The variables the data is partitioned on are
+    added to `data` and the regressors are returned in a feature store
     """
     # we use a slightly modified version of mars for matching.
     # _mars = 1 if single, 3 if HoH, 2 any type of joint filer
     data["_mars"] = np.where(
         data["mars"] == 1, 1, np.where(data["mars"] == 4, 3, 2)
     )
-    data["const"] = 1
-    data["bil"] = np.maximum(0, data["e00900"])
-    data["fil"] = np.maximum(0, data["e02100"])
-    data["tpi"] = data[INC_VARS].sum(axis=1)
-    data["wage_share"] = np.divide(
-        data["e00200"],
-        data["tpi"],
+    bil = np.maximum(0, data["e00900"])
+    fil = np.maximum(0, data["e02100"])
+    other_inc = [var for var in INC_VARS if var not in ["bil", "fil"]]
+    tpi = (data[other_inc].sum(axis=1) + bil + fil).to_numpy()
+    cap_inc = data[CAP_VARS].sum(axis=1).to_numpy()
+    _features = {var: data[var] for var in REG_VARS if var in data}
+    _features["const"] = 1
+    _features["wage_share"] = np.divide(
+        data["e00200"].to_numpy(dtype=float),
+        tpi,
         out=np.zeros(data.shape[0]),
-        where=data["tpi"] != 0,
+        where=tpi != 0,
     )
-    data["cap_inc"] = data[CAP_VARS].sum(axis=1)
-    data["cap_share"] = np.divide(
-        data["cap_inc"],
-        data["tpi"],
+    _features["cap_share"] = np.divide(
+        cap_inc,
+        tpi,
         out=np.zeros(data.shape[0]),
-        where=data["tpi"] != 0,
+        where=tpi != 0,
     )
     data["_depne"] = np.where(
         data["dsi"] == 0,
@@ -88,22 +92,29 @@ def dataprep(data):
         int
     )
     # income source flags
-    data["se1"] = np.where(wage_flag & ~se_flag, 1, 0)
-    data["se2"] = np.where(~wage_flag & se_flag, 1, 0)
-    data["se3"] = np.where(wage_flag & se_flag, 1, 0)
+    _features["se1"] = np.where(wage_flag & ~se_flag, 1, 0)
+    _features["se2"] = np.where(~wage_flag & se_flag, 1, 0)
+    _features["se3"] = np.where(wage_flag & se_flag, 1, 0)
     data["_depne"] = np.where(
         np.logical_and(data["mars"] == 3, data["_depne"] == 0),
         1,
         data["_depne"],
     )
 
-    return data
+    store = features.build(
+        {var: _features[var] for var in REG_VARS}, len(data)
+    )
+    return data, store
 
 
 # create CPS tax units
 print("Creating CPS tax units")
 raw_cps = cps.create(
-    DATA_PATH, exportpkl=True, cps_files=[CPS_YEAR], benefits=False
+    DATA_PATH,
+    exportcache=True,
+    cps_files=[CPS_YEAR],
+    benefits=False,
+    exportfactors=False,
 )
 # minor PUF prep
 print("Prepping PUF")
@@ -130,8 +141,8 @@ non_cash = 1.0 - cash
 raw_cps["e19800"] = raw_cps["charitable"] * cash
 raw_cps["e20100"] = raw_cps["charitable"] * non_cash
 
-raw_cps = dataprep(raw_cps)
-raw_puf = dataprep(raw_puf)
+raw_cps, cps_features = dataprep(raw_cps)
+raw_puf, puf_features = dataprep(raw_puf)
 raw_cps["recid"] = range(1, len(raw_cps.index) + 1)
 raw_cps["agerange"] = 0
 raw_cps["eic"] = np.minimum(3, raw_cps["eic"])
@@ -152,7 +163,9 @@ raw_cps.drop(
 raw_cps.to_csv(Path(DATA_PATH, "tu16.csv"), index=False)
 
 # split CPS into filers and non-filers
-filers = raw_cps[raw_cps["filer"] == 1].copy()
+is_filer = (raw_cps["filer"] == 1).to_numpy()
+filers = raw_cps[is_filer].copy()
+filer_features = cps_features.take(np.flatnonzero(is_filer))
 nonfilers = raw_cps[raw_cps["filer"] == 0].copy()
 
 print("Begining statistical match")
@@ -167,6 +180,8 @@ match_index = statmatch.match(
     "e04800",
     REG_VARS,
     PARTITION_VARS,
+    recipient_features=puf_features,
+    donor_features=filer_features,
 )
 
 # merge all the data together
@@ -192,9 +207,9 @@ data = pd.concat([data, nonfilers], sort=False, ignore_index=True)
 data = data.fillna(0.0)
 data.reset_index(inplace=True)
 print("Exporting raw data")
-data.to_csv(Path(DATA_PATH, "cps-matched-puf.csv"), index=False)
+write_data(data, Path(DATA_PATH, "cps-matched-puf.csv"), index=False)
 print("Cleaning data")
 data = puf.finalprep(data)
 print("Exporting data")
-data.to_csv(Path(DATA_PATH, "puf.csv"), index=False)
+write_data(data, Path(DATA_PATH, "puf.csv"), index=False)
 print("Done!")
@@ -4,6 +4,7 @@ after updates
 """
 
 # flake8: noqa: E501
+import sys
 import argparse
 import pandas as pd
 import taxcalc as tc
@@ -29,6 +30,9 @@ from collections import defaultdict
 from requests_html import HTMLSession
 
 CUR_PATH = Path(__file__).resolve().parent
+sys.path.append(str(Path(CUR_PATH, "..")))
+from taxdata.datafiles import read_data  # noqa: E402
+
 STAGE1_PATH = Path(CUR_PATH, "..", "puf_stage1")
 CBO_PATH = Path(STAGE1_PATH, "CBO_baseline.csv")
 SOI_PATH = Path(STAGE1_PATH, "SOI_estimates.csv")
@@ -212,12 +216,9 @@ def report():
     base_cps.advance_to_year(first_year)
     base_cps.calc_all()
     # updated CPS calculator
-    cps = pd.read_csv(
-        Path(CUR_PATH, "..", "data", "cps.csv.gz"), index_col=None
-    )
-    cps_weights = pd.read_csv(
-        Path(CUR_PATH, "..", "cps_stage2", "cps_weights.csv.gz"),
-        index_col=None,
+    cps = read_data(Path(CUR_PATH, "..", "data", "cps.csv.gz"))
+    cps_weights = read_data(
+        Path(CUR_PATH, "..", "cps_stage2", "cps_weights.csv.gz")
     )
     gfactor_path_str = str(GROW_FACTORS_PATH)
     gft = tc.GrowFactors(growfactors_filename=gfactor_path_str)
@@ -245,12 +246,9 @@ def report():
     base_cps.advance_to_year(first_year)
     base_cps.calc_all()
     # updated CPS calculator
-    cps = pd.read_csv(
-        Path(CUR_PATH, "..", "data", "cps.csv.gz"), index_col=None
-    )
-    cps_weights = pd.read_csv(
-        Path(CUR_PATH, "..", "cps_stage2", "cps_weights.csv.gz"),
-        index_col=None,
+    cps = read_data(Path(CUR_PATH, "..", "data", "cps.csv.gz"))
+    cps_weights = read_data(
+        Path(CUR_PATH, "..", "cps_stage2", "cps_weights.csv.gz")
     )
     gfactor_path_str = str(GROW_FACTORS_PATH)
     gft = tc.GrowFactors(growfactors_filename=gfactor_path_str)
@@ -278,15 +276,14 @@ def report():
         base_puf.advance_to_year(first_year)
         base_puf.calc_all()
         # updated puf calculator
-        puf_weights = pd.read_csv(
-            Path(CUR_PATH, "..", "puf_stage2", "puf_weights.csv.gz"),
-            index_col=None,
+        puf_weights = read_data(
+            Path(CUR_PATH, "..", "puf_stage2", "puf_weights.csv.gz")
         )
         puf_ratios = pd.read_csv(
             Path(CUR_PATH, "..", "puf_stage3", "puf_ratios.csv"), index_col=0
         ).transpose()
         new_records = tc.Records(
-            data=str(PUF_PATH),
+            data=read_data(PUF_PATH),
             weights=puf_weights,
             adjust_ratios=puf_ratios,
             gfactors=gft,
@@ -305,15 +302,14 @@ def report():
         base_puf.advance_to_year(first_year)
         base_puf.calc_all()
         # updated puf calculator
-        puf_weights = pd.read_csv(
-            Path(CUR_PATH, "..", "puf_stage2", "puf_weights.csv.gz"),
-            index_col=None,
+        puf_weights = read_data(
+            Path(CUR_PATH, "..", "puf_stage2", "puf_weights.csv.gz")
         )
         puf_ratios = pd.read_csv(
             Path(CUR_PATH, "..", "puf_stage3", "puf_ratios.csv"), index_col=0
         ).transpose()
         new_records = tc.Records(
-            data=str(PUF_PATH),
+            data=read_data(PUF_PATH),
             weights=puf_weights,
             adjust_ratios=puf_ratios,
             gfactors=gft,
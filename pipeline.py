@@ -0,0 +1,398 @@
+"""
+Run the scripts that build the taxdata files.
+
+Each stage is a function that declares the files it reads and the files it
+writes. The order stages run in is found from those files, and stages that
+don't depend on each other, like the PUF and CPS stages, run in parallel.
+A stage is skipped when the hashes of its inputs and outputs match the ones
+recorded in pipeline_hashes.json after it last ran, so touching a file,
+e.g. with `git checkout`, doesn't cause it to run again.
+
+USAGE: python pipeline.py [TARGET ...] [--force] [--dry-run] [--workers N]
+TARGET is a stage name, puf-files, cps-files, or all (the default)
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from typing import NamedTuple, Callable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from taxdata.hashing import file_hashes
+
+CUR_PATH = Path(__file__).resolve().parent
+STATE_PATH = Path(CUR_PATH, "pipeline_hashes.json")
+
+
+class Stage(NamedTuple):
+    """
+    name: name of the stage
+    func: function that runs the stage
+    inputs: files, or glob patterns, relative to the repo the stage reads
+    outputs: files relative to the repo the stage writes
+    """
+
+    name: str
+    func: Callable
+    inputs: list
+    outputs: list
+
+
+STAGES = {}
+
+
+def stage(inputs, outputs):
+    """
+    Register the decorated function as a stage
+    """
+
+    def decorator(func):
+        STAGES[func.__name__] = Stage(func.__name__, func, inputs, outputs)
+        return func
+
+    return decorator
+
+
+def run_script(script):
+    """
+    Run a python script from its own directory
+    """
+    script = Path(CUR_PATH, script)
+    subprocess.check_call([sys.executable, script.name], cwd=script.parent)
+
+
+@stage(
+    inputs=[
+        "createpuf.py",
+        "data/puf2011.csv",
+        "taxdata/*.py",
+        "taxdata/puf/*.py",
+        "taxdata/puf/*.csv",
+        "taxdata/matching/*.py",
+        "taxdata/cps/*.py",
+        "taxdata/cps/adjustment_targets.csv",
+        "taxdata/cps/*.json",
+        "taxdata/cps/*.pkl",
+        "taxdata/cps/data/*.csv",
+        "data/asec*.dat",
+        # files in the artifact store are saved under their hash, so the
+        # hashes in refs.json cover them
+        "data/artifacts/refs.json",
+    ],
+    outputs=[
+        "data/cps-matched-puf.csv",
+        "data/cps-matched-puf.parquet",
+        "data/puf.csv",
+        "data/puf.parquet",
+    ],
+)
+def createpuf():
+    run_script("createpuf.py")
+
+
+@stage(
+    inputs=[
+        "puf_stage1/stage1.py",
+        "puf_stage1/CBO_baseline.csv",
+        "puf_stage1/IRS_return_projection.csv",
+        "puf_stage1/NC-EST2014-AGESEX-RES.csv",
+        "puf_stage1/NP2014_D1.csv",
+        "puf_stage1/SOI_estimates.csv",
+        "puf_stage1/US-EST00INT-ALLDATA.csv",
+        "taxdata/cps/benefitprograms.csv",
+    ],
+    outputs=[
+        "puf_stage1/Stage_I_factors.csv",
+        "puf_stage1/Stage_II_targets.csv",
+    ],
+)
+def puf_stage1():
+    run_script("puf_stage1/stage1.py")
+
+
+@stage(
+    inputs=[
+        "puf_stage1/factors_finalprep.py",
+        "puf_stage1/Stage_I_factors.csv",
+        "puf_stage1/benefit_growth_rates.csv",
+    ],
+    outputs=["puf_stage1/growfactors.csv"],
+)
+def growfactors():
+    run_script("puf_stage1/factors_finalprep.py")
+
+
+@stage(
+    inputs=[
+        "puf_stage2/stage2.py",
+        "puf_stage2/dataprep.py",
+        "puf_stage2/solver.jl",
+        "taxdata/lpcache.py",
+        "Project.toml",
+        "Manifest.toml",
+        "data/cps-matched-puf.csv",
+        "data/cps-matched-puf.parquet",
+        "puf_stage1/Stage_I_factors.csv",
+        "puf_stage1/Stage_II_targets.csv",
+        "taxdata/datafiles.py",
+    ],
+    outputs=[
+        "puf_stage2/puf_weights.csv.gz",
+        "puf_stage2/puf_weights.parquet",
+    ],
+)
+def puf_stage2():
+    run_script("puf_stage2/stage2.py")
+
+
+@stage(
+    inputs=[
+        "puf_stage3/stage3.py",
+        "puf_stage3/stage3_targets.csv",
+        "data/cps-matched-puf.csv",
+        "data/cps-matched-puf.parquet",
+        "puf_stage1/growfactors.csv",
+        "puf_stage2/puf_weights.csv.gz",
+        "puf_stage2/puf_weights.parquet",
+        "taxdata/datafiles.py",
+    ],
+    outputs=["puf_stage3/puf_ratios.csv"],
+)
+def puf_stage3():
+    run_script("puf_stage3/stage3.py")
+
+
+@stage(
+    inputs=[
+        "createcps.py",
+        "taxdata/*.py",
+        "taxdata/cps/*.py",
+        "taxdata/cps/adjustment_targets.csv",
+        "taxdata/cps/*.json",
+        "taxdata/cps/*.pkl",
+        "taxdata/cps/data/*.csv",
+        "data/asec*.dat",
+        # files in the artifact store are saved under their hash, so the
+        # hashes in refs.json cover them
+        "data/artifacts/refs.json",
+    ],
+    outputs=[
+        "data/cps_raw.csv.gz",
+        "data/cps_raw.parquet",
+        "data/cps.csv.gz",
+        "data/cps.parquet",
+        "taxdata/cps/state_factors.csv",
+    ],
+)
+def createcps():
+    run_script("createcps.py")
+
+
+@stage(
+    inputs=[
+        "cps_stage1/stage1.py",
+        "cps_stage1/SOI_estimates.csv",
+        "puf_stage1/Stage_I_factors.csv",
+        "puf_stage1/Stage_II_targets.csv",
+    ],
+    outputs=["cps_stage1/stage_2_targets.csv"],
+)
+def cps_stage1():
+    run_script("cps_stage1/stage1.py")
+
+
+@stage(
+    inputs=[
+        "cps_stage2/stage2.py",
+        "cps_stage2/dataprep.py",
+        "cps_stage2/solver.jl",
+        "taxdata/lpcache.py",
+        "Project.toml",
+        "Manifest.toml",
+        "data/cps_raw.csv.gz",
+        "data/cps_raw.parquet",
+        "puf_stage1/Stage_I_factors.csv",
+        "cps_stage1/stage_2_targets.csv",
+        "taxdata/datafiles.py",
+    ],
+    outputs=[
+        "cps_stage2/cps_weights.csv.gz",
+        "cps_stage2/cps_weights.parquet",
+    ],
+)
+def cps_stage2():
+    run_script("cps_stage2/stage2.py")
+
+
+TARGETS = {
+    "puf-files": ["createpuf", "growfactors", "puf_stage2", "puf_stage3"],
+    "cps-files": ["createcps", "cps_stage1", "cps_stage2"],
+}
+TARGETS["all"] = TARGETS["puf-files"] + TARGETS["cps-files"]
+
+
+def expand(patterns):
+    """
+    Paths, relative to the repo, of all files matching `patterns`. Patterns
+    that don't match any files are returned as they are
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(CUR_PATH.glob(pattern))
+        if matches:
+            paths += [str(p.relative_to(CUR_PATH)) for p in matches]
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def hashes(files):
+    """
+    Hash each file. Files that don't exist have a hash of None
+    """
+    paths = {_file: Path(CUR_PATH, _file) for _file in files}
+    found = file_hashes(
+        [path for path in paths.values() if path.exists()], workers=4
+    )
+    return {_file: found.get(path) for _file, path in paths.items()}
+
+
+def dependencies(stages):
+    """
+    Map each stage to the stages that write one of its inputs
+    """
+    writers = {}
+    for _stage in stages.values():
+        for output in _stage.outputs:
+            writers[output] = _stage.name
+    deps = {}
+    for _stage in stages.values():
+        deps[_stage.name] = {
+            writers[_input]
+            for _input in expand(_stage.inputs)
+            if _input in writers and writers[_input] != _stage.name
+        }
+    return deps
+
+
+def required(targets, deps):
+    """
+    All of the stages needed to build `targets`, including the targets
+    """
+    needed = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo += deps[name]
+    return needed
+
+
+def is_current(_stage, state):
+    """
+    True if the stage's inputs and outputs haven't changed since it last ran
+    """
+    if _stage.name not in state:
+        return False
+    recorded = state[_stage.name]
+    return (
+        recorded["inputs"] == hashes(expand(_stage.inputs))
+        and recorded["outputs"] == hashes(_stage.outputs)
+        and None not in recorded["outputs"].values()
+    )
+
+
+def run(targets=("all",), force=False, dry_run=False, workers=2):
+    """
+    Run every stage needed to build `targets`
+
+    Parameters
+    ----------
+    targets: stage names or names in TARGETS
+    force: if True, run stages even if their files haven't changed
+    dry_run: if True, print the stages that would run without running them
+    workers: maximum number of stages run at the same time
+    """
+    names = []
+    for target in targets:
+        if target not in TARGETS and target not in STAGES:
+            raise KeyError(f"{target} is not a stage or target")
+        names += TARGETS.get(target, [target])
+    deps = dependencies(STAGES)
+    pending = required(names, deps)
+    state = json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+    # stages that ran, or would run, this time
+    changed = set()
+    finished = set()
+    running = {}
+    failed = []
+
+    def start(_stage):
+        # in a dry run, stages after one that would run can't be checked
+        upstream = dry_run and deps[_stage.name] & changed
+        if force or upstream or not is_current(_stage, state):
+            changed.add(_stage.name)
+            if dry_run:
+                print(f"Would run {_stage.name}")
+                return None
+            print(f"Running {_stage.name}")
+            return executor.submit(_stage.func)
+        print(f"Skipping {_stage.name}")
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            ready = sorted(
+                name
+                for name in pending
+                if deps[name] & pending.union(running) == set() and not failed
+            )
+            for name in ready:
+                pending.remove(name)
+                future = start(STAGES[name])
+                if future is None:
+                    finished.add(name)
+                else:
+                    running[name] = future
+            if not running:
+                if failed or not ready:
+                    break
+                continue
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name, future in list(running.items()):
+                if future not in done:
+                    continue
+                del running[name]
+                if future.exception() is not None:
+                    print(f"{name} failed: {future.exception()}")
+                    failed.append(name)
+                    continue
+                finished.add(name)
+                _stage = STAGES[name]
+                state[name] = {
+                    "inputs": hashes(expand(_stage.inputs)),
+                    "outputs": hashes(_stage.outputs),
+                }
+                STATE_PATH.write_text(json.dumps(state, indent=4))
+    if failed:
+        raise RuntimeError(f"Stages failed: {', '.join(failed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the taxdata files")
+    parser.add_argument("targets", nargs="*", default=["all"])
+    parser.add_argument(
+        "--force", action="store_true", help="run stages even if unchanged"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only list stages that run"
+    )
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    run(args.targets, args.force, args.dry_run, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
+import sys
 import copy
 import numpy as np
 import pandas as pd
 
 CUR_PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.join(CUR_PATH, ".."))
+from taxdata.datafiles import read_data  # noqa: E402
+
 start_year = 2011
 end_year = 2036
 
@@ -135,11 +139,11 @@ def adjustment(agi, var, var_name, target, weights, blowup):
 
 
 # Read all necessary files
-puf = pd.read_csv(os.path.join(CUR_PATH, "../data/cps-matched-puf.csv"))
+puf = read_data(os.path.join(CUR_PATH, "../data/cps-matched-puf.csv"))
 targets = pd.read_csv(
     os.path.join(CUR_PATH, "stage3_targets.csv"), index_col=0
 )
-wght = pd.read_csv(os.path.join(CUR_PATH, "../puf_stage2/puf_weights.csv.gz"))
+wght = read_data(os.path.join(CUR_PATH, "../puf_stage2/puf_weights.csv.gz"))
 bf = pd.read_csv(
     os.path.join(CUR_PATH, "../puf_stage1/growfactors.csv"), index_col=0
 )
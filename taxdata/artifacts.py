@@ -0,0 +1,171 @@
+"""
+Local store for the external files used to build taxdata.
+
+Every file taxdata downloads is registered in ARTIFACTS. `resolve` returns
+the path to a verified copy of the file in the artifact store, downloading
+it only when the store doesn't have it. Files are saved under their SHA-256
+hash and `refs.json` records the hash each name points to. Registered
+files with a `sha256` must match it; the others are pinned to the hash of
+the first copy added to the store.
+
+Setting the TAXDATA_OFFLINE environment variable prevents any downloads.
+Files can be added to the store by hand with
+
+    python -m taxdata.artifacts add NAME PATH
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from .hashing import file_hash, file_lock
+
+CUR_PATH = Path(__file__).resolve().parent
+STORE_PATH = Path(
+    os.environ.get("TAXDATA_STORE", Path(CUR_PATH, "..", "data", "artifacts"))
+)
+# External files used by taxdata
+ARTIFACTS = {
+    **{
+        f"cpsmar{year}": {
+            "url": f"http://data.nber.org/cps/cpsmar{year}.zip",
+            "sha256": None,
+        }
+        for year in range(2013, 2019)
+    },
+    "irs_soi_state_2014": {
+        "url": "https://www.irs.gov/pub/irs-soi/14in54cmcsv.csv",
+        "sha256": None,
+    },
+}
+
+
+def is_offline():
+    return os.environ.get("TAXDATA_OFFLINE", "") not in ("", "0")
+
+
+def read_refs(store):
+    refs_path = Path(store, "refs.json")
+    if not refs_path.exists():
+        return {}
+    return json.loads(refs_path.read_text())
+
+
+def write_ref(store, name, stored_hash):
+    """
+    Point `name` at `stored_hash` in refs.json. createcps.py and createpuf.py
+    can add files to the same store at the same time, so refs.json is only
+    read and replaced while holding a lock, and replaced in one step
+    """
+    store = Path(store)
+    with file_lock(Path(store, "refs.json.lock")):
+        refs = read_refs(store)
+        refs[name] = stored_hash
+        with tempfile.NamedTemporaryFile(
+            "w", dir=store, delete=False, suffix=".tmp"
+        ) as f:
+            json.dump(refs, f, indent=4, sort_keys=True)
+        os.replace(f.name, Path(store, "refs.json"))
+
+
+def stored_path(name, store):
+    """
+    Path to the verified copy of `name` in the store. Returns None if the
+    store doesn't have it
+    """
+    stored_hash = read_refs(store).get(name)
+    if stored_hash is None:
+        return None
+    path = Path(store, stored_hash)
+    if not path.exists():
+        return None
+    if file_hash(path) != stored_hash:
+        raise ValueError(
+            f"{path} is corrupted. Delete it and resolve {name} again"
+        )
+    return path
+
+
+def add(name, path, store=None):
+    """
+    Copy the file at `path` into the store as `name` and return its new path
+
+    Parameters
+    ----------
+    name: name of the artifact in ARTIFACTS
+    path: path-like object to the file being added
+    store: artifact store directory. Defaults to STORE_PATH
+    """
+    store = Path(store or STORE_PATH)
+    expected = ARTIFACTS[name].get("sha256")
+    path_hash = file_hash(path)
+    if expected is not None and path_hash != expected:
+        raise ValueError(
+            f"{path} doesn't match {name}. Expected SHA-256 {expected}, "
+            f"found {path_hash}"
+        )
+    store.mkdir(parents=True, exist_ok=True)
+    stored = Path(store, path_hash)
+    if not stored.exists():
+        # copy under a temporary name first so that an interrupted copy is
+        # never mistaken for the real file
+        tmp = Path(store, f"{path_hash}.tmp")
+        shutil.copyfile(path, tmp)
+        tmp.replace(stored)
+    write_ref(store, name, path_hash)
+    return stored
+
+
+def download(name, store):
+    """
+    Download `name` and add it to the store
+    """
+    import requests
+
+    url = ARTIFACTS[name]["url"]
+    print(f"Downloading {url}")
+    r = requests.get(url, stream=True, timeout=60)
+    r.raise_for_status()
+    store.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=store, delete=False) as f:
+        for block in r.iter_content(chunk_size=2**20):
+            f.write(block)
+    try:
+        return add(name, f.name, store)
+    finally:
+        os.remove(f.name)
+
+
+def resolve(name, store=None, offline=None):
+    """
+    Return the path to a verified local copy of the external file `name`
+
+    Parameters
+    ----------
+    name: name of the artifact in ARTIFACTS
+    store: artifact store directory. Defaults to STORE_PATH
+    offline: if True, never download the file. Defaults to True when the
+             TAXDATA_OFFLINE environment variable is set
+    """
+    if name not in ARTIFACTS:
+        raise KeyError(f"{name} is not a registered artifact")
+    store = Path(store or STORE_PATH)
+    offline = is_offline() if offline is None else offline
+    path = stored_path(name, store)
+    if path is not None:
+        return path
+    if offline:
+        raise FileNotFoundError(
+            f"{name} is not in the artifact store at {store}. Download "
+            f"{ARTIFACTS[name]['url']} and add it with "
+            f"`python -m taxdata.artifacts add {name} PATH`"
+        )
+    return download(name, store)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "add":
+        sys.exit("usage: python -m taxdata.artifacts add NAME PATH")
+    print(add(sys.argv[2], sys.argv[3]))
@@ -1,4 +1,5 @@
 # flake8: noqa
+from taxdata.cps import batchunits
 from taxdata.cps import benefits
 from taxdata.cps import cps_meta
 from taxdata.cps import cpsmar
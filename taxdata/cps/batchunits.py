@@ -0,0 +1,479 @@
+"""
+Array based engine for creating tax units. It mirrors the record-by-record
+logic in `pycps.create_units`, but forms the tax units for every household
+in the CPS at once. Households are processed in rounds: in each round, the
+first person in every household who hasn't been assigned to a tax unit yet
+becomes the head of a new unit, which matches the order `create_units`
+creates units in
+"""
+
+import numpy as np
+import pandas as pd
+from .helpers import (
+    filingparams,
+    cps_yr_idx,
+    C_TAM_BENEFIT_TUPLES,
+    CPS_BENEFIT_TUPLES,
+)
+from .taxunit import INCOME_TUPLES, COLUMNS
+
+# relationships that pass the qualifying relative relationship test
+RELATIVE_CODES = [5, 7, 8, 9, 11]
+# relationships that pass the EIC qualifying child relationship test
+EIC_CODES = [5, 7, 9, 11]
+
+
+class _People:
+    """
+    Arrays with the person level information needed to form tax units
+    """
+
+    def __init__(self, data: pd.DataFrame, household: np.ndarray):
+        self.household = household
+        for var in [
+            "a_lineno",
+            "a_spouse",
+            "a_parent",
+            "a_maritl",
+            "a_age",
+            "a_ftpt",
+            "a_exprrp",
+            "dep_stat",
+            "ffpos",
+            "filestat",
+            "ptotval",
+            "tot_inc",
+            "earned_inc",
+            "unearned_inc",
+        ]:
+            setattr(self, var, data[var].to_numpy())
+        # used to find people by their household and line number
+        self.keys = household.astype(np.int64) * 100 + self.a_lineno
+        self.key_order = np.argsort(self.keys, kind="stable")
+        self.sorted_keys = self.keys[self.key_order]
+
+    def find(self, household, lineno):
+        """
+        Vectorized version of `pycps.find_person`. Returns the position of
+        each person
+        """
+        target = household.astype(np.int64) * 100 + lineno
+        pos = np.searchsorted(self.sorted_keys, target)
+        pos = np.minimum(pos, len(self.sorted_keys) - 1)
+        found = self.sorted_keys[pos] == target
+        if not found.all():
+            msg = (
+                f"Person with line number {lineno[~found][0]} not found in"
+                f"household."
+            )
+            raise ValueError(msg)
+        return self.key_order[pos]
+
+
+def marital_status(data: pd.DataFrame):
+    """
+    Marital status and number of exemptions each person would have as the
+    head of a tax unit. Mirrors the logic in `TaxUnit.__init__`
+    """
+    maritl = data["a_maritl"].to_numpy()
+    filestat = data["filestat"].to_numpy()
+    married = np.isin(maritl, [1, 2, 3])
+    mars = np.where(married, 2, 1)
+    mars = np.where(
+        married & np.isin(filestat, [5, 6]) & (maritl == 3), 3, mars
+    )
+    xtot = np.where(mars == 2, 2, 1)
+    mars = np.where(filestat == 4, 4, mars)
+    return mars, xtot
+
+
+def is_dependent(people, cand, head, unit_tot_inc, age_head):
+    """
+    Vectorized version of `pycps.is_dependent` for people who have not been
+    assigned to a tax unit yet
+    Parameters
+    ----------
+    people: _People instance
+    cand: position of the people who may be dependents
+    head: position of the head of the unit each candidate is tested against
+    unit_tot_inc: total income of each candidate's tax unit
+    age_head: age of the head of each candidate's tax unit
+    """
+    head_lineno = people.a_lineno[head]
+    dep_stat = people.dep_stat[cand]
+    age = people.a_age[cand]
+    # if they're married, don't let them be claimed as a dependent
+    unmarried = ~np.isin(people.a_maritl[cand], [1, 2, 3])
+    claimed = dep_stat == head_lineno
+    # financial support
+    tot_inc = people.tot_inc[cand]
+    total_support = unit_tot_inc + tot_inc
+    pct_support = np.divide(
+        tot_inc,
+        total_support,
+        out=np.zeros(len(cand)),
+        where=total_support != 0,
+    )
+    supported = ~(pct_support > 0.5)
+    # qualifying child
+    age_req = np.where(
+        people.a_ftpt[cand] == 1,
+        filingparams.dependent_child_age_student[cps_yr_idx],
+        filingparams.dependent_child_age[cps_yr_idx],
+    )
+    child = (age <= age_req) & (age <= age_head) & supported
+    # qualifying relative
+    relative = (
+        (people.ptotval[cand] <= 4150)
+        & supported
+        & np.isin(people.a_exprrp[cand], RELATIVE_CODES)
+    )
+    qualifies = np.where(people.a_parent[cand] == head_lineno, child, relative)
+    return unmarried & (claimed | ((dep_stat != 0) & qualifies))
+
+
+def eic_eligible(people, dep, age_head, age_spouse, mars):
+    """
+    Vectorized version of `pycps.eic_eligible`
+    """
+    age = people.a_age[dep]
+    relationship = np.isin(people.a_exprrp[dep], EIC_CODES)
+    eic_max_age = np.where(
+        people.a_ftpt[dep] == 1,
+        filingparams.eic_child_age_student[cps_yr_idx],
+        filingparams.eic_child_age[cps_yr_idx],
+    )
+    age_test = (0 <= age) & (age <= eic_max_age)
+    younger = np.where(
+        mars == 1,
+        age < age_head,
+        np.where(mars == 2, (age < age_head) | (age < age_spouse), True),
+    )
+    return (relationship & age_test & younger).astype(int)
+
+
+def dependent_filers(people, deps):
+    """
+    Determine which dependents must file their own return. Mirrors the
+    dependent filing logic in `pycps.create_units`
+    """
+    elderly_age = filingparams.elderly_age[cps_yr_idx]
+    age = people.a_age[deps]
+    aidx = (age >= elderly_age).astype(int)
+    midx = np.zeros(len(deps), dtype=int)
+    has_spouse = people.a_spouse[deps] != 0
+    if has_spouse.any():
+        midx[has_spouse] = 2
+        spouse = people.find(
+            people.household[deps][has_spouse],
+            people.a_spouse[deps][has_spouse],
+        )
+        aidx[has_spouse] += people.a_age[spouse] >= elderly_age
+    earn_thd = np.array(filingparams.dep_earned_inc_thd[cps_yr_idx])
+    unearn_thd = np.array(filingparams.dep_unearned_inc_thd[cps_yr_idx])
+    gross_thd = np.array(filingparams.dep_gross_inc_thd[cps_yr_idx])
+    earned_inc = people.earned_inc[deps]
+    filer = (
+        (earned_inc >= earn_thd[aidx, midx])
+        | (people.unearned_inc[deps] >= unearn_thd[aidx, midx])
+        | (
+            people.ptotval[deps]
+            >= np.maximum(gross_thd[aidx, midx], earned_inc + 350)
+        )
+    )
+    # if a dependent says they didn't file, we'll believe them
+    return filer & (people.filestat[deps] != 6)
+
+
+def form_units(people, income, mars):
+    """
+    Assign everyone in the CPS to a tax unit as a head, spouse, or dependent
+    Returns
+    -------
+    units: DataFrame with the head, spouse (-1 if there isn't one), round
+           the unit was created in, and whether it's a dependent filer
+    deps: DataFrame with each dependent's position, unit, EIC eligibility,
+          and whether they file their own return
+    """
+    num_people = len(people.a_lineno)
+    flagged = np.zeros(num_people, dtype=bool)
+    num_households = people.household.max() + 1 if num_people else 0
+    units = []
+    deps = []
+    num_units = 0
+    rnd = 0
+    while not flagged.all():
+        # the first unassigned person in each household heads a new unit
+        unassigned = np.flatnonzero(~flagged)
+        _, first = np.unique(people.household[unassigned], return_index=True)
+        heads = unassigned[first]
+        flagged[heads] = True
+        spouses = np.full(len(heads), -1)
+        has_spouse = people.a_spouse[heads] != 0
+        spouses[has_spouse] = people.find(
+            people.household[heads][has_spouse],
+            people.a_spouse[heads][has_spouse],
+        )
+        flagged[spouses[has_spouse]] = True
+        # total income of the unit, added up in the same order as TaxUnit
+        unit_tot_inc = np.zeros(len(heads))
+        for values in income:
+            unit_tot_inc += values[heads]
+        for values in income:
+            unit_tot_inc += np.where(has_spouse, values[spouses], 0)
+        age_head = people.a_age[heads]
+        age_spouse = np.where(has_spouse, people.a_age[spouses], 0)
+
+        # look for dependents in the same family as the head of each unit
+        unit_of_hh = np.full(num_households, -1)
+        unit_of_hh[people.household[heads]] = np.arange(len(heads))
+        cand = np.flatnonzero(~flagged & (unit_of_hh[people.household] >= 0))
+        unit = unit_of_hh[people.household[cand]]
+        same_family = people.ffpos[cand] == people.ffpos[heads][unit]
+        cand, unit = cand[same_family], unit[same_family]
+        dep = is_dependent(
+            people, cand, heads[unit], unit_tot_inc[unit], age_head[unit]
+        )
+        cand, unit = cand[dep], unit[dep]
+        flagged[cand] = True
+        eic = eic_eligible(
+            people, cand, age_head[unit], age_spouse[unit], mars[heads][unit]
+        )
+
+        units.append(
+            pd.DataFrame(
+                {
+                    "head": heads,
+                    "spouse": spouses,
+                    "round": rnd,
+                    "dep_filer": False,
+                }
+            )
+        )
+        deps.append(
+            pd.DataFrame(
+                {
+                    "person": cand,
+                    "unit": unit + num_units,
+                    "eic": eic,
+                    "round": rnd,
+                }
+            )
+        )
+        num_units += len(heads)
+        rnd += 1
+
+    units = pd.concat(units, ignore_index=True)
+    deps = pd.concat(deps, ignore_index=True)
+    # check and see if any dependents must file
+    deps["filer"] = dependent_filers(people, deps["person"].to_numpy())
+    filers = deps[deps["filer"]]
+    filer_units = pd.DataFrame(
+        {
+            "head": filers["person"].to_numpy(),
+            "spouse": -1,
+            "round": filers["round"].to_numpy(),
+            "dep_filer": True,
+        }
+    )
+    units = pd.concat([units, filer_units], ignore_index=True)
+    return units, deps
+
+
+def create_units(
+    data: pd.DataFrame,
+    household: np.ndarray,
+    year: int,
+    ctam_benefits: bool = True,
+) -> pd.DataFrame:
+    """
+    Create tax units for every household in the CPS
+    Parameters
+    ----------
+    data: DataFrame with a row for every person in the CPS
+    household: household number of each person in `data`
+    year: tax year the tax units are created for
+    ctam_benefits: if True, use the C-TAM imputed benefits
+    Returns
+    -------
+    DataFrame with the same tax units, in the same order, as
+    `pycps.create_units` run on each household
+    """
+    # sort on familly position and family relationship so that
+    # we can avoid making children their own units just because
+    # they're listed ahead of their parents
+    order = np.lexsort(
+        (data["a_famrel"].to_numpy(), data["ffpos"].to_numpy(), household)
+    )
+    data = data.iloc[order].reset_index(drop=True)
+    household = np.asarray(household)[order]
+    people = _People(data, household)
+    if ctam_benefits:
+        benefit_tuples = C_TAM_BENEFIT_TUPLES
+    else:
+        benefit_tuples = CPS_BENEFIT_TUPLES
+    income_tuples = []
+    for cps_var, tc_var in INCOME_TUPLES:
+        if cps_var == "ss_impute" and not ctam_benefits:
+            cps_var = "ss_val"
+        elif cps_var == "UI_impute" and not ctam_benefits:
+            cps_var = "uc_val"
+        income_tuples.append((cps_var, tc_var))
+    income = [
+        data[cps_var].to_numpy(dtype=float) for cps_var, _ in income_tuples
+    ]
+    mars, xtot = marital_status(data)
+
+    units, deps = form_units(people, income, mars)
+    head = units["head"].to_numpy()
+    spouse = units["spouse"].to_numpy()
+    has_spouse = spouse >= 0
+    dep_filer = units["dep_filer"].to_numpy()
+    num_units = len(units)
+    # dependents who file their own return are removed from the unit that
+    # claimed them. Like TaxUnit.remove_dependent, this doesn't undo their
+    # contribution to EIC, f2441, or deps_spouses
+    dep_unit = deps["unit"].to_numpy()
+    dep_person = deps["person"].to_numpy()
+    kept = ~deps["filer"].to_numpy()
+
+    def head_values(var):
+        return data[var].to_numpy()[head]
+
+    def spouse_values(var, fill=0):
+        return np.where(has_spouse, data[var].to_numpy()[spouse], fill)
+
+    def dep_sum(values, mask=kept):
+        return np.bincount(
+            dep_unit[mask], weights=values[mask], minlength=num_units
+        )
+
+    def dep_count(condition, mask=kept):
+        return np.bincount(dep_unit[mask & condition], minlength=num_units)
+
+    out = {}
+    out["BENEFIT_TUPLES"] = [benefit_tuples] * num_units
+    out["ctam_benefits"] = ctam_benefits
+    benefit_vars = {tc_var: cps_var for cps_var, tc_var in benefit_tuples}
+    counts = {}
+    for tc_var, count_var in [
+        ("mcare_ben", "mcare_count"),
+        ("mcaid_ben", "mcaid_count"),
+    ]:
+        counts[count_var] = np.zeros(num_units, dtype=int)
+        if tc_var in benefit_vars:
+            values = data[benefit_vars[tc_var]].to_numpy()
+            counts[count_var] = (
+                (values[head] != 0).astype(int)
+                + (has_spouse & (values[spouse] != 0))
+                + dep_count(values[dep_person] != 0)
+            )
+        out[count_var] = counts[count_var]
+    tot_inc = np.zeros(num_units)
+    for values in income:
+        tot_inc += values[head]
+    for values in income:
+        tot_inc += np.where(has_spouse, values[spouse], 0)
+    out["tot_inc"] = tot_inc
+    for cps_var, tc_var in income_tuples:
+        head_val = head_values(cps_var)
+        spouse_val = spouse_values(cps_var)
+        out[tc_var] = head_val + spouse_val
+        out[f"{tc_var}p"] = head_val
+        out[f"{tc_var}s"] = spouse_val
+    for cps_var, tc_var in benefit_tuples:
+        values = data[cps_var].to_numpy()
+        total = out.get(tc_var, values[head]) + spouse_values(cps_var)
+        # keep integer benefits as integers, like TaxUnit does
+        dep_total = dep_sum(values[dep_person].astype(float))
+        out[tc_var] = (total + dep_total).astype(total.dtype)
+    # SNAP and housing benefits need to only be added for head of unit
+    if "snap_impute" in data and "housing_impute" in data:
+        out["snap_ben"] = head_values("snap_impute")
+        out["housing_ben"] = head_values("housing_impute")
+    else:
+        out["snap_ben"] = head_values("hfdval")
+        out["housing_ben"] = head_values("housing_val")
+    out["agi"] = head_values("agi") + spouse_values("agi")
+    out["age_head"] = head_values("a_age")
+    out["age_spouse"] = spouse_values("a_age")
+    out["blind_head"] = head_values("pediseye")
+    out["fips"] = head_values("gestfips")
+    out["h_seq"] = head_values("hhid")
+    out["a_lineno"] = head_values("a_lineno")
+    out["ffpos"] = head_values("ffpos")
+    out["s006"] = head_values("fsup_wgt")
+    out["FLPDYR"] = year
+    out["EIC"] = dep_sum(deps["eic"].to_numpy(), np.ones(len(deps), bool))
+    out["EIC"] = out["EIC"].astype(int)
+    out["dep_stat"] = dep_filer.astype(int)
+    out["mars"] = mars[head]
+    depne = dep_count(np.ones(len(deps), dtype=bool))
+    out["XTOT"] = xtot[head] + depne
+    hh_inc = np.bincount(
+        household, weights=data["tot_inc"].to_numpy(dtype=float)
+    )
+    out["hh_inc"] = np.where(dep_filer, 0.0, hh_inc[household[head]])
+    out["filer"] = (head_values("filestat") != 6).astype(int)
+
+    # age data
+    elderly_age = filingparams.elderly_age[cps_yr_idx]
+    age_head = out["age_head"]
+    age_spouse = out["age_spouse"]
+    dep_age = people.a_age[dep_person]
+    for var, low, high in [
+        ("nu18", -np.inf, 18),
+        ("n1820", 18, 21),
+        ("n21", 21, np.inf),
+    ]:
+        out[var] = (
+            ((low <= age_head) & (age_head < high)).astype(int)
+            + (has_spouse & (low <= age_spouse) & (age_spouse < high))
+            + dep_count((low <= dep_age) & (dep_age < high))
+        )
+    out["nu06"] = dep_count(dep_age < 6)
+    out["nu13"] = dep_count(dep_age < 13)
+    out["n24"] = dep_count(dep_age < 17)
+    out["elderly_dependents"] = dep_count(dep_age >= elderly_age)
+    out["f2441"] = dep_count(dep_age < 13, np.ones(len(deps), dtype=bool))
+
+    # home related data
+    out["home_owner"] = (~dep_filer & (head_values("h_tenure") == 1)).astype(
+        int
+    )
+    out["prop_tax"] = head_values("prop_tax")
+    out["statetax"] = np.maximum(
+        0.0, head_values("statetax_ac")
+    ) + spouse_values("statetax_ac")
+    out["prop_value"] = head_values("hprop_val")
+    out["mortgage_yn"] = (head_values("hpres_mort") == 1).astype(int)
+
+    # line numbers of spouses and dependents
+    lineno = data["a_lineno"].to_numpy()
+    deps_spouses = [[] for _ in range(num_units)]
+    for unit, sp in zip(np.flatnonzero(has_spouse), spouse[has_spouse]):
+        deps_spouses[unit].append(lineno[sp])
+    for unit, person in zip(dep_unit, dep_person):
+        deps_spouses[unit].append(lineno[person])
+    out["deps_spouses"] = deps_spouses
+    out["depne"] = depne
+    out["blind_spouse"] = spouse_values("pediseye", fill=np.nan)
+    out["fam_size"] = 1 + depne + (out["mars"] == 2)
+
+    # enforce that all spouse income variables are zero for non-married
+    not_married = out["mars"] != 2
+    for _, tc_var in INCOME_TUPLES:
+        bad = not_married & (out[f"{tc_var}s"] != 0)
+        if bad.any():
+            h_seq = out["h_seq"][bad][0]
+            msg = f"{tc_var}s is not zero for household {h_seq}"
+            raise AssertionError(msg)
+    assert np.all(out["XTOT"] >= out["nu18"] + out["n1820"] + out["n21"])
+
+    # put the units in the order create_units creates them: units formed in
+    # each round followed by dependent filers, household by household
+    sort_order = np.lexsort(
+        (head, units["round"].to_numpy(), dep_filer, household[head])
+    )
+    units_df = pd.DataFrame(out).iloc[sort_order].reset_index(drop=True)
+    return units_df[COLUMNS[ctam_benefits]]
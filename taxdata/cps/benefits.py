@@ -1,6 +1,21 @@
 import pandas as pd
-from functools import reduce
 from pathlib import Path
+from .helpers import read_benefits, peridnum_index
+
+# person level C-TAM imputations added by merge_benefits, in order
+MERGED_VARS = [
+    "vb_impute",
+    "ssi_impute",
+    "ss_impute",
+    "tanf_impute",
+    "UI_impute",
+    "wic_children",
+    "wic_infants",
+    "wic_women",
+    "wic_impute",
+    "MedicaidX",
+    "MedicareX",
+]
 
 
 def merge_benefits(cps, year, data_path, export=True):
@@ -20,57 +35,22 @@ def merge_benefits(cps, year, data_path, export=True):
         wic_children, and wic_infants)
     """
 
-    def read_ben(path_prefix, usecols):
-        path = Path(data_path, path_prefix + str(year) + ".csv")
-        return pd.read_csv(path, usecols=usecols)
-
-    start_len = len(cps)
     # read in benefit imputations
-    mcaid = read_ben("medicaid", ["MedicaidX", "peridnum"])
-    mcare = read_ben("medicare", ["MedicareX", "peridnum"])
-    vb = read_ben("VB_Imputation", ["vb_impute", "peridnum"])
-    snap = read_ben("SNAP_Imputation_", ["h_seq", "snap_impute"])
-    ssi = read_ben("SSI_Imputation", ["ssi_impute", "peridnum"])
-    ss = read_ben("SS_augmentation_", ["ss_val", "peridnum"]).rename(
-        columns={"ss_val": "ss_impute"}
-    )
-    housing = read_ben(
-        "Housing_Imputation_logreg_", ["fh_seq", "ffpos", "housing_impute"]
-    )
-    tanf = read_ben("TANF_Imputation_", ["peridnum", "tanf_impute"])
-    # drop duplicated people in tanf
-    tanf.drop_duplicates("peridnum", inplace=True)
-    ui = read_ben("UI_imputation_logreg_", ["peridnum", "UI_impute"])
-
-    WIC_STR = "WIC_imputation_{}_logreg_"
-    wic_children = read_ben(
-        WIC_STR.format("children"), ["peridnum", "WIC_impute"]
-    ).rename(columns={"WIC_impute": "wic_children"})
-    wic_infants = read_ben(
-        WIC_STR.format("infants"), ["peridnum", "WIC_impute"]
-    ).rename(columns={"WIC_impute": "wic_infants"})
-    wic_women = read_ben(
-        WIC_STR.format("women"), ["peridnum", "WIC_impute"]
-    ).rename(columns={"WIC_impute": "wic_women"})
-
-    # combine all WIC imputation into one variable
-    wic = reduce(
-        lambda left, right: pd.merge(left, right, on="peridnum"),
-        [wic_children, wic_infants, wic_women],
-    )
-    wic["wic_impute"] = wic[["wic_women", "wic_infants", "wic_children"]].sum(
-        axis=1
-    )
-
-    # merge housing and snap
-    cps_merged = cps.merge(housing, on=["fh_seq", "ffpos"], how="left")
-    cps_merged = cps_merged.merge(snap, on="h_seq", how="left")
-    # merge other variables
-    peridnum_dfs = [cps_merged, vb, ssi, ss, tanf, ui, wic, mcaid, mcare]
-    cps_merged = reduce(
-        lambda left, right: pd.merge(left, right, on="peridnum", how="left"),
-        peridnum_dfs,
-    ).fillna(0.0)
+    benefit_tables = read_benefits(year, data_path)
+
+    # look up every benefit table with the CPS keys and add them to the CPS
+    # in a single join. The benefit tables have unique keys, so no rows can
+    # be added to the CPS
+    housing_keys = pd.MultiIndex.from_frame(cps[["fh_seq", "ffpos"]])
+    benefits = [
+        benefit_tables.housing.reindex(housing_keys),
+        benefit_tables.snap.reindex(cps["h_seq"]),
+        benefit_tables.person[MERGED_VARS].reindex(
+            peridnum_index(cps["peridnum"])
+        ),
+    ]
+    benefits = [ben.set_axis(cps.index) for ben in benefits]
+    cps_merged = pd.concat([cps] + benefits, axis=1).fillna(0.0)
 
     if export:
         print("Saving {} Data".format(year))
@@ -78,10 +58,6 @@ def merge_benefits(cps, year, data_path, export=True):
             Path(data_path, f"cpsmar{year}_ben.csv"), index=False
         )
 
-    del mcaid, mcare, vb, ssi, ss, tanf, ui, wic, housing, snap
-    # assert that no additional rows have been introduced by bad merges
-    assert start_len == len(cps_merged)
-
     return cps_merged
 
 
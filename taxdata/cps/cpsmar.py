@@ -1,39 +1,223 @@
+import json
+import hashlib
+import numpy as np
 import pandas as pd
-import pickle
-from collections import OrderedDict
-from tqdm import tqdm
+import pyarrow as pa
 from pathlib import Path
-from .helpers import read_benefits
+from .helpers import (
+    read_benefits,
+    benefit_hashes,
+    peridnum_index,
+    PERSON_BENEFIT_VARS,
+)
+from ..hashing import file_hash
+from .transform_sas import compile_year
 
 CUR_PATH = Path(__file__).resolve().parent
 DATA_PATH = Path(CUR_PATH, "data")
+# number of households converted to dictionaries at once when iterating
+ITER_CHUNK = 1000
+# columns holding integers too large to store in an int64
+WIDE_INT_VARS = ["peridnum"]
+# number of records decoded at once when parsing
+PARSE_BLOCK = 2**14
 
 
-def person_details(record, benefits, h_seq, fhseq, ffpos, year):
+class CPSHouseholds:
     """
-    Add additonal details for person records
+    Columnar version of the converted CPS. Everyone in the CPS is held in one
+    table with members of the same household in consecutive rows, and
+    `offsets` marks the row where each household starts. Households are
+    materialized as lists of dictionaries, one for each person, only when
+    they are accessed. When the CPS is read from a cache, the table stays
+    memory mapped and only the rows being accessed are converted
+    """
+
+    def __init__(self, people, offsets: np.ndarray):
+        """
+        Parameters
+        ----------
+        people: DataFrame, or Arrow table saved by `to_arrow`, with a row for
+                every person in the CPS
+        offsets: row where each household starts in `people`, followed by
+                 the number of rows in `people`
+        """
+        self._people = people
+        self.offsets = offsets
+
+    @property
+    def people(self):
+        """
+        DataFrame with a row for every person in the CPS
+        """
+        if isinstance(self._people, pa.Table):
+            self._people = table_people(self._people)
+        return self._people
+
+    def rows(self, start, end):
+        """
+        DataFrame with rows `start` to `end` of `people`
+        """
+        if isinstance(self._people, pa.Table):
+            return table_people(self._people.slice(start, end - start))
+        return self._people.iloc[start:end]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                raise ValueError("Households can only be sliced with step 1")
+            stop = max(start, stop)
+            offsets = self.offsets[start : stop + 1]
+            first, last = offsets[0], offsets[-1]
+            if isinstance(self._people, pa.Table):
+                people = self._people.slice(first, last - first)
+            else:
+                people = self._people.iloc[first:last].reset_index(drop=True)
+            return CPSHouseholds(people, offsets - first)
+        if idx < 0:
+            idx += len(self)
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return self.rows(start, end).to_dict("records")
+
+    def __iter__(self):
+        # convert households in chunks to avoid the overhead of slicing the
+        # table for every household
+        for first in range(0, len(self), ITER_CHUNK):
+            last = min(first + ITER_CHUNK, len(self))
+            offsets = self.offsets[first : last + 1]
+            records = self.rows(offsets[0], offsets[-1]).to_dict("records")
+            bounds = offsets - offsets[0]
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                yield records[start:end]
+
+    def to_arrow(self, path, **metadata):
+        """
+        Save the CPS as an Arrow IPC file. The household offsets and any
+        additional keyword arguments are stored in the file's metadata
+        """
+        people = self.people.copy()
+        for var in WIDE_INT_VARS:
+            people[var] = people[var].astype(str)
+        table = pa.Table.from_pandas(people, preserve_index=False)
+        _metadata = {
+            b"offsets": self.offsets.astype("<i8").tobytes(),
+            b"taxdata": json.dumps(metadata).encode(),
+        }
+        table = table.replace_schema_metadata(_metadata)
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def arrow_metadata(path):
+        """
+        Metadata saved by `to_arrow`, read without loading the CPS
+        """
+        with pa.memory_map(str(path), "r") as source:
+            schema = pa.ipc.open_file(source).schema
+        return json.loads(schema.metadata[b"taxdata"])
+
+    @classmethod
+    def read_arrow(cls, path):
+        """
+        Load a CPS saved with `to_arrow` using memory mapping. Returns the
+        households and the metadata saved with them
+        """
+        # the map is left open because the table's buffers point into it
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        offsets = np.frombuffer(
+            table.schema.metadata[b"offsets"], dtype="<i8"
+        ).astype(np.int64)
+        metadata = json.loads(table.schema.metadata[b"taxdata"])
+        return cls(table, offsets), metadata
+
+
+def table_people(table):
+    """
+    Convert people in an Arrow table saved by `CPSHouseholds.to_arrow` to a
+    DataFrame
+    """
+    people = table.to_pandas()
+    for var in WIDE_INT_VARS:
+        people[var] = people[var].map(int)
+    return people
+
+
+def parse_hash(parsing_dict):
+    """
+    Hash of the dictionary used to parse the .DAT file
+    """
+    parse_str = json.dumps(parsing_dict, sort_keys=True)
+    return hashlib.sha256(parse_str.encode()).hexdigest()
+
+
+def cache_metadata(dat_file, parsing_dict, benefits, year):
+    """
+    Information used to determine if a cached version of the CPS is stale
+    """
+    return {
+        "parse_hash": parse_hash(parsing_dict),
+        "source_hash": file_hash(dat_file),
+        "benefits": benefits,
+        "benefit_hashes": benefit_hashes(year) if benefits else {},
+    }
+
+
+def read_cache(cache_path, dat_file, parsing_dict, benefits, year):
+    """
+    Read the cached version of the CPS. Returns None if the cache doesn't
+    exist or it was created with a different parsing dictionary, source file,
+    benefit setting, or C-TAM imputation files. If the .DAT file is no longer
+    available, the cache is assumed to match it
+    """
+    cache_path = Path(cache_path)
+    if not cache_path.exists():
+        return None
+    metadata = CPSHouseholds.arrow_metadata(cache_path)
+    source_hash = metadata.get("source_hash")
+    if Path(dat_file).exists():
+        source_hash = file_hash(dat_file)
+    expected = {
+        "parse_hash": parse_hash(parsing_dict),
+        "source_hash": source_hash,
+        "benefits": benefits,
+        "benefit_hashes": benefit_hashes(year) if benefits else {},
+    }
+    if metadata != expected:
+        print(f"{cache_path} is out of date")
+        return None
+    cps, _ = CPSHouseholds.read_arrow(cache_path)
+    return cps
+
+
+def person_details(cps, benefit_tables, year):
+    """
+    Add additonal details for person records. C-TAM imputed benefits are
+    added from `benefit_tables` unless it's None
     """
     if year >= 2015:
-        record["alimony"] = 0.0
-        if record["oi_off"] == 20:
-            record["alimony"] = record["oi_val"]
+        cps["alimony"] = np.where(cps["oi_off"] == 20, cps["oi_val"], 0.0)
     else:
-        record["alimony"] = record["alm_val"]
+        cps["alimony"] = cps["alm_val"]
     # Calculate pensions and annuities
     pensions_annuities = (
-        ((record["oi_off"] == 2) * record["oi_val"])
-        + ((record["ret_sc1"] == 1) * record["ret_val1"])
-        + ((record["ret_sc2"] == 1) * record["ret_val2"])
-        + ((record["ret_sc1"] == 7) * record["ret_val1"])
-        + ((record["ret_sc2"] == 7) * record["ret_val2"])
-        + ((record["oi_off"] == 13) * record["oi_val"])
+        ((cps["oi_off"] == 2) * cps["oi_val"])
+        + ((cps["ret_sc1"] == 1) * cps["ret_val1"])
+        + ((cps["ret_sc2"] == 1) * cps["ret_val2"])
+        + ((cps["ret_sc1"] == 7) * cps["ret_val1"])
+        + ((cps["ret_sc2"] == 7) * cps["ret_val2"])
+        + ((cps["oi_off"] == 13) * cps["oi_val"])
     )
-    record["pensions_annuities"] = pensions_annuities
+    cps["pensions_annuities"] = pensions_annuities
     # flags used in tax unit creation
-    record["p_flag"] = False
-    record["s_flag"] = False
-    record["d_flag"] = False
-    record["hhid"] = h_seq
+    cps["p_flag"] = False
+    cps["s_flag"] = False
+    cps["d_flag"] = False
+    cps["hhid"] = cps["h_seq"]
 
     # calculate earned and unearned income
     EARNED_INC_VARS = ["wsal_val", "semp_val", "frse_val", "rnt_val"]
@@ -45,72 +229,254 @@ def person_details(record, benefits, h_seq, fhseq, ffpos, year):
         "uc_val",
         "ss_val",
     ]
-    record["earned_inc"] = sum([record[var] for var in EARNED_INC_VARS])
-    record["unearned_inc"] = sum([record[var] for var in UNEARNED_INC_VARS])
-    record["tot_inc"] = record["earned_inc"] + record["unearned_inc"]
+    cps["earned_inc"] = cps[EARNED_INC_VARS].sum(axis=1)
+    cps["unearned_inc"] = cps[UNEARNED_INC_VARS].sum(axis=1)
+    cps["tot_inc"] = cps["earned_inc"] + cps["unearned_inc"]
 
-    if benefits:
+    if benefit_tables is not None:
         # add benefit variables from the CPS
-        global MCAID, MCARE, VB, SNAP, SSI, SS, HOUSING, TANF, UI, WIC
-        perid_ben = [
-            (MCAID, "MedicaidX"),
-            (MCARE, "MedicareX"),
-            (VB, "vb_impute"),
-            (SSI, "ssi_impute"),
-            (SS, "ss_impute"),
-            (TANF, "tanf_impute"),
-            (UI, "UI_impute"),
-            (WIC, "wic_impute"),
-        ]
-        for data, var_name in perid_ben:
-            # C-TAM data only includes those who receive benefits so catch
-            # error for those that do not receive them
-            try:
-                record[var_name] = data[str(record["peridnum"])][var_name]
-            except KeyError:
-                record[var_name] = 0.0
-        record["housing_impute"] = HOUSING[f"{fhseq}{ffpos}"]["housing_impute"]
+        # C-TAM data only includes those who receive benefits so fill
+        # in zero for those that do not receive them
+        person_ben = benefit_tables.person.reindex(
+            peridnum_index(cps["peridnum"])
+        )
+        for var_name in PERSON_BENEFIT_VARS:
+            cps[var_name] = person_ben[var_name].fillna(0.0).to_numpy()
+        family = pd.MultiIndex.from_arrays([cps["fh_seq"], cps["ffpos"]])
+        housing = benefit_tables.housing["housing_impute"].reindex(family)
+        if housing.isna().any():
+            missing = family[housing.isna().to_numpy()][0]
+            msg = f"Family {missing} not found in the housing imputations"
+            raise KeyError(msg)
+        cps["housing_impute"] = housing.to_numpy()
         # C-TAM SNAP imputations only contain records for households receiving
-        # benefits. Catch the error for those that don't.
-        try:
-            record["snap_impute"] = SNAP[h_seq]["snap_impute"]
-        except KeyError:
-            record["snap_impute"] = 0.0
+        # benefits. Fill in zero for those that don't.
+        snap = benefit_tables.snap["snap_impute"].reindex(cps["h_seq"])
+        cps["snap_impute"] = snap.fillna(0.0).to_numpy()
         # replace values of unemployment and social security from original CPS
-        record["unearned_inc"] -= record["ss_val"]
-        record["unearned_inc"] -= record["uc_val"]
-        record["unearned_inc"] += record["UI_impute"]
-        record["unearned_inc"] += record["ss_impute"]
-        record["tot_inc"] -= record["ss_val"]
-        record["tot_inc"] -= record["uc_val"]
-        record["tot_inc"] += record["UI_impute"]
-        record["tot_inc"] += record["ss_impute"]
+        cps["unearned_inc"] -= cps["ss_val"]
+        cps["unearned_inc"] -= cps["uc_val"]
+        cps["unearned_inc"] += cps["UI_impute"]
+        cps["unearned_inc"] += cps["ss_impute"]
+        cps["tot_inc"] -= cps["ss_val"]
+        cps["tot_inc"] -= cps["uc_val"]
+        cps["tot_inc"] += cps["UI_impute"]
+        cps["tot_inc"] += cps["ss_impute"]
     else:
         # calculate benefits in CPS where possible
-        record["tanf_val"] = 0.0
-        if record["paw_yn"] == 1:
-            record["tanf_val"] = record["paw_val"]
+        cps["tanf_val"] = np.where(cps["paw_yn"] == 1, cps["paw_val"], 0.0)
         if year >= 2016:
-            record["housing_val"] = 0.0
+            cps["housing_val"] = 0.0
         else:
-            record["housing_val"] = record["fhoussub"]
-    return record
+            cps["housing_val"] = cps["fhoussub"]
+    return cps
+
+
+def read_dat(dat_file):
+    """
+    Memory-map the .DAT CPS file and return it as a two dimensional array
+    with one row per record. When every record has the same length, as they
+    do in the files from NBER, the rows are a zero-copy view of the file
+    Parameters
+    ----------
+    dat_file: Path to the .DAT version of the CPS downloaded from NBER
+    """
+    buf = np.memmap(dat_file, dtype=np.uint8, mode="r")
+    newlines = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate(([0], newlines + 1))
+    # drop the empty record after the trailing newline
+    starts = starts[starts < len(buf)]
+    num_records = len(starts)
+    if len(newlines):
+        stride = newlines[0] + 1
+        if len(buf) == num_records * stride and np.all(
+            np.diff(newlines) == stride
+        ):
+            return np.lib.stride_tricks.as_strided(
+                buf,
+                shape=(num_records, stride),
+                strides=(stride, 1),
+                writeable=False,
+            )
+    # records differ in length, or a single record has no newline, so copy
+    # them into rows padded with blanks
+    ends = np.append(newlines, len(buf))[:num_records]
+    records = np.full(
+        (num_records, (ends - starts).max()), ord(" "), dtype=np.uint8
+    )
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        records[i, : end - start] = buf[start:end]
+    return records
 
 
-def parse(rec, parse_dict):
+def decode(chars):
     """
-    Function for parsing lines of the CPS
+    Convert an array of ASCII characters to the integer value of each field.
+    The characters of each field run along the second axis, so `chars` has
+    the shape (records, width) or (records, width, fields). Blanks are
+    ignored and a minus sign anywhere in the field makes the value negative,
+    mirroring `int()` on the string version of the field
     """
-    record = OrderedDict()
+    width = chars.shape[1]
+    # fields wider than 18 digits, like peridnum, overflow int64 so they're
+    # decoded in two halves and combined as Python integers
+    if width > 18:
+        split = width - 18
+        high = _digit_value(chars[:, :split]).astype(object)
+        low = _digit_value(chars[:, split:]).astype(object)
+        value = high * 10**18 + low
+    else:
+        value = _digit_value(chars)
+    return np.where((chars == ord("-")).any(axis=1), -value, value)
+
+
+def _digit_value(chars):
+    """
+    Unsigned value of the digits in each field of `chars`. Non-digits are
+    skipped
+    """
+    digits = chars - ord("0")
+    is_digit = digits <= 9
+    digits[~is_digit] = 0
+    value = digits[:, 0].astype(np.int64)
+    for i in range(1, chars.shape[1]):
+        value *= 10
+        value += digits[:, i]
+    # treating non-digits as zeros gives the same value as skipping them
+    # unless they follow a digit, like the blank in "1 "
+    if chars.shape[1] > 1:
+        digit_left = np.logical_or.accumulate(is_digit, axis=1)
+        skipped = (~is_digit & digit_left).any(axis=1)
+        if skipped.any():
+            fields = np.moveaxis(chars, 1, -1)[skipped]
+            value[skipped] = _skip_non_digits(fields)
+    return value
+
+
+def _skip_non_digits(chars):
+    """
+    Value of the digits in each row of `chars`, skipping non-digits
+    """
+    digits = chars - ord("0")
+    is_digit = digits <= 9
+    value = np.zeros(len(chars), dtype=np.int64)
+    for i in range(chars.shape[1]):
+        value = np.where(is_digit[:, i], value * 10 + digits[:, i], value)
+    return value
+
+
+def parse(records, rows, parse_plan):
+    """
+    Function for parsing records of the CPS. Records are read in blocks of
+    PARSE_BLOCK records and all of the variables with the same width and
+    dtype are decoded together
+    Parameters
+    ----------
+    records: two dimensional array with one row per record in the .DAT file
+    rows: indices of the records being parsed
+    parse_plan: plan from `transform_sas.compile_plan` with the location of
+                each variable in the record
+    """
+    groups = parse_plan["groups"]
+    # position of every character in each variable, one column per variable
+    positions = [
+        np.add.outer(np.arange(group["width"]), group["starts"])
+        for group in groups
+    ]
+    # each group's variables are decoded straight into an array of the
+    # group's dtype
+    group_values = [
+        np.empty(
+            (len(rows), len(group["columns"])), dtype=group["dtype"], order="F"
+        )
+        for group in groups
+    ]
+    scales = [np.array(group["scale"]) for group in groups]
+    for i in range(0, len(rows), PARSE_BLOCK):
+        block = records[rows[i : i + PARSE_BLOCK]]
+        for group, out, group_positions, scale in zip(
+            groups, group_values, positions, scales
+        ):
+            decoded = decode(block[:, group_positions])
+            if group["dtype"] == "float64":
+                np.divide(decoded, scale, out=out[i : i + PARSE_BLOCK])
+            else:
+                out[i : i + PARSE_BLOCK] = decoded
+
+    names = parse_plan["names"]
+    values = [None] * len(names)
+    for group, out in zip(groups, group_values):
+        for j, col in enumerate(group["columns"]):
+            values[col] = out[:, j]
+
+    return pd.DataFrame(dict(zip(names, values)))
 
-    for var in parse_dict.keys():
-        start, end, decimals = parse_dict[var]
-        value = int(rec[start:end])
-        if decimals != 0:
-            value /= int("1" + ("0" * decimals))
-        record[var] = value
 
-    return record
+def convert_records(records, year, parse_plan, benefit_tables):
+    """
+    Convert a block of records that starts with a household record to the
+    households they contain
+    Parameters
+    ----------
+    records: two dimensional array with one row per record in the .DAT file
+    year: year of the CPS being converted
+    parse_plan: parse plans for each record type from
+                `transform_sas.compile_year`
+    benefit_tables: C-TAM imputed benefits from `helpers.read_benefits`, or
+                    None to use the benefits reported in the CPS
+    """
+    rec_type = records[:, 0]
+    is_house = rec_type == ord("1")
+    is_family = rec_type == ord("2")
+    is_person = rec_type == ord("3")
+    house = parse(records, np.flatnonzero(is_house), parse_plan["household"])
+    family = parse(records, np.flatnonzero(is_family), parse_plan["family"])
+    person = parse(records, np.flatnonzero(is_person), parse_plan["person"])
+    # each person belongs to the household and family records most recently
+    # read before them
+    house_row = (np.cumsum(is_house) - 1)[is_person]
+    family_row = (np.cumsum(is_family) - 1)[is_person]
+    cps = pd.concat(
+        [
+            house.iloc[house_row].reset_index(drop=True),
+            family.iloc[family_row].reset_index(drop=True),
+            person,
+        ],
+        axis=1,
+    )
+    cps = person_details(cps, benefit_tables, year)
+
+    # mark where each household starts
+    bounds = np.flatnonzero(np.diff(house_row)) + 1
+    offsets = np.concatenate(([0], bounds, [len(cps)])).astype(np.int64)
+    return CPSHouseholds(cps, offsets)
+
+
+def iter_cps(
+    dat_file,
+    year,
+    parsing_dict,
+    benefits=True,
+    chunksize=ITER_CHUNK,
+    parse_plan=None,
+):
+    """
+    Read the .DAT CPS file and yield the households it contains in blocks of
+    `chunksize` households as they're converted, rather than converting the
+    whole file at once. See `create_cps` for a description of the other
+    parameters
+    """
+    if parse_plan is None:
+        parse_plan = compile_year(parsing_dict)
+    records = read_dat(dat_file)
+    benefit_tables = read_benefits(year) if benefits else None
+    # each block starts with a household record
+    starts = np.flatnonzero(records[:, 0] == ord("1"))[::chunksize]
+    ends = np.append(starts[1:], len(records))
+    for start, end in zip(starts, ends):
+        yield convert_records(
+            records[start:end], year, parse_plan, benefit_tables
+        )
 
 
 def create_cps(
@@ -118,82 +484,53 @@ def create_cps(
     year,
     parsing_dict,
     benefits=True,
-    exportpkl=True,
+    exportcache=True,
     exportcsv=True,
     datapath=None,
+    parse_plan=None,
 ):
     """
-    Read the .DAT CPS file and convert it to a list of dictionaries that
-    to later be converted to tax units. Optionally export that list as a
-    pickle file or export the full CPS as a CSV
+    Read the .DAT CPS file and convert it to a collection of households that
+    will later be converted to tax units. Optionally export those households
+    to a columnar cache file or export the full CPS as a CSV
     Parameters
     ----------
     dat_file: Path to the .DAT version of the CPS downloaded from NBER
     year: year of the CPS being converted
     parsing_dict: dictionary with information
     benefits: Set to true to include C-TAM imputed benefits in the CPS
-    exportpkl: Set to true to export a pickled list of households in the CPS
+    exportcache: Set to true to export the households to cpsmar{year}.arrow
     exportcsv: Set to true to export a CSV version of the CPS
     datapath: base export path
+    parse_plan: parse plans compiled from `parsing_dict`. They're compiled
+                when the CPS is read if not provided
     """
-    if (exportpkl or exportcsv) and not datapath:
-        msg = "A value for `datapath` must be specified when `exportpkl` or `exportcsv` is true"
+    if (exportcache or exportcsv) and not datapath:
+        msg = "A value for `datapath` must be specified when `exportcache` or `exportcsv` is true"
         raise ValueError(msg)
+    if parse_plan is None:
+        parse_plan = compile_year(parsing_dict)
     # read in file
     print("Reading DAT file")
-    with Path(dat_file).open("r") as f:
-        cps = [line.strip() for line in f.readlines()]
+    records = read_dat(dat_file)
 
     # Read in benefits
-    if benefits:
-        global MCAID, MCARE, VB, SNAP, SSI, SS, HOUSING, TANF, UI, WIC
-        ben = read_benefits(year)
-        MCAID, MCARE, VB, SNAP, SSI, SS, HOUSING, TANF, UI, WIC = ben
-
-    record_list = []  # list to hold individual records
-    cps_list = []  # list to hold list of households
-    household = []  # list to hold members of household
-    print("Creating Records")
-    for record in tqdm(cps, desc=str(year)):
-        rec_type = record[0]
-        # household records
-        if rec_type == "1":
-            if household:
-                cps_list.append(household)
-                household = []
-            house = parse(record, parsing_dict["household"])
-        # family record
-        elif rec_type == "2":
-            family = parse(record, parsing_dict["family"])
-        # person record
-        elif rec_type == "3":
-            person = parse(record, parsing_dict["person"])
-            person = person_details(
-                person,
-                benefits,
-                house["h_seq"],
-                family["fh_seq"],
-                family["ffpos"],
-                year,
-            )
-            full_rec = {**house, **family, **person}
-            household.append(full_rec)
-            if exportcsv:
-                record_list.append(full_rec)
+    benefit_tables = read_benefits(year) if benefits else None
 
-    # add the last household to the cps list
-    cps_list.append(household)
+    print("Creating Records")
+    cps_households = convert_records(records, year, parse_plan, benefit_tables)
 
     if exportcsv:
-        print("Converting to DataFrame")
-        cpsmar = pd.DataFrame(record_list).fillna(0)
         print("Exporting CSV")
+        cpsmar = cps_households.people.fillna(0)
         export_path = Path(datapath, f"cpsmar{year}.csv")
         cpsmar.to_csv(export_path, index=False)
 
-    if exportpkl:
-        print("Pickling File")
-        with Path(datapath, f"cpsmar{year}.pkl").open("wb") as f:
-            pickle.dump(cps_list, f)
+    if exportcache:
+        print("Caching File")
+        cps_households.to_arrow(
+            Path(datapath, f"cpsmar{year}.arrow"),
+            **cache_metadata(dat_file, parsing_dict, benefits, year),
+        )
 
-    return cps_list
+    return cps_households
@@ -1,24 +1,26 @@
 import pandas as pd
 import pickle
-import requests
 import zipfile
-import io
-import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from . import validation
 from pathlib import Path
-from tqdm import tqdm
-from .pycps import pycps
+from .pycps import pycps, iter_units
 from .splitincome import split_income
 from .targeting import target
 from .impute import imputation
 from .benefits import distribute_benefits
 from .cps_meta import CPS_META_DATA, C_TAM_YEARS
-from .cpsmar import create_cps
+from .transform_sas import load_plans
+from .cpsmar import create_cps, read_cache, iter_cps, ITER_CHUNK
+from ..artifacts import resolve
+from ..datafiles import apply_schema
 
 CUR_PATH = Path(__file__).resolve().parent
 _DATA_PATH = Path(CUR_PATH, "data")
 with Path(CUR_PATH, "master_cps_dict.pkl").open("rb") as f:
     PARSE_DICT = pickle.load(f)
+PARSE_PLANS = load_plans(PARSE_DICT)
 # default list of which CPS files to use
 CPS_FILES = [2013, 2014, 2015]
 
@@ -26,12 +28,15 @@ CPS_FILES = [2013, 2014, 2015]
 def create(
     datapath,
     exportcsv: bool = False,
-    exportpkl: bool = False,
+    exportcache: bool = False,
     exportraw: bool = True,
     validate: bool = False,
     benefits: bool = True,
     verbose: bool = False,
     cps_files: list = CPS_FILES,
+    workers: int = 1,
+    engine: str = "record",
+    exportfactors: bool = False,
 ):
     """
     Logic for creating tax units from the CPS
@@ -41,8 +46,8 @@ def create(
               will also look in this directory for the CPS files it needs to
               run
     exportcsv: if True, the raw CPS file will be exported as a CSV
-    exportpkl: if True, the list version of the CPS used to create the tax
-               units will be saved as a pickle file
+    exportcache: if True, the converted CPS used to create the tax units
+                 will be saved as a columnar cache file
     exportraw: if True, the CPS file that has not been modified will be
                saved as a CSV
     validate: if True, validation tests will be run on the tax units to ensure
@@ -53,66 +58,37 @@ def create(
     verbose: if True, additional progress information will be printed as the
              scripts run
     cps_files: list containing which years of the CPS you want to use
+    workers: number of processes used to convert the CPS files and create
+             their tax units. Each year is handled by its own process and
+             any remaining workers are used to create each year's tax units
+             in parallel. Results are always combined in the order of
+             `cps_files`
+    engine: "record" to create the tax units one household at a time or
+            "vectorized" to use the array based engine in batchunits.py
+    exportfactors: if True, the state targeting factors will be saved to
+                   taxdata/cps/state_factors.csv
     """
-    # add progress_apply to pandas if user wants to validate
-    if validate:
-        tqdm.pandas()
-    # look for pickled versions of the converted CPS files
-    cps_dfs = {}
     for year in cps_files:
-        _benefits = benefits
-        if year not in C_TAM_YEARS:
-            _benefits = False
-            if benefits:
-                msg = (
-                    f"C-TAM imputed benefits are not available for {year}. "
-                    "Creating file with benefits reported in the CPS."
-                )
-                print(msg)
-        try:
-            meta = CPS_META_DATA[year]
-        except KeyError:
+        if year not in CPS_META_DATA:
             msg = f"Using the {year} CPS is not yet supported."
             raise KeyError(msg)
-        # potential path to pickled CPS file
-        pkl_path = Path(datapath, f"cpsmar{year}.pkl")
-        # check and see if pickled version of this year's CPS has been created
-        if pkl_path.exists():
-            print("Reading Pickled File")
-            cps_dfs[year] = pickle.load(pkl_path.open("rb"))
-        else:
-            # check if .dat file exists, and, if not, download it
-            data_file = Path(
-                os.path.join(datapath, "asec" + str(year) + "_pubuse.dat")
-            )
-            if data_file.exists():
-                pass
-            else:
-                cpsmar_url = (
-                    "http://data.nber.org/cps/cpsmar" + str(year) + ".zip"
-                )
-                r = requests.get(cpsmar_url)
-                z = zipfile.ZipFile(io.BytesIO(r.content))
-                z.extractall(datapath)
-            # convert the DAT file
-            cps_dfs[year] = create_cps(
-                Path(datapath, meta["dat_file"]),
-                year=year,
-                parsing_dict=PARSE_DICT[year],
-                benefits=_benefits,
-                exportpkl=exportpkl,
-                exportcsv=exportcsv,
-                datapath=datapath,
-            )
-
-    # create tax units
-    _units = []
-    for year in cps_files:
-        print(f"Creating Tax Units for {year}")
-        _yr_units = pycps(cps_dfs[year], year, verbose)
-        if validate:
-            validate_cps_units(cps_dfs[year], _yr_units, year)
-        _units.append(_yr_units)
+    _create_year = partial(
+        create_year,
+        datapath=datapath,
+        exportcsv=exportcsv,
+        exportcache=exportcache,
+        validate=validate,
+        benefits=benefits,
+        verbose=verbose,
+        workers=max(1, workers // len(cps_files)),
+        engine=engine,
+    )
+    year_workers = min(workers, len(cps_files))
+    if year_workers > 1:
+        with ProcessPoolExecutor(max_workers=year_workers) as executor:
+            _units = list(executor.map(_create_year, cps_files))
+    else:
+        _units = [_create_year(year) for year in cps_files]
 
     # create a single DataFrame
     print("Combining tax units")
@@ -136,8 +112,10 @@ def create(
     data = imputation(data, logit_betas, ols_betas)
     # target state totals
     print("Targeting State Level Data")
-    STATE_DATA_LINK = "https://www.irs.gov/pub/irs-soi/14in54cmcsv.csv"
-    data = target(data, STATE_DATA_LINK)
+    factors_path = (
+        Path(CUR_PATH, "state_factors.csv") if exportfactors else None
+    )
+    data = target(data, resolve("irs_soi_state_2014"), factors_path)
     # add other benefit data
     print("Adding Benefits")
     other_ben = pd.read_csv(
@@ -147,21 +125,116 @@ def create(
     return data
 
 
+def create_year(
+    year,
+    datapath,
+    exportcsv: bool = False,
+    exportcache: bool = False,
+    validate: bool = False,
+    benefits: bool = True,
+    verbose: bool = False,
+    workers: int = 1,
+    engine: str = "record",
+) -> pd.DataFrame:
+    """
+    Convert a single year of the CPS and create its tax units. `workers` is
+    the number of processes used to create the tax units and `engine` is the
+    engine used to create them. See `create` for a description of the other
+    parameters
+    """
+    _benefits = benefits
+    if year not in C_TAM_YEARS:
+        _benefits = False
+        if benefits:
+            msg = (
+                f"C-TAM imputed benefits are not available for {year}. "
+                "Creating file with benefits reported in the CPS."
+            )
+            print(msg)
+    meta = CPS_META_DATA[year]
+    dat_path = Path(datapath, meta["dat_file"])
+    # check and see if an up to date cached version of this year's CPS
+    # has been created
+    cache_path = Path(datapath, f"cpsmar{year}.arrow")
+    raw_cps = read_cache(
+        cache_path, dat_path, PARSE_DICT[year], _benefits, year
+    )
+    if raw_cps is not None:
+        print("Read Cached File")
+    else:
+        # check if .dat file exists, and, if not, extract it
+        if not dat_path.exists():
+            extract_cps(year, datapath)
+        # convert the DAT file
+        raw_cps = create_cps(
+            dat_path,
+            year=year,
+            parsing_dict=PARSE_DICT[year],
+            benefits=_benefits,
+            parse_plan=PARSE_PLANS[year],
+            exportcache=exportcache,
+            exportcsv=exportcsv,
+            datapath=datapath,
+        )
+
+    # create tax units
+    print(f"Creating Tax Units for {year}")
+    units = pycps(raw_cps, year, verbose, workers=workers, engine=engine)
+    if validate:
+        validate_cps_units(raw_cps, units, year)
+    # use the smallest dtypes allowed by records_metadata.json
+    return apply_schema(units)
+
+
+def stream_year(
+    year,
+    datapath,
+    benefits: bool = True,
+    chunksize: int = ITER_CHUNK,
+    engine: str = "record",
+):
+    """
+    Convert a single year of the CPS and yield its tax units in DataFrames
+    with the units for `chunksize` households at a time. Households are
+    converted as the tax units are created, so the full CPS is never held in
+    memory. See `create` for a description of the other parameters
+    """
+    if year not in C_TAM_YEARS:
+        benefits = False
+    dat_path = Path(datapath, CPS_META_DATA[year]["dat_file"])
+    if not dat_path.exists():
+        extract_cps(year, datapath)
+    cps_chunks = iter_cps(
+        dat_path,
+        year,
+        PARSE_DICT[year],
+        benefits,
+        chunksize=chunksize,
+        parse_plan=PARSE_PLANS[year],
+    )
+    for units in iter_units(cps_chunks, year, engine=engine):
+        yield apply_schema(units)
+
+
+def extract_cps(year, datapath):
+    """
+    Extract the .dat file for `year` from the NBER CPS zip file in the
+    artifact store, downloading the zip file if the store doesn't have it
+    """
+    with zipfile.ZipFile(resolve(f"cpsmar{year}")) as z:
+        z.extractall(datapath)
+
+
 def validate_cps_units(raw_cps, units, year):
     """
     Function to handle all of the validation logic
     """
     print(f"Validating for {year}")
-    gdf = units.groupby("h_seq")
-    num_errors = 0
-    # Loop through each household
-    for hh in tqdm(raw_cps):
-        h_seq = hh[0]["h_seq"]
-        hh_units = gdf.get_group(h_seq)
-        num_errors += validation.compare(hh_units, hh, h_seq, year)
+    report = validation.compare(raw_cps.people, units, year)
+    num_errors = report.loc[report["error"], "h_seq"].nunique()
     if num_errors > 0:
         save_path = Path(CUR_PATH, f"errors{year}.csv")
-        save_path.write_text(validation.output_str)
+        report.to_csv(save_path, index=False)
         print(f"Number of errors for {year}: {num_errors}")
         print(f"A CSV file with these errors can be found in {save_path}")
         raise RuntimeError(f"Errors found in the tax unit creation for {year}")
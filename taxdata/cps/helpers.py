@@ -1,8 +1,13 @@
+import json
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+from pyarrow import feather
 from pathlib import Path
-from functools import reduce
+from functools import lru_cache
+from typing import NamedTuple
 from paramtools.parameters import Parameters
+from ..hashing import file_hashes
 
 CUR_PATH = Path(__file__).resolve().parent
 DATA_PATH = Path(CUR_PATH, "data")
@@ -22,6 +27,21 @@ C_TAM_BENEFIT_TUPLES = [
     ("wic_impute", "wic_ben"),
     ("ss_impute", "e02400"),
 ]
+# C-TAM imputation files with person level benefits. The file prefix,
+# variable in the file, and the name of the variable in the CPS
+PERSON_BENEFITS = [
+    ("medicaid", "MedicaidX", "MedicaidX"),
+    ("medicare", "MedicareX", "MedicareX"),
+    ("VB_Imputation", "vb_impute", "vb_impute"),
+    ("SSI_Imputation", "ssi_impute", "ssi_impute"),
+    ("SS_augmentation_", "ss_val", "ss_impute"),
+    ("TANF_Imputation_", "tanf_impute", "tanf_impute"),
+    ("UI_imputation_logreg_", "UI_impute", "UI_impute"),
+]
+# person level benefit variables added to the CPS
+PERSON_BENEFIT_VARS = [var_name for _, _, var_name in PERSON_BENEFITS] + [
+    "wic_impute"
+]
 CPS_BENEFIT_TUPLES = [
     ("ssi_val", "ssi_ben"),
     ("tanf_val", "tanf_ben"),
@@ -50,82 +70,203 @@ def log(data, var):
     return np.log(1.0 + np.maximum(0.0, data[var]))
 
 
-def read_benefits(year):
+class BenefitTables(NamedTuple):
+    """
+    C-TAM imputed benefits for one year of the CPS
+    person: DataFrame with the person level imputations, indexed by
+            `peridnum_index`. People missing from an imputation file are NaN.
+            Includes the three WIC imputations that make up wic_impute
+    snap: DataFrame with the SNAP imputations, indexed by h_seq
+    housing: DataFrame with the housing imputations, indexed by fh_seq and
+             ffpos
+    """
+
+    person: pd.DataFrame
+    snap: pd.DataFrame
+    housing: pd.DataFrame
+
+
+def read_benefits(year, data_path=None):
+    """
+    Read in all C-TAM imputed benefits for `year` and return them as a
+    BenefitTables instance. The tables are cached in `data_path` as Feather
+    files, which are rebuilt when any of the C-TAM CSV files change. Results
+    are also cached in memory until the C-TAM files change, and each call
+    returns its own copy of the tables so callers can modify them
+    """
+    data_path = Path(data_path or DATA_PATH)
+    source_hashes = benefit_hashes(year, data_path)
+    tables = _read_benefits(
+        year, data_path, tuple(sorted(source_hashes.items()))
+    )
+    return BenefitTables(*(table.copy() for table in tables))
+
+
+@lru_cache(maxsize=None)
+def _read_benefits(year, data_path, source_hashes):
+    """
+    Read the benefit tables for `read_benefits`. `source_hashes` holds the
+    hashes of the C-TAM files as (file name, hash) pairs so that the tables
+    are only reused while the files are unchanged
+    """
+    source_hashes = dict(source_hashes)
+    tables = read_benefit_cache(year, data_path, source_hashes)
+    if tables is None:
+        tables = read_benefit_csvs(year, data_path)
+        try:
+            write_benefit_cache(tables, year, data_path, source_hashes)
+        except OSError:
+            # the data directory isn't writable. Use the tables without
+            # caching them
+            pass
+    return tables
+
+
+def benefit_hashes(year, data_path=None):
+    """
+    Hashes of the C-TAM imputation files for `year`, keyed by file name
+    """
+    paths = benefit_files(year, Path(data_path or DATA_PATH))
+    return {
+        path.name: file_hash
+        for path, file_hash in file_hashes(paths, workers=4).items()
+    }
+
+
+def benefit_files(year, data_path):
+    """
+    Paths to all of the C-TAM imputation files for `year`
+    """
+    prefixes = [path_prefix for path_prefix, _, _ in PERSON_BENEFITS]
+    prefixes += [
+        "WIC_imputation_children_logreg_",
+        "WIC_imputation_infants_logreg_",
+        "WIC_imputation_women_logreg_",
+        "SNAP_Imputation_",
+        "Housing_Imputation_logreg_",
+    ]
+    return [Path(data_path, f"{prefix}{year}.csv") for prefix in prefixes]
+
+
+def benefit_cache_path(year, data_path, table):
+    return Path(data_path, f"ctam_benefits{year}_{table}.feather")
+
+
+def read_benefit_cache(year, data_path, source_hashes):
+    """
+    Read the cached benefit tables. Returns None if they don't exist or were
+    created from different C-TAM files
+    """
+    tables = []
+    for table in BenefitTables._fields:
+        path = benefit_cache_path(year, data_path, table)
+        if not path.exists():
+            return None
+        arrow_table = feather.read_table(path)
+        metadata = json.loads(arrow_table.schema.metadata[b"taxdata"])
+        if metadata["source_hashes"] != source_hashes:
+            return None
+        tables.append(arrow_table.to_pandas().set_index(metadata["index"]))
+    return BenefitTables(*tables)
+
+
+def write_benefit_cache(tables, year, data_path, source_hashes):
+    """
+    Save each of the benefit tables as a Feather file along with the hashes
+    of the C-TAM files they were created from
+    """
+    for table, data in zip(BenefitTables._fields, tables):
+        metadata = {
+            "source_hashes": source_hashes,
+            "index": list(data.index.names),
+        }
+        arrow_table = pa.Table.from_pandas(
+            data.reset_index(), preserve_index=False
+        )
+        arrow_table = arrow_table.replace_schema_metadata(
+            {b"taxdata": json.dumps(metadata).encode()}
+        )
+        feather.write_feather(
+            arrow_table, str(benefit_cache_path(year, data_path, table))
+        )
+
+
+def read_benefit_csvs(year, data_path):
     """
-    Read in all C-TAM imputed benefits. Convert them to dictionaries for
-    faster lookups
+    Read in all of the C-TAM imputation files for `year`
     """
 
     def read_ben(path_prefix, usecols, index_col=None):
-        path = Path(DATA_PATH, path_prefix + str(year) + ".csv")
+        path = Path(data_path, path_prefix + str(year) + ".csv")
         return pd.read_csv(path, usecols=usecols, index_col=index_col)
 
-    # Set global variables so they can be accested later
-    global MCAID, MCARE, VB, SNAP, SSI, SS, HOUSING, TANF, UI, WIC
     # read in benefit imputations
-    MCAID = read_ben(
-        "medicaid", ["MedicaidX", "peridnum"], "peridnum"
-    ).to_dict("index")
-    MCARE = read_ben(
-        "medicare", ["MedicareX", "peridnum"], "peridnum"
-    ).to_dict("index")
-    VB = read_ben(
-        "VB_Imputation", ["vb_impute", "peridnum"], "peridnum"
-    ).to_dict("index")
-    SNAP = read_ben(
-        "SNAP_Imputation_", ["h_seq", "snap_impute"], "h_seq"
-    ).to_dict("index")
-    SSI = read_ben(
-        "SSI_Imputation", ["ssi_impute", "peridnum"], "peridnum"
-    ).to_dict("index")
-    SS = (
-        read_ben("SS_augmentation_", ["ss_val", "peridnum"], "peridnum")
-        .rename(columns={"ss_val": "ss_impute"})
-        .to_dict("index")
-    )
-    HOUSING = read_ben(
-        "Housing_Imputation_logreg_",
-        ["fh_seq", "ffpos", "housing_impute"],
-        None,
-    )
-    # make a unique index from fh_seq and ffpos
-    HOUSING["index"] = HOUSING["fh_seq"].astype(str) + HOUSING["ffpos"].astype(
-        str
-    )
-    HOUSING.set_index("index", inplace=True)
-    HOUSING = HOUSING.to_dict("index")
-    # TODO: Look up how to drop duplicated index
-    TANF = read_ben(
-        "TANF_Imputation_", ["peridnum", "tanf_impute"], "peridnum"
-    )
-    # drop duplicated people in tanf
-    TANF = TANF.loc[~TANF.index.duplicated(keep="first")]
-    TANF = TANF.to_dict("index")
-    UI = read_ben(
-        "UI_imputation_logreg_", ["peridnum", "UI_impute"], "peridnum"
-    ).to_dict("index")
+    person_ben = []
+    for path_prefix, file_var, var_name in PERSON_BENEFITS:
+        ben = read_ben(path_prefix, ["peridnum", file_var], "peridnum")
+        if var_name == "tanf_impute":
+            # drop duplicated people in tanf
+            ben = ben.loc[~ben.index.duplicated(keep="first")]
+        check_unique(ben, path_prefix + str(year))
+        person_ben.append(ben.rename(columns={file_var: var_name}))
 
     WIC_STR = "WIC_imputation_{}_logreg_"
-    wic_children = read_ben(
-        WIC_STR.format("children"), ["peridnum", "WIC_impute"]
-    ).rename(columns={"WIC_impute": "wic_children"})
-    wic_infants = read_ben(
-        WIC_STR.format("infants"), ["peridnum", "WIC_impute"]
-    ).rename(columns={"WIC_impute": "wic_infants"})
-    wic_women = read_ben(
-        WIC_STR.format("women"), ["peridnum", "WIC_impute"]
-    ).rename(columns={"WIC_impute": "wic_women"})
-
-    # combine all WIC imputation into one variable
-    WIC = reduce(
-        lambda left, right: pd.merge(left, right, on="peridnum"),
-        [wic_children, wic_infants, wic_women],
-    )
+    wic = []
+    for group in ["children", "infants", "women"]:
+        path_prefix = WIC_STR.format(group)
+        ben = read_ben(path_prefix, ["peridnum", "WIC_impute"], "peridnum")
+        check_unique(ben, path_prefix + str(year))
+        wic.append(ben.rename(columns={"WIC_impute": f"wic_{group}"}))
+    # combine all WIC imputation into one variable. Only people in all three
+    # files are kept
+    WIC = pd.concat(wic, axis=1, join="inner")
     WIC["wic_impute"] = WIC[["wic_women", "wic_infants", "wic_children"]].sum(
         axis=1
     )
-    # Set index to pernumid
-    WIC = WIC.set_index("peridnum")
-    WIC = WIC.to_dict("index")
+    person_ben.append(WIC)
+    # join every person level imputation in one pass
+    person_ben = pd.concat(person_ben, axis=1)
+    person_ben.index = peridnum_index(person_ben.index)
 
-    return MCAID, MCARE, VB, SNAP, SSI, SS, HOUSING, TANF, UI, WIC
+    snap = read_ben("SNAP_Imputation_", ["h_seq", "snap_impute"], "h_seq")
+    housing = read_ben(
+        "Housing_Imputation_logreg_",
+        ["fh_seq", "ffpos", "housing_impute"],
+        ["fh_seq", "ffpos"],
+    )
+    check_unique(snap, f"SNAP_Imputation_{year}")
+    check_unique(housing, f"Housing_Imputation_logreg_{year}")
+
+    return BenefitTables(person_ben, snap, housing)
+
+
+def check_unique(data, name, max_ids=10):
+    """
+    Raise a ValueError listing the IDs that appear more than once in the
+    index of `data`. Joining on duplicated IDs would add rows to the CPS
+
+    Parameters
+    ----------
+    data: DataFrame indexed by the IDs used to join it
+    name: name of the file or table used in the error message
+    max_ids: maximum number of duplicated IDs included in the message
+    """
+    duplicated = data.index[data.index.duplicated()].unique()
+    if len(duplicated):
+        ids = ", ".join(str(_id) for _id in duplicated[:max_ids])
+        raise ValueError(f"{name} has {len(duplicated)} duplicated IDs: {ids}")
+
+
+def peridnum_index(peridnum):
+    """
+    Split PERIDNUM, which is too large to store in an int64, into two int64
+    keys that can be used to join the C-TAM imputations to the CPS
+    """
+    peridnum = np.array([int(p) for p in peridnum], dtype=object)
+    return pd.MultiIndex.from_arrays(
+        [
+            (peridnum // 10**11).astype(np.int64),
+            (peridnum % 10**11).astype(np.int64),
+        ],
+        names=["peridnum_hi", "peridnum_lo"],
+    )
@@ -2,192 +2,266 @@ import pandas as pd
 import numpy as np
 from scipy.stats import norm
 from .helpers import log, LOG_VARS, X_VARS, filingparams, cps_yr_idx
+from ..rng import generator
+from .. import features
+
+# parameters used in the logit/ols imputations
+IMPUTATION_PARAMS = {
+    "CGAGIX": {
+        "x_vars": [
+            "lntot_inc",
+            "joint_filer",
+            "fam_size",
+            "lninterest",
+            "lndivs",
+            "lne01500",
+            "constant",
+        ],
+        "logit_betas": "cg_logit",
+        "ols_betas": "cg_ols",
+        "l_adj": 0.065,
+        "o_adj": 1.95,
+        "prob_mult": 1.0,
+    },
+    "TIRAD": {
+        "x_vars": X_VARS,
+        "logit_betas": "ira_logit",
+        "ols_betas": "ira_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.7,
+        "prob_mult": 1.25,
+    },
+    "ADJIRA": {
+        "x_vars": X_VARS,
+        "logit_betas": "irac_logit",
+        "ols_betas": "irac_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.0,
+        "prob_mult": 0.06,
+    },
+    "KEOGH": {
+        "x_vars": X_VARS,
+        "logit_betas": "sep_logit",
+        "ols_betas": "sep_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.0,
+        "prob_mult": 1.0,
+    },
+    "SEHEALTH": {
+        "x_vars": X_VARS,
+        "logit_betas": "sehi_logit",
+        "ols_betas": "sehi_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.0,
+        "prob_mult": 1.6,
+    },
+    "SLINT": {
+        "x_vars": X_VARS,
+        "logit_betas": "sl_logit",
+        "ols_betas": "sl_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.0,
+        "prob_mult": 1.1,
+    },
+    "CDC": {
+        "x_vars": X_VARS,
+        "logit_betas": "cdc_logit",
+        "ols_betas": "cdc_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.0,
+        "prob_mult": 1.0,
+    },
+    "MEDEX": {
+        "x_vars": X_VARS,
+        "logit_betas": "medex_logit",
+        "ols_betas": "medex_ols",
+        "l_adj": 0.0,
+        "o_adj": 1.0,
+        "prob_mult": 1.0,
+    },
+}
+# parameters used in the tobit imputations
+TOBIT_XVARS = ["lntot_inc", "joint_filer", "fam_size", "agede", "constant"]
+TOBIT_PARAMS = {
+    "CHARITABLE": {"betas": "char_ols", "sigma": 48765.45, "prob_mult": 1.0},
+    "MISCITEM": {"betas": "misc_ols", "sigma": 14393.99, "prob_mult": 0.3},
+}
+# every x variable used in the imputations
+ALL_X_VARS = list(
+    dict.fromkeys(
+        [x for params in IMPUTATION_PARAMS.values() for x in params["x_vars"]]
+        + TOBIT_XVARS
+    )
+)
 
 
-def impute(df, logit_betas, ols_betas, x_vars, l_adj, o_adj, prob_mult):
+def beta_matrix(betas, x_vars):
+    """
+    Stack the coefficients of several regressions into one matrix
+
+    Parameters
+    ----------
+    betas: list of Series with the coefficients of each regression
+    x_vars: list with the x variables used in each regression
+
+    Returns
+    -------
+    Array with a row for each variable in ALL_X_VARS and a column for each
+    regression. Variables not used in a regression have a coefficient of zero
+    """
+    matrix = np.zeros((len(ALL_X_VARS), len(betas)))
+    for j, (_betas, _x_vars) in enumerate(zip(betas, x_vars)):
+        rows = [ALL_X_VARS.index(x) for x in _x_vars]
+        matrix[rows, j] = _betas[_x_vars].to_numpy(dtype=np.float64)
+    return matrix
+
+
+def impute(logit_xb, ols_xb, l_adj, o_adj, prob_mult, z1, z2):
     """
     This function first determines if a given record would have claimed a
-    deduction, then determines the value of that deduction for each record
+    deduction, then determines the value of that deduction for each record.
+    Each argument can hold a column for each of several imputed variables
 
     Parameters
     ----------
-    df: dataframe will all of the records
-    logit_betas: beta coefficients from the logit model
-    ols_betas: beta coefficients from the ols model
-    x_vars: x variables used in the imputation
+    logit_xb: linear predictor from the logit model
+    ols_xb: linear predictor from the ols model
     l_adj: specific adjustment added when determining logit probabilities
     o_adj: specific adjustment added during ols calculations
     prob_mult: multiplier for the probabilities from the logit model
+    z1: uniform random numbers used to flag which records are imputed
+    z2: standard normal random numbers used in the ols calculations
 
     Returns
     -------
     Array of imputed values
     """
     # calculate probability using coefficients from the logit model
-    xb = np.zeros(len(df))
-    for param in x_vars:
-        xb += df[param] * logit_betas[param]
-    prob = np.exp(xb) / (1.0 + np.exp(xb)) + l_adj
+    exp_xb = np.exp(logit_xb)
+    prob = exp_xb / (1.0 + exp_xb) + l_adj
     prob *= prob_mult
 
     # flag which records should recieve and imputation
-    z1 = np.random.uniform(0, 1, len(prob))
-    df["impute"] = np.where(z1 <= prob, 1, 0)
     impute = np.where(z1 <= prob, 1, 0)
-    z2 = np.random.randn(len(prob))
-    xb = np.zeros(len(df))
-    for param in x_vars:
-        xb += df[param] * ols_betas[param]
-    val = np.exp(xb + o_adj * z2) * impute
+    val = np.exp(ols_xb + o_adj * z2) * impute
     return val
 
 
-def tobit(cps, betas, x_vars, sigma, prob_mult):
+def tobit(xb, sigma, prob_mult, z1):
     """
-    Impute values using a tobit model
+    Impute values using a tobit model. Each argument can hold a column for
+    each of several imputed variables
 
     Parameters
     ----------
-    cps: DataFrame with all CPS records
-    betas: beta coefficients from the tobit regression
-    x_vars: x variables used in the imputations
+    xb: linear predictor from the tobit regression
     sigma: value used in tobit calculations
     prob_mult: multiplier for probability values
+    z1: uniform random numbers used to flag which records are imputed
 
     Returns
     -------
     val: an array of values for the imputed variable
     """
-    xb = np.zeros(len(cps))
-    for param in x_vars:
-        xb += cps[param] * betas[param]
-
-    prob = norm.cdf(xb / sigma) * prob_mult
-    z1 = np.random.uniform(0, 1, len(prob))
+    cdf = norm.cdf(xb / sigma)
+    prob = cdf * prob_mult
     impute = np.where(z1 <= prob, 1, 0)
-    lamb = norm.pdf(xb / sigma) / norm.cdf(xb / sigma)
+    lamb = norm.pdf(xb / sigma) / cdf
     val = (xb + sigma * lamb) * impute
     return val
 
 
-def imputation(data, logit_betas, ols_betas):
+def regressors(data):
     """
-    This function uses beta values calculated using the IRS Public Use File
-    to impute the value of certain itemized deductions for filing records
+    Feature store with the regressors used in the imputations. The number
+    of elderly people in each unit, agede, is also added to `data` because
+    the statistical match in createpuf.py uses it
     """
-    # data prep
-    # find log of specified variables
-    for var in LOG_VARS:
-        # use lowercase because CPS uses lowercase at this stage
-        data[f"ln{var.lower()}"] = log(data, var.lower())
-
-    data["joint_filer"] = np.where(data["mars"] == 2, 1, 0)
+    elderly_age = filingparams.elderly_age[cps_yr_idx]
+    # find log of specified variables. Use lowercase because CPS uses
+    # lowercase at this stage
+    _features = {
+        f"ln{var.lower()}": log(data, var.lower()) for var in LOG_VARS
+    }
+    _features["joint_filer"] = np.where(data["mars"] == 2, 1, 0)
     # cap family size at 5 to match with the PUF
-    data["fam_size"] = np.minimum(data["XTOT"], 5)
-    data["agede"] = (
-        data["age_head"] >= filingparams.elderly_age[cps_yr_idx]
-    ).astype(int) + (
-        data["age_spouse"] >= filingparams.elderly_age[cps_yr_idx]
-    ).astype(
-        int
-    )
-    data["constant"] = np.ones(len(data))
+    _features["fam_size"] = np.minimum(data["XTOT"], 5)
+    agede = (data["age_head"] >= elderly_age).astype(int) + (
+        data["age_spouse"] >= elderly_age
+    ).astype(int)
+    _features["agede"] = agede
+    _features["constant"] = 1.0
+    data["agede"] = agede
+    return features.build(_features, len(data))
 
-    np.random.seed(5410)  # set random seed before imputations
 
-    # calculate imputations
-    # dictionary to hold parameters used in logit/ols imputations
-    IMPUTATION_PARAMS = {
-        "CGAGIX": {
-            "x_vars": [
-                "lntot_inc",
-                "joint_filer",
-                "fam_size",
-                "lninterest",
-                "lndivs",
-                "lne01500",
-                "constant",
-            ],
-            "logit_betas": logit_betas["cg_logit"],
-            "ols_betas": ols_betas["cg_ols"],
-            "l_adj": 0.065,
-            "o_adj": 1.95,
-            "prob_mult": 1.0,
-        },
-        "TIRAD": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["ira_logit"],
-            "ols_betas": ols_betas["ira_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.7,
-            "prob_mult": 1.25,
-        },
-        "ADJIRA": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["irac_logit"],
-            "ols_betas": ols_betas["irac_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.0,
-            "prob_mult": 0.06,
-        },
-        "KEOGH": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["sep_logit"],
-            "ols_betas": ols_betas["sep_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.0,
-            "prob_mult": 1.0,
-        },
-        "SEHEALTH": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["sehi_logit"],
-            "ols_betas": ols_betas["sehi_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.0,
-            "prob_mult": 1.6,
-        },
-        "SLINT": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["sl_logit"],
-            "ols_betas": ols_betas["sl_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.0,
-            "prob_mult": 1.1,
-        },
-        "CDC": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["cdc_logit"],
-            "ols_betas": ols_betas["cdc_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.0,
-            "prob_mult": 1.0,
-        },
-        "MEDEX": {
-            "x_vars": X_VARS,
-            "logit_betas": logit_betas["medex_logit"],
-            "ols_betas": ols_betas["medex_ols"],
-            "l_adj": 0.0,
-            "o_adj": 1.0,
-            "prob_mult": 1.0,
-        },
-    }
-
-    for var, params in IMPUTATION_PARAMS.items():
-        data[var] = impute(data, **params)
+def imputation(data, logit_betas, ols_betas, chunk=0):
+    """
+    This function uses beta values calculated using the IRS Public Use File
+    to impute the value of certain itemized deductions for filing records.
+    Each variable is imputed with its own random numbers, selected by the
+    variable's name and `chunk`, the index of the chunk of records in `data`
+    """
+    # data prep
+    store = regressors(data)
 
-    # tobit models
-    TOBIT_XVARS = ["lntot_inc", "joint_filer", "fam_size", "agede", "constant"]
+    # calculate the linear predictors for every logit, ols, and tobit
+    # regression with a single matrix multiplication
+    X = store.matrix(ALL_X_VARS)
+    imp_vars = list(IMPUTATION_PARAMS)
+    tobit_vars = list(TOBIT_PARAMS)
+    params = list(IMPUTATION_PARAMS.values())
+    tobit_params = list(TOBIT_PARAMS.values())
+    betas = beta_matrix(
+        [logit_betas[p["logit_betas"]] for p in params]
+        + [ols_betas[p["ols_betas"]] for p in params]
+        + [ols_betas[p["betas"]] for p in tobit_params],
+        [p["x_vars"] for p in params] * 2 + [TOBIT_XVARS] * len(tobit_vars),
+    )
+    xb = X @ betas
+    num_imp = len(imp_vars)
+    logit_xb = xb[:, :num_imp]
+    ols_xb = xb[:, num_imp : 2 * num_imp]
+    tobit_xb = xb[:, 2 * num_imp :]
 
-    data["CHARITABLE"] = tobit(
-        data, ols_betas["char_ols"], TOBIT_XVARS, 48765.45, 1.0
+    # draw the random numbers for each variable and impute them all at once
+    z1 = np.empty((len(data), num_imp))
+    z2 = np.empty((len(data), num_imp))
+    for j, var in enumerate(imp_vars):
+        rng = generator("cps_imputation", var, chunk=chunk)
+        z1[:, j] = rng.uniform(0, 1, len(data))
+        z2[:, j] = rng.standard_normal(len(data))
+    imputed = impute(
+        logit_xb,
+        ols_xb,
+        np.array([p["l_adj"] for p in params]),
+        np.array([p["o_adj"] for p in params]),
+        np.array([p["prob_mult"] for p in params]),
+        z1,
+        z2,
+    )
+    tobit_z1 = np.column_stack(
+        [
+            generator("cps_imputation", var, chunk=chunk).uniform(
+                0, 1, len(data)
+            )
+            for var in tobit_vars
+        ]
     )
-    data["MISCITEM"] = tobit(
-        data, ols_betas["misc_ols"], TOBIT_XVARS, 14393.99, 0.3
+    tobit_imputed = tobit(
+        tobit_xb,
+        np.array([p["sigma"] for p in tobit_params]),
+        np.array([p["prob_mult"] for p in tobit_params]),
+        tobit_z1,
     )
+    for j, var in enumerate(imp_vars):
+        data[var] = imputed[:, j]
+    for j, var in enumerate(tobit_vars):
+        data[var] = tobit_imputed[:, j]
 
     # add imputed capital gains and IRA distributions to total income
     data["tot_inc"] += data["CGAGIX"] + data["TIRAD"]
-    data["lntot_inc"] = log(data, "tot_inc")
+    lntot_inc = log(data, "tot_inc")
 
     # DPAD imputations
     dpad_indicator = np.where((data["e00900"] > 0) | (data["rents"] > 0), 1, 0)
@@ -203,9 +277,8 @@ def imputation(data, logit_betas, ols_betas):
         1_000_000,
         np.inf,
     ]
-    dpad_bin = pd.cut(
-        data["tot_inc"], DPAD_BINS, labels=np.arange(1, 10), right=False
-    )
+    # index of each record's bin
+    dpad_bin = pd.cut(data["tot_inc"], DPAD_BINS, labels=False, right=False)
     DPAD_probs = [
         0.01524,
         0.00477,
@@ -217,36 +290,32 @@ def imputation(data, logit_betas, ols_betas):
         0.26060,
         0.54408,
     ]
-    dpad_prob_dict = {x: prob for x, prob in zip(range(1, 10), DPAD_probs)}
-    dpad_prob = (
-        pd.Series([dpad_prob_dict[x] for x in dpad_bin]) * dpad_indicator
-    )
+    dpad_prob = np.take(DPAD_probs, dpad_bin) * dpad_indicator
     DPAD_bases = [20686, 1784, 2384, 2779, 3312, 4827, 10585, 24358, 116_275]
-    dpad_base_dict = {x: base for x, base in zip(range(1, 10), DPAD_bases)}
-    dpad_base = (
-        pd.Series([dpad_base_dict[x] for x in dpad_bin]) * dpad_indicator
-    )
+    dpad_base = np.take(DPAD_bases, dpad_bin) * dpad_indicator
 
     _prob = dpad_prob * 0.7
-    z1 = np.random.uniform(0, 1, len(dpad_prob))
-    z2 = np.random.randn(len(dpad_base))
+    rng = generator("cps_imputation", "DPAD", chunk=chunk)
+    z1 = rng.uniform(0, 1, len(dpad_prob))
+    z2 = rng.standard_normal(len(dpad_base))
     data["DPAD"] = np.where(z1 < _prob, dpad_base + 0.25 * z2, 0.0)
 
     # interest paid calculations
-    married = (data["mars"] == 2).astype(int)
+    married = store.column("joint_filer")
+    fam_size = store.column("fam_size")
     ln_value = (
         0.006_494 * data["age_head"]
-        + 0.017_019_7 * data["fam_size"]
+        + 0.017_019_7 * fam_size
         + 0.115_021_7 * married
-        + 0.437_268_1 * data["lntot_inc"]
+        + 0.437_268_1 * lntot_inc
         + 6.753_875
     )
     home_value = np.exp(ln_value)
     ratio = (
         -0.011_593_5 * data["age_head"]
-        + 0.013_810_9 * data["fam_size"]
+        + 0.013_810_9 * fam_size
         + -0.033_663_7 * married
-        + 0.016_380_5 * data["lntot_inc"]
+        + 0.016_380_5 * lntot_inc
         + 0.804_833_6
     )
     ratio = np.maximum(0, np.minimum(1, ratio))
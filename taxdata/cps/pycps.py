@@ -1,7 +1,12 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from operator import itemgetter
 from tqdm import tqdm
-from .taxunit import TaxUnit
+from . import batchunits
+from .cpsmar import CPSHouseholds
+from .taxunit import TaxUnit, COLUMNS
 from .helpers import filingparams, cps_yr_idx
 from .cps_meta import C_TAM_YEARS
 
@@ -15,19 +20,29 @@ INCOME_VARS = [
     "frse_val",
     "uc_val",
 ]
+# default number of households in each shard when creating tax units
+CHUNKSIZE = 2000
 
 
-def find_person(data: list, lineno: int) -> dict:
+def lineno_index(data: list) -> dict:
     """
-    Function to find a person in a list of dictionaries representing
-    individuals in the CPS
+    Build an index of the people in a household, keyed by their line number,
+    so that they can be found without searching through the household
     """
-    for person in data:
-        if person["a_lineno"] == lineno:
-            return person
-    # raise an error if they're never found
-    msg = f"Person with line number {lineno} not found in" f"household."
-    raise ValueError(msg)
+    return {person["a_lineno"]: person for person in data}
+
+
+def find_person(people: dict, lineno: int) -> dict:
+    """
+    Function to find a person in a household using the index created by
+    `lineno_index`
+    """
+    try:
+        return people[lineno]
+    except KeyError:
+        # raise an error if they're never found
+        msg = f"Person with line number {lineno} not found in" f"household."
+        raise ValueError(msg)
 
 
 def eic_eligible(
@@ -64,7 +79,7 @@ def eic_eligible(
 
 
 def find_claimer(
-    claimerno: int, head_lineno: int, a_lineno: int, data: list
+    claimerno: int, head_lineno: int, a_lineno: int, people: dict
 ) -> bool:
     """
     Determine if an individual is the dependent of the head of
@@ -75,13 +90,13 @@ def find_claimer(
     claimerno: line number of the person claiming the dependent
     head_lineno: line number of the head of the unit
     a_lineno: line number of person being evaluated
-    data: list of all the people in the household
+    people: index of the people in the household from `lineno_index`
     """
     # claimer is also the head of the unit
     if claimerno == head_lineno:
         return True
     # see if person is dependent or spouse of head
-    claimer = find_person(data, claimerno)
+    claimer = find_person(people, claimerno)
     spouse_dep = (
         claimer["a_spouse"] == claimerno | claimer["dep_stat"] == claimerno
     )
@@ -89,12 +104,12 @@ def find_claimer(
         return True
     # follow any potential spouse/dependent trails to find the one
     if claimer["dep_stat"] != 0:
-        claimer2 = find_person(data, claimer["dep_stat"])
+        claimer2 = find_person(people, claimer["dep_stat"])
         while True:
             if claimer2["a_lineno"] == claimerno:
                 return True
             if claimer2["dep_stat"] != 0:
-                claimer2 = find_person(data, claimer2["dep_stat"])
+                claimer2 = find_person(people, claimer2["dep_stat"])
             else:
                 break
     return False
@@ -188,6 +203,7 @@ def create_units(data, year, verbose=False, ctam_benefits=True):
     # we can avoid making children their own units just because
     # they're listed ahead of their parents
     data = sorted(data, key=itemgetter("ffpos", "a_famrel"))
+    people = lineno_index(data)
     hh_inc = 0  # sum up total income in the household. Used for HH status
     for person in data:
         hh_inc += person["tot_inc"]
@@ -206,7 +222,7 @@ def create_units(data, year, verbose=False, ctam_benefits=True):
             # loop through the rest of the household for
             # spouses and dependents
             if person["a_spouse"] != 0:
-                spouse = find_person(data, person["a_spouse"])
+                spouse = find_person(people, person["a_spouse"])
                 if verbose:
                     print("adding spouse", spouse["a_lineno"])
                 tu.add_spouse(spouse)
@@ -236,7 +252,7 @@ def create_units(data, year, verbose=False, ctam_benefits=True):
             aidx = 1
         if person["a_spouse"] != 0:
             midx = 2
-            spouse = find_person(data, person["a_spouse"])
+            spouse = find_person(people, person["a_spouse"])
             if spouse["a_age"] >= filingparams.elderly_age[cps_yr_idx]:
                 aidx += 1
         # earned income filing threshold
@@ -265,7 +281,7 @@ def create_units(data, year, verbose=False, ctam_benefits=True):
                 print(units[person["claimer"]].n24)
             units[person["a_lineno"]] = tu
 
-    return [unit.output() for unit in units.values()]
+    return [unit.record() for unit in units.values()]
 
 
 def _create_units(data, year, verbose=False, ctam_benefits=False):
@@ -280,6 +296,7 @@ def _create_units(data, year, verbose=False, ctam_benefits=False):
     # we can avoid making children their own units just because
     # they're listed ahead of their parents
     data = sorted(data, key=itemgetter("ffpos", "a_famrel"))
+    people = lineno_index(data)
     hh_inc = 0  # sum up total income in the household. Used for HH status
     for person in data:
         hh_inc += person["tot_inc"]
@@ -296,7 +313,7 @@ def _create_units(data, year, verbose=False, ctam_benefits=False):
             # loop through the rest of the household for
             # spouses and dependents
             if person["a_spouse"] != 0:
-                spouse = find_person(data, person["a_spouse"])
+                spouse = find_person(people, person["a_spouse"])
                 if verbose:
                     print("adding spouse", spouse["a_lineno"])
                 tu.add_spouse(spouse)
@@ -329,23 +346,121 @@ def _create_units(data, year, verbose=False, ctam_benefits=False):
                 print(units[person["claimer"]].n24)
             units[person["a_lineno"]] = tu
 
-    return [unit.output() for unit in units.values()]
+    return [unit.record() for unit in units.values()]
+
+
+def create_shard(cps, year, ctam_benefits) -> pd.DataFrame:
+    """
+    Create the tax units for a shard of households
+    Parameters
+    ----------
+    cps: households in the shard
+    year: tax year the tax units are created for
+    ctam_benefits: if True, use the C-TAM imputed benefits
+    """
+    tax_units = []
+    for hh in cps:
+        tax_units += create_units(hh, year, ctam_benefits=ctam_benefits)
+    return pd.DataFrame.from_records(tax_units, columns=COLUMNS[ctam_benefits])
 
 
-def pycps(cps: list, year: int, verbose: bool) -> pd.DataFrame:
+def vectorized_shard(cps, year, ctam_benefits) -> pd.DataFrame:
+    """
+    Create the tax units for a shard of households with the array based
+    engine in batchunits.py
+    Parameters
+    ----------
+    cps: households in the shard
+    year: tax year the tax units are created for
+    ctam_benefits: if True, use the C-TAM imputed benefits
+    """
+    people, household = person_table(cps)
+    return batchunits.create_units(
+        people, household, year, ctam_benefits=ctam_benefits
+    )
+
+
+SHARD_ENGINES = {"record": create_shard, "vectorized": vectorized_shard}
+
+
+def person_table(cps) -> tuple:
+    """
+    Return a DataFrame with everyone in the CPS and an array with the
+    household number of each person
+    """
+    if isinstance(cps, CPSHouseholds):
+        people = cps.people
+        sizes = np.diff(cps.offsets)
+    else:
+        people = pd.DataFrame([person for hh in cps for person in hh])
+        sizes = [len(hh) for hh in cps]
+    household = np.repeat(np.arange(len(sizes)), sizes)
+    return people, household
+
+
+def pycps(
+    cps: list,
+    year: int,
+    verbose: bool,
+    workers: int = 1,
+    chunksize: int = CHUNKSIZE,
+    engine: str = "record",
+) -> pd.DataFrame:
     """
     Core code for iterating through the households
     Parameters
     ----------
     cps: List where each element is a household in the CPS
+    year: year of the CPS
+    verbose: if True, print progress information
+    workers: number of processes used to create the tax units. Households
+             are split into shards of `chunksize` households and the tax
+             units from each shard are combined in the original household
+             order, so the results don't depend on the number of workers
+    chunksize: number of households in each shard
+    engine: "record" to create the tax units one household at a time or
+            "vectorized" to create them for a whole shard at once using the
+            array based engine in batchunits.py. With one worker, the
+            vectorized engine handles every household in a single shard
     """
-    tax_units = []
     ctam_benefits = True
     if year not in C_TAM_YEARS:
         ctam_benefits = False
-    for hh in tqdm(cps):
-        tax_units += create_units(hh, year - 1, ctam_benefits=ctam_benefits)
+    if engine not in SHARD_ENGINES:
+        msg = f"engine must be 'record' or 'vectorized', not '{engine}'"
+        raise ValueError(msg)
+    if engine == "vectorized" and workers <= 1:
+        chunksize = max(len(cps), 1)
+    shards = [cps[i : i + chunksize] for i in range(0, len(cps), chunksize)]
+    _create_shard = partial(
+        SHARD_ENGINES[engine], year=year - 1, ctam_benefits=ctam_benefits
+    )
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_create_shard, shards)
+            tax_units = list(tqdm(results, total=len(shards)))
+    else:
+        tax_units = [_create_shard(shard) for shard in tqdm(shards)]
     # create a DataFrame of tax units with the new
-    tax_units_df = pd.DataFrame(tax_units)
+    tax_units_df = pd.concat(tax_units, ignore_index=True, sort=False)
 
     return tax_units_df
+
+
+def iter_units(cps_chunks, year: int, engine: str = "record"):
+    """
+    Create the tax units for each chunk of households as it arrives and yield
+    them as a DataFrame. Combined, the chunks match the output of `pycps`
+    Parameters
+    ----------
+    cps_chunks: iterable of households in chunks, such as the output of
+                `cpsmar.iter_cps`
+    year: year of the CPS
+    engine: "record" or "vectorized". See `pycps`
+    """
+    if engine not in SHARD_ENGINES:
+        msg = f"engine must be 'record' or 'vectorized', not '{engine}'"
+        raise ValueError(msg)
+    ctam_benefits = year in C_TAM_YEARS
+    for cps in cps_chunks:
+        yield SHARD_ENGINES[engine](cps, year - 1, ctam_benefits)
@@ -3,13 +3,15 @@ Split up certain income variables
 """
 
 import numpy as np
+from ..rng import generator
 
 
-def split_income(data):
+def split_income(data, chunk=0):
     """
-    Split up income variables
+    Split up income variables. `chunk` is the index of the chunk of records
+    in `data` and selects the random numbers used
     """
-    np.random.seed(79)
+    rng = generator("split_income", chunk=chunk)
 
     # Qualified dividends
     ALL_QUALIFIED_PROB = 0.429  # % of units where all dividends are qualified
@@ -19,7 +21,7 @@ def split_income(data):
     QUALIFIED_FRAC = 0.678  # % of dividends that are qualified among remaining
 
     # determine qualified dividend percentage
-    probs = np.random.random(len(data["divs"]))
+    probs = rng.random(len(data["divs"]))
     qualified = np.ones(len(data["divs"]))
     qualified = np.where(
         (probs > ALL_QUALIFIED_PROB) & (probs <= NON_AVG_PROB), 0.0, qualified
@@ -31,14 +33,14 @@ def split_income(data):
     SLOPE = 0.068
     RATIO = 0.46
     prob = 1.0 - SLOPE * (data["interest"] * 1e-3)
-    uniform_rn = np.random.random(len(prob))
+    uniform_rn = rng.random(len(prob))
     data["e00300"] = np.where(
         uniform_rn < prob, data["interest"], data["interest"] * RATIO
     )
     data["e00400"] = data["interest"] - data["e00300"]
 
     # Pensions and annuities
-    probs = np.random.random(len(data["e01500"]))
+    probs = rng.random(len(data["e01500"]))
     FULL_TAXABLE_PROB = 0.612
     ZERO_TAX_PROB = 0.073
     NON_AVG_PROB = FULL_TAXABLE_PROB + ZERO_TAX_PROB
@@ -7,11 +7,22 @@ import numpy as np
 from .constants import FIPS_DICT
 
 
-def target(cps, state_data_link):
+def target(cps, state_data_path, factors_path=None):
     """
     Read state level income information and adjust CPS data accordingly
+
+    Parameters
+    ----------
+    cps: DataFrame with the CPS tax units
+    state_data_path: path-like object to the IRS state level data
+    factors_path: if given, the factors for each state are saved to this
+                  CSV file
+
+    Returns
+    -------
+    cps with the targeted income variables
     """
-    state_data = pd.read_csv(state_data_link, index_col="STATE", thousands=",")
+    state_data = pd.read_csv(state_data_path, index_col="STATE", thousands=",")
     # only use aggregate data
     state_data = state_data[state_data["AGI_STUB"] == 0].copy()
 
@@ -31,33 +42,43 @@ def target(cps, state_data_link):
         "A07180": ["CDC"],
     }
 
-    # dictionary to hold factors
-    factor_dict = {}
-
-    # loop through each state and variable
-    for var, cps_vars in VAR_MAP.items():
-        factor_dict[var] = []
-        for state, fips in FIPS_DICT.items():
-            sub_cps = cps[cps["fips"] == fips]
-            target = state_data[var][state] * 1000  # scale up IRS data
-            # only count filers
-            cps_uw_total = sub_cps[cps_vars].sum(axis=1) * sub_cps["filer"]
-            cps_sum = (cps_uw_total * sub_cps["s006"]).sum()
-            # compute factor
-            factor = target / cps_sum
-            factor_dict[var].append(factor)
+    # weighted total of each variable in every state. Only count filers
+    filer = cps["filer"].to_numpy()
+    s006 = cps["s006"].to_numpy()
+    weighted = pd.DataFrame(
+        {
+            var: np.nansum(cps[cps_vars].to_numpy(dtype=np.float64), axis=1)
+            * filer
+            * s006
+            for var, cps_vars in VAR_MAP.items()
+        }
+    )
+    cps_sums = (
+        weighted.groupby(cps["fips"].to_numpy())
+        .sum()
+        .reindex(FIPS_DICT.values(), fill_value=0.0)
+    )
+    # scale up IRS data
+    targets = state_data.loc[list(FIPS_DICT), list(VAR_MAP)] * 1000
 
     # create a DataFrame with the factors
-    factor_df = pd.DataFrame(factor_dict)
-    factor_df.index = FIPS_DICT.values()
-    # export factors
-    factor_df.to_csv("state_factors.csv")
+    factor_df = pd.DataFrame(
+        targets.to_numpy() / cps_sums.to_numpy(),
+        index=FIPS_DICT.values(),
+        columns=list(VAR_MAP),
+    )
+    if factors_path is not None:
+        factor_df.to_csv(factors_path)
 
     # apply factors
-    for var, cps_vars in VAR_MAP.items():
-        factor_array = factor_df[var][cps["fips"]].values
+    idx = factor_df.index.get_indexer(cps["fips"])
+    if (idx == -1).any():
+        missing = sorted(set(cps["fips"][idx == -1]))
+        raise KeyError(f"No state level data for FIPS codes {missing}")
+    factors = factor_df.to_numpy().take(idx, axis=0)
+    for j, cps_vars in enumerate(VAR_MAP.values()):
         for v in cps_vars:
-            cps[v] *= factor_array
+            cps[v] *= factors[:, j]
 
     # recalculate total income
     cps["e00200"] = cps["e00200p"] + cps["e00200s"]
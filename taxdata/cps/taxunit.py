@@ -1,3 +1,5 @@
+import numpy as np
+from operator import attrgetter
 from .helpers import (
     filingparams,
     cps_yr_idx,
@@ -18,8 +20,87 @@ INCOME_TUPLES = [
     ("UI_impute", "e02300"),
 ]
 
+# benefit variables that are only added for the head of the unit
+HEAD_BENEFITS = ["snap_ben", "housing_ben"]
+# all other tax unit attributes, in the order they appear in the output
+UNIT_VARS = [
+    "agi",
+    "age_head",
+    "age_spouse",
+    "blind_head",
+    "fips",
+    "h_seq",
+    "a_lineno",
+    "ffpos",
+    "s006",
+    "FLPDYR",
+    "EIC",
+    "dep_stat",
+    "mars",
+    "XTOT",
+    "hh_inc",
+    "filer",
+    "nu18",
+    "n1820",
+    "n21",
+    "nu06",
+    "nu13",
+    "n24",
+    "elderly_dependents",
+    "f2441",
+    "home_owner",
+    "prop_tax",
+    "statetax",
+    "prop_value",
+    "mortgage_yn",
+    "deps_spouses",
+    "depne",
+    "blind_spouse",
+    "fam_size",
+]
+
+
+def income_vars(ctam_benefits: bool) -> list:
+    """
+    Return a list of the CPS variable used for each income item and the names
+    of the unit total, head, and spouse attributes it's stored in
+    """
+    _income_vars = []
+    for cps_var, tc_var in INCOME_TUPLES:
+        if cps_var == "ss_impute" and not ctam_benefits:
+            cps_var = "ss_val"
+        elif cps_var == "UI_impute" and not ctam_benefits:
+            cps_var = "uc_val"
+        _income_vars.append((cps_var, tc_var, f"{tc_var}p", f"{tc_var}s"))
+    return _income_vars
+
+
+def unit_columns(benefit_tuples: list) -> list:
+    """
+    Return a list of the tax unit attributes included in the final file
+    """
+    columns = ["BENEFIT_TUPLES", "ctam_benefits"]
+    columns += ["mcare_count", "mcaid_count", "tot_inc"]
+    for _, tc_var, tc_var_p, tc_var_s in income_vars(True):
+        columns += [tc_var, tc_var_p, tc_var_s]
+    for _, tc_var in benefit_tuples:
+        if tc_var not in columns:
+            columns.append(tc_var)
+    return columns + HEAD_BENEFITS + UNIT_VARS
+
+
+INCOME_VARS = {True: income_vars(True), False: income_vars(False)}
+COLUMNS = {
+    True: unit_columns(C_TAM_BENEFIT_TUPLES),
+    False: unit_columns(CPS_BENEFIT_TUPLES),
+}
+GET_COLUMNS = {key: attrgetter(*columns) for key, columns in COLUMNS.items()}
+
 
 class TaxUnit:
+    # use a fixed set of attributes rather than a __dict__ for each unit
+    __slots__ = list(dict.fromkeys(COLUMNS[True] + COLUMNS[False]))
+
     def __init__(
         self,
         data: dict,
@@ -46,16 +127,11 @@ class TaxUnit:
         self.mcaid_count = 0
         # add attributes of the tax unit
         self.tot_inc = 0
-        for cps_var, tc_var in INCOME_TUPLES:
-            if cps_var == "ss_impute" and not ctam_benefits:
-                val = data["ss_val"]
-            elif cps_var == "UI_impute" and not ctam_benefits:
-                val = data["uc_val"]
-            else:
-                val = data[cps_var]
+        for cps_var, tc_var, tc_var_p, tc_var_s in INCOME_VARS[ctam_benefits]:
+            val = data[cps_var]
             setattr(self, tc_var, val)
-            setattr(self, f"{tc_var}p", val)
-            setattr(self, f"{tc_var}s", 0)
+            setattr(self, tc_var_p, val)
+            setattr(self, tc_var_s, 0)
             self.tot_inc += val
         # add benefit data
         for cps_var, tc_var in self.BENEFIT_TUPLES:
@@ -75,6 +151,7 @@ class TaxUnit:
 
         self.age_head = data["a_age"]
         self.age_spouse = 0
+        self.blind_spouse = np.nan
         self.blind_head = data["pediseye"]
         self.fips = data["gestfips"]
         self.h_seq = data["hhid"]
@@ -138,16 +215,11 @@ class TaxUnit:
         """
         Add a spouse to the unit
         """
-        for cps_var, tc_var in INCOME_TUPLES:
-            if cps_var == "ss_impute" and not self.ctam_benefits:
-                val = spouse["ss_val"]
-            elif cps_var == "UI_impute" and not self.ctam_benefits:
-                val = spouse["uc_val"]
-            else:
-                val = spouse[cps_var]
+        for cps_var, tc_var, _, tc_var_s in INCOME_VARS[self.ctam_benefits]:
+            val = spouse[cps_var]
             self.tot_inc += val
             setattr(self, tc_var, getattr(self, tc_var) + val)
-            setattr(self, f"{tc_var}s", val)
+            setattr(self, tc_var_s, val)
         for cps_var, tc_var in self.BENEFIT_TUPLES:
             if tc_var == "mcaid_ben" and spouse[cps_var] != 0:
                 self.mcaid_count += 1
@@ -155,9 +227,9 @@ class TaxUnit:
                 self.mcare_count += 1
             setattr(self, tc_var, getattr(self, tc_var) + spouse[cps_var])
         self.agi += spouse["agi"]
-        setattr(self, "blind_spouse", spouse["pediseye"])
+        self.blind_spouse = spouse["pediseye"]
         self.deps_spouses.append(spouse["a_lineno"])
-        setattr(self, "age_spouse", spouse["a_age"])
+        self.age_spouse = spouse["a_age"]
         spouse["s_flag"] = True
         self.check_age(spouse["a_age"])
         self.statetax += spouse["statetax_ac"]
@@ -231,24 +303,36 @@ class TaxUnit:
             if age >= filingparams.elderly_age[cps_yr_idx]:
                 self.elderly_dependents += 1
 
-    def output(self) -> dict:
+    def record(self) -> tuple:
         """
-        Return tax attributes as a dictionary
+        Return tax attributes as a tuple in the order of
+        `COLUMNS[self.ctam_benefits]`. blind_spouse is NaN for units without
+        a spouse
         """
         # enforce that all spouse income variables are zero for non-married
         if self.mars != 2:
-            for _, tc_var in INCOME_TUPLES:
-                value = getattr(self, f"{tc_var}s")
-                msg = f"{tc_var}s is not zero for household {self.h_seq}"
+            for _, tc_var, _, tc_var_s in INCOME_VARS[self.ctam_benefits]:
+                value = getattr(self, tc_var_s)
+                msg = f"{tc_var_s} is not zero for household {self.h_seq}"
                 assert value == 0, msg
         # add family size variable
         fam_size = 1 + self.depne
         if self.mars == 2:
             fam_size += 1
-        setattr(self, "fam_size", fam_size)
+        self.fam_size = fam_size
         m = f"{self.XTOT} != {sum([self.nu18, self.n1820, self.n21])}"
         assert self.XTOT >= sum([self.nu18, self.n1820, self.n21]), m
-        return self.__dict__
+        return GET_COLUMNS[self.ctam_benefits](self)
+
+    def output(self) -> dict:
+        """
+        Return tax attributes as a dictionary
+        """
+        output = dict(zip(COLUMNS[self.ctam_benefits], self.record()))
+        # blind_spouse is only included for units with a spouse
+        if np.isnan(self.blind_spouse):
+            del output["blind_spouse"]
+        return output
 
     # private methods
     def _must_file(self):
@@ -280,6 +364,6 @@ class TaxUnit:
             raise ValueError(msg)
         income_min = filingparams.gross_inc_thd[cps_yr_idx][midx][aidx]
         if self.tot_inc >= income_min:
-            setattr(self, "filer", 1)
+            self.filer = 1
         else:
-            setattr(self, "filer", 0)
+            self.filer = 0
@@ -3,11 +3,18 @@ Scripts to convert the SAS scripts used to process the .DAT format CPS file
 to Python
 """
 
+import hashlib
+import json
 import pickle
 from pathlib import Path
 from .cps_meta import CPS_META_DATA
 
 CUR_PATH = Path(__file__).resolve().parent
+# version of the plans made by `compile_plan`. Saved plans with a different
+# version are recompiled
+PLAN_VERSION = 2
+# fields wider than this overflow an int64
+MAX_INT_WIDTH = 18
 
 
 def find_section(sas):
@@ -60,6 +67,116 @@ def parse_sas(sas):
     return lines
 
 
+def compile_plan(parse_dict):
+    """
+    Compile the parsing dictionary for one record type into a plan that the
+    CPS parser can use to decode every variable of the same width at once
+    Parameters
+    ----------
+    parse_dict: dictionary with the (start, end, decimals) of each variable
+    Returns
+    -------
+    Dictionary with the variable names, in their original order, and a list
+    of groups, one for each variable width and dtype, holding the dtype the
+    variables are decoded into, the position of each variable in the list
+    of names, where it starts in the record, and the factor it's scaled by
+    """
+    names = list(parse_dict.keys())
+    groups = {}
+    for idx, var in enumerate(names):
+        start, end, decimals = parse_dict[var]
+        width = end - start
+        dtype = field_dtype(width, decimals)
+        group = groups.setdefault(
+            (width, dtype),
+            {
+                "width": width,
+                "dtype": dtype,
+                "columns": [],
+                "starts": [],
+                "scale": [],
+            },
+        )
+        group["columns"].append(idx)
+        group["starts"].append(start)
+        group["scale"].append(10**decimals)
+    return {"names": names, "groups": [groups[k] for k in sorted(groups)]}
+
+
+def field_dtype(width, decimals):
+    """
+    dtype a field is decoded into. Fields too wide for an int64 are kept as
+    Python integers and fields with decimals are floats
+    """
+    if width > MAX_INT_WIDTH:
+        return "object"
+    if decimals:
+        return "float64"
+    return "int64"
+
+
+def compile_year(year_dict):
+    """
+    Compile the parse plans for each record type in one year of the CPS
+    """
+    return {
+        rec_type: compile_plan(parse_dict)
+        for rec_type, parse_dict in year_dict.items()
+    }
+
+
+def compile_plans(master_dict):
+    """
+    Compile the parse plans for every year in `master_dict`
+    """
+    return {
+        year: compile_year(year_dict)
+        for year, year_dict in master_dict.items()
+    }
+
+
+def write_plans(master_dict):
+    """
+    Save the parse plans for `master_dict` to master_cps_plans.pkl along with
+    a hash of the parsing dictionaries they were compiled from
+    """
+    plans = {
+        "version": PLAN_VERSION,
+        "source_hash": dict_hash(master_dict),
+        "plans": compile_plans(master_dict),
+    }
+    with Path(CUR_PATH, "master_cps_plans.pkl").open("wb") as f:
+        pickle.dump(plans, f)
+
+
+def load_plans(master_dict):
+    """
+    Load the parse plans saved alongside master_cps_dict.pkl, recompiling them
+    if they're missing, out of date, or were compiled from different parsing
+    dictionaries
+    """
+    plan_path = Path(CUR_PATH, "master_cps_plans.pkl")
+    if plan_path.exists():
+        with plan_path.open("rb") as f:
+            plans = pickle.load(f)
+        current = plans.get("version") == PLAN_VERSION
+        if current and plans["source_hash"] == dict_hash(master_dict):
+            return plans["plans"]
+    return compile_plans(master_dict)
+
+
+def dict_hash(master_dict):
+    """
+    SHA-256 hash of the parsing dictionaries
+    """
+    # JSON keys must be strings so the years are converted first
+    master_str = json.dumps(
+        {str(year): year_dict for year, year_dict in master_dict.items()},
+        sort_keys=True,
+    )
+    return hashlib.sha256(master_str.encode()).hexdigest()
+
+
 def main():
     master_dict = {}
     for year in CPS_META_DATA.keys():
@@ -84,6 +201,7 @@ def main():
 
     with Path(CUR_PATH, "master_cps_dict.pkl").open("wb") as f:
         pickle.dump(master_dict, f)
+    write_plans(master_dict)
 
 
 if __name__ == "__main__":
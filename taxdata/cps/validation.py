@@ -1,5 +1,5 @@
-import collections
 import numpy as np
+import pandas as pd
 from pathlib import Path
 from .helpers import filingparams, cps_yr_idx
 
@@ -25,76 +25,105 @@ BENEFIT_TUPLES = [
     ("wic_impute", "wic_ben"),
     ("ss_impute", "e02400"),
 ]
-output_str = "var, year, h_seq, pycps, cps\n"
+# everyone should have been counted somewhere so these totals are expected
+# to be equal
+AGE_VARS = ["n21", "n1820", "nu18"]
+REPORT_COLS = ["var", "year", "h_seq", "pycps", "cps", "error"]
 
 
-def compare(data, cps, h_seq, year):
-    def record_error(var, h_seq, pycps, cps, year):
-        """
-        Append an error
-        """
-        global output_str
-        err_str = f"{var},{year},{h_seq},{pycps},{cps}\n"
-        output_str += err_str
+def household_totals(people):
+    """
+    Total number of people in each age group and the sum of each income and
+    benefit variable in every household of the CPS
 
-    num_errors = 0
+    Parameters
+    ----------
+    people: DataFrame with a row for every person in the CPS
+    """
+    age = people["a_age"]
+    counts = pd.DataFrame(
+        {
+            "h_seq": people["h_seq"],
+            "n21": age >= 21,
+            "n1820": (age >= 18) & (age <= 20),
+            "nu18": age < 18,
+            "elderly_dependents": (
+                age >= filingparams.elderly_age[cps_yr_idx]
+            ),
+        }
+    ).astype(int)
+    totals = counts.groupby("h_seq").sum()
+    cps_vars = [
+        _cps
+        for _cps, _ in INCOME_TUPLES + BENEFIT_TUPLES
+        if _cps in people.columns
+    ]
+    sums = people.groupby("h_seq")[cps_vars].sum()
+    return pd.concat([totals, sums], axis=1)
 
-    # compare age variables. everyone should have
-    # been counted somewhere so these totals
-    # are expected to be equal
-    age_totals = collections.defaultdict(int)
-    for person in cps:
-        if person["a_age"] >= 21:
-            age_totals["n21"] += 1
-        elif 18 <= person["a_age"] <= 20:
-            age_totals["n1820"] += 1
-        elif person["a_age"] < 18:
-            age_totals["nu18"] += 1
-        if person["a_age"] >= filingparams.elderly_age[cps_yr_idx]:
-            age_totals["elderly_dependents"] += 1
-    n21_data = data["n21"].sum()
-    n21_cps = age_totals["n21"]
-    if n21_cps != n21_data:
-        record_error("n21", h_seq, n21_data, n21_cps, year)
-        num_errors += 1
-    n1820_data = int(data["n1820"].sum())
-    n1820_cps = age_totals["n1820"]
-    if n1820_cps != n1820_data:
-        record_error("n1820", h_seq, n1820_data, n1820_cps, year)
-        num_errors += 1
-    nu18_data = data["nu18"].sum()
-    nu18_cps = age_totals["nu18"]
-    if nu18_cps != nu18_data:
-        record_error("nu18", h_seq, nu18_data, nu18_cps, year)
-        num_errors += 1
-    elderly_deps_data = data["elderly_dependents"].sum()
-    elderly_deps_cps = age_totals["elderly_dependents"]
-    # number elderly dependents should never be higher than the number of
-    # elderly people in the household
-    if elderly_deps_data > elderly_deps_cps:
-        record_error(
-            "elderly_dependents",
-            h_seq,
-            elderly_deps_data,
-            elderly_deps_cps,
-            year,
+
+def compare(people, units, year):
+    """
+    Compare the household totals in the CPS with the totals across each
+    household's tax units
+
+    Parameters
+    ----------
+    people: DataFrame with a row for every person in the CPS
+    units: tax units created from `people`
+    year: year of the CPS
+
+    Returns
+    -------
+    DataFrame with a row for each difference found. Differences in the
+    number of people or elderly dependents are marked as errors. Income and
+    benefits are only reported if the totals differ by more than 50 percent
+    """
+    cps = household_totals(people)
+    # benefit variables are only in the CPS when C-TAM imputations are used
+    var_pairs = [
+        (_cps, _tc)
+        for _cps, _tc in INCOME_TUPLES + BENEFIT_TUPLES
+        if _cps in cps.columns
+    ]
+    tc_vars = AGE_VARS + ["elderly_dependents"]
+    tc_vars += [_tc for _, _tc in var_pairs]
+    tc_vars = list(dict.fromkeys(tc_vars))
+    pycps = units.groupby("h_seq")[tc_vars].sum()
+    # households without any tax units
+    pycps = pycps.reindex(cps.index, fill_value=0)
+
+    reports = []
+
+    def report(var, pycps_vals, cps_vals, mask, error):
+        reports.append(
+            pd.DataFrame(
+                {
+                    "var": var,
+                    "year": year,
+                    "h_seq": cps.index[mask],
+                    "pycps": pycps_vals[mask],
+                    "cps": cps_vals[mask],
+                    "error": error,
+                }
+            )
         )
-        num_errors += 1
 
-    for _cps, _tc in INCOME_TUPLES:
-        cps_sum = sum([p[_cps] for p in cps])
-        tc_sum = data[_tc].sum()
-        allclose = np.allclose([cps_sum], [tc_sum], rtol=0.5)
-        if not allclose:
-            record_error(cps, h_seq, tc_sum, cps_sum, year)
+    for var in AGE_VARS:
+        pycps_vals = pycps[var].to_numpy()
+        cps_vals = cps[var].to_numpy()
+        report(var, pycps_vals, cps_vals, pycps_vals != cps_vals, True)
+    # number elderly dependents should never be higher than the number of
+    # elderly people in the household
+    var = "elderly_dependents"
+    pycps_vals = pycps[var].to_numpy()
+    cps_vals = cps[var].to_numpy()
+    report(var, pycps_vals, cps_vals, pycps_vals > cps_vals, True)
 
-    for _cps, _tc in BENEFIT_TUPLES:
-        cps_sum = sum([p[_cps] for p in cps])
-        tc_sum = data[_tc].sum()
-        if not np.allclose(cps_sum, tc_sum, rtol=0.5):
-            record_error(cps, h_seq, tc_sum, cps_sum, year)
+    for _cps, _tc in var_pairs:
+        pycps_vals = pycps[_tc].to_numpy(dtype=float)
+        cps_vals = cps[_cps].to_numpy(dtype=float)
+        close = np.isclose(cps_vals, pycps_vals, rtol=0.5)
+        report(_cps, pycps_vals, cps_vals, ~close, False)
 
-    if num_errors > 0:
-        return 1
-    else:
-        return 0
+    return pd.concat(reports, ignore_index=True)[REPORT_COLS]
@@ -0,0 +1,261 @@
+"""
+Read and write the large files made by taxdata.
+
+Each CSV file is also saved as a compressed Parquet file with compact
+dtypes. Variables described in tests/records_metadata.json and any other
+integer variables, like the weights, use the smallest integer type that
+holds them, and floats are saved as float32 when that doesn't change any
+values. The Parquet file records the hash of the CSV file written with it,
+and `read_data` only uses it while that CSV file is unchanged. It also
+records the dtype of each column before it was compacted, so, unless asked
+for the compact dtypes, `read_data` returns the same frame pandas.read_csv
+gives for the CSV file.
+"""
+
+import json
+import subprocess
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from .hashing import file_hash
+
+CUR_PATH = Path(__file__).resolve().parent
+METADATA_PATH = Path(CUR_PATH, "..", "tests", "records_metadata.json")
+INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+# records_metadata.json uses this bound for variables with no limit
+OPEN_BOUND = 9e99
+SMALL_INTS = [np.dtype(np.int8), np.dtype(np.int16)]
+
+
+def read_metadata(path=METADATA_PATH):
+    with Path(path).open("r") as f:
+        return json.load(f)
+
+
+def parquet_path(csv_path):
+    """
+    Path to the Parquet version of `csv_path`
+    """
+    csv_path = Path(csv_path)
+    name = csv_path.name.removesuffix(".gz").removesuffix(".csv")
+    return csv_path.with_name(f"{name}.parquet")
+
+
+def is_open(meta):
+    """
+    True if the metadata doesn't limit the variable's values
+    """
+    bounds = meta["range"]["min"], meta["range"]["max"]
+    return max(abs(bound) for bound in bounds) >= OPEN_BOUND
+
+
+def compact_dtype(values, meta=None, float32=True):
+    """
+    Smallest dtype that holds every value in `values` without changing it.
+    `meta` is the variable's entry in records_metadata.json, if it has one.
+    If `float32` is False, floats that aren't whole numbers stay float64
+    """
+    if values.dtype == bool or not np.issubdtype(values.dtype, np.number):
+        return values.dtype
+    is_int = np.issubdtype(values.dtype, np.integer)
+    if not is_int and meta is not None and meta["type"] == "int":
+        # integer variables read from a CSV with a decimal point
+        is_int = bool(np.all(np.isfinite(values))) and bool(
+            np.all(np.mod(values, 1) == 0)
+        )
+    if is_int:
+        low, high = 0, 0
+        if len(values):
+            low, high = values.min(), values.max()
+        if meta is not None and not is_open(meta):
+            low = min(low, meta["range"]["min"])
+            high = max(high, meta["range"]["max"])
+        for dtype in INT_TYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+    if not float32:
+        return values.dtype
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(as_float32, values, equal_nan=True):
+        return np.dtype(np.float32)
+    return values.dtype
+
+
+def compact(data, metadata=None):
+    """
+    Copy of `data` with every column converted to its compact dtype
+    """
+    metadata = read_metadata() if metadata is None else metadata
+    dtypes = {
+        col: compact_dtype(data[col].to_numpy(), metadata.get(col))
+        for col in data.columns
+    }
+    return data.astype(dtypes)
+
+
+def apply_schema(data, metadata=None):
+    """
+    Convert the integer variables in `data`, and any variables
+    records_metadata.json lists as integers, to the smallest integer type
+    that holds both their values and their range in the metadata. Integer
+    variables without a limit in the metadata, like incomes, or that aren't
+    in it at all, like agi, use at least int32 so that adding them together
+    can't overflow. Floats are left as float64 so that calculations done
+    with them don't change
+
+    Parameters
+    ----------
+    data: DataFrame with tax units
+    metadata: variable metadata. Defaults to tests/records_metadata.json
+
+    Returns
+    -------
+    DataFrame with the converted variables
+    """
+    metadata = read_metadata() if metadata is None else metadata
+    dtypes = {}
+    for col in data.columns:
+        values = data[col].to_numpy()
+        meta = metadata.get(col)
+        dtype = compact_dtype(values, meta, float32=False)
+        bounded = meta is not None and not is_open(meta)
+        if dtype in SMALL_INTS and not bounded:
+            dtype = np.dtype(np.int32)
+        if dtype != values.dtype:
+            dtypes[col] = dtype
+    return data.astype(dtypes) if dtypes else data
+
+
+def write_data(data, csv_path, parquet=True, metadata=None, **kwargs):
+    """
+    Save `data` as a CSV file and, optionally, as a Parquet file with compact
+    dtypes. CSV files ending in .gz are compressed without a time-stamp so
+    that git only reports a change when their contents change
+
+    Parameters
+    ----------
+    data: DataFrame being saved
+    csv_path: path-like object to the CSV file
+    parquet: if True, also save the Parquet file
+    metadata: variable metadata. Defaults to tests/records_metadata.json
+    kwargs: arguments passed to DataFrame.to_csv
+    """
+    csv_path = Path(csv_path)
+    if csv_path.suffix == ".gz":
+        plain_path = csv_path.with_suffix("")
+        data.to_csv(plain_path, **kwargs)
+        subprocess.check_call(["gzip", "-nf", str(plain_path)])
+    else:
+        data.to_csv(csv_path, **kwargs)
+    if not parquet:
+        return
+    # kind of each column before it's compacted, so that read_data can
+    # return the dtypes pandas.read_csv gives for the CSV file
+    kinds = {str(col): data[col].dtype.kind for col in data.columns}
+    data = compact(data, metadata)
+    # Parquet can't store every object, like tuples, so objects are saved as
+    # the strings written to the CSV file
+    for col in data.select_dtypes(include="object").columns:
+        data[col] = data[col].map(csv_string)
+    table = pa.Table.from_pandas(
+        data, preserve_index=kwargs.get("index", True)
+    )
+    info = {
+        "csv_hash": file_hash(csv_path),
+        "index": kwargs.get("index", True),
+        "kinds": kinds,
+    }
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, b"taxdata": json.dumps(info).encode()}
+    )
+    # most variables have too many distinct values to benefit from
+    # dictionary encoding
+    pq.write_table(
+        table,
+        parquet_path(csv_path),
+        compression="zstd",
+        use_dictionary=False,
+    )
+
+
+def read_data(csv_path, compact_dtypes=False, **kwargs):
+    """
+    Read a file saved with `write_data`. The Parquet version is used if it
+    exists, the CSV file hasn't changed since it was written, and no
+    arguments for pandas.read_csv are given. Unless `compact_dtypes` is
+    True, the result is the same as reading the CSV file with
+    pandas.read_csv: integers are int64, floats are float64, a saved index
+    is a column named "Unnamed: 0" or the index's name, and other objects,
+    like lists, are the strings written to the CSV file
+
+    Parameters
+    ----------
+    csv_path: path-like object to the CSV file
+    compact_dtypes: if True, keep the compact dtypes and the index in the
+                    Parquet file
+    kwargs: arguments passed to pandas.read_csv. The CSV file is always
+            used when they're given
+    """
+    csv_path = Path(csv_path)
+    pq_path = parquet_path(csv_path)
+    if pq_path.exists() and not kwargs:
+        table = pq.read_table(pq_path)
+        info = json.loads(table.schema.metadata[b"taxdata"])
+        current = not csv_path.exists() or (
+            file_hash(csv_path) == info["csv_hash"]
+        )
+        if current and "kinds" in info:
+            data = table.to_pandas()
+            if not compact_dtypes:
+                data = csv_dtypes(data, info["index"], info["kinds"])
+            return data
+    return pd.read_csv(csv_path, **kwargs)
+
+
+def csv_string(value):
+    """
+    String DataFrame.to_csv writes for `value`. Missing values are kept
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return value
+    return str(value)
+
+
+def csv_dtypes(data, index, kinds):
+    """
+    Convert `data`, read from a Parquet file, to the columns and dtypes
+    pandas.read_csv gives for the CSV file saved with it
+
+    Parameters
+    ----------
+    data: DataFrame read from the Parquet file
+    index: True if the index was saved in the CSV file
+    kinds: dtype kind of each column before it was compacted. Floats that
+           were saved as integers are floats in the CSV file
+    """
+    if index:
+        name = data.index.name
+        data = data.reset_index()
+        data = data.rename(
+            columns={data.columns[0]: "Unnamed: 0" if name is None else name}
+        )
+    else:
+        data = data.reset_index(drop=True)
+    dtypes = {}
+    for col in data.columns:
+        dtype = data[col].dtype
+        kind = kinds.get(str(col))
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if kind == "f":
+            dtypes[col] = np.float64
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[col] = np.int64
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[col] = np.float64
+        elif pd.api.types.is_string_dtype(dtype):
+            dtypes[col] = str
+    return data.astype(dtypes)
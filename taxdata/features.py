@@ -0,0 +1,85 @@
+"""
+Regressors derived from the data for the imputations and the statistical
+match.
+
+Rather than adding each derived regressor to the DataFrame being imputed,
+which makes pandas copy and consolidate the DataFrame every time, the
+regressors are computed once into a single array with a column for each of
+them. The array is float32 when that doesn't change any values, and float64
+otherwise. The imputations then read single columns or a matrix of several
+of them from that array, always as float64 so that the calculations done
+with them don't change.
+"""
+
+import numpy as np
+from typing import NamedTuple
+
+
+class FeatureStore(NamedTuple):
+    """
+    names: name of each feature
+    values: array with a row for each record and a column for each feature
+    """
+
+    names: list
+    values: np.ndarray
+
+    def column(self, name):
+        """
+        Values of the feature `name`
+        """
+        return self.values[:, self.names.index(name)].astype(np.float64)
+
+    def matrix(self, names):
+        """
+        Contiguous array with the values of each feature in `names`
+        """
+        idx = [self.names.index(name) for name in names]
+        return np.ascontiguousarray(self.values[:, idx], dtype=np.float64)
+
+    def take(self, rows):
+        """
+        Feature store with only the records in `rows`
+        """
+        return FeatureStore(self.names, np.asfortranarray(self.values[rows]))
+
+    def update(self, name, rows, values):
+        """
+        Replace the values of the feature `name` for the records in `rows`.
+        Raises a ValueError if the store's dtype can't hold them exactly
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not np.array_equal(
+            values.astype(self.values.dtype), values, equal_nan=True
+        ):
+            msg = f"{name} can't be stored as {self.values.dtype}"
+            raise ValueError(msg)
+        self.values[rows, self.names.index(name)] = values
+
+
+def build(features, num_records, dtype=None):
+    """
+    Compute the feature store
+
+    Parameters
+    ----------
+    features: dictionary mapping each feature's name to its values, either
+              an array with a value for each record or a single value used
+              for every record
+    num_records: number of records
+    dtype: dtype of the values in the store. By default, float32 if that
+           holds every value exactly and float64 otherwise
+
+    Returns
+    -------
+    FeatureStore with the features in the order they are in `features`
+    """
+    values = np.empty((num_records, len(features)), order="F")
+    for j, feature in enumerate(features.values()):
+        values[:, j] = np.asarray(feature)
+    if dtype is None:
+        as_float32 = values.astype(np.float32)
+        if np.array_equal(as_float32, values, equal_nan=True):
+            return FeatureStore(list(features), as_float32)
+        dtype = np.float64
+    return FeatureStore(list(features), values.astype(dtype, copy=False))
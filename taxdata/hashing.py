@@ -0,0 +1,154 @@
+"""
+SHA-256 hashes of the files used to build taxdata.
+
+Files are read in fixed size blocks so that they never need to fit in
+memory. Each hash is saved in a small index along with the file's size and
+modification time, and reused until either of them changes, so checking a
+large file that hasn't changed doesn't require reading it again. Entries
+for files that no longer exist are dropped whenever the index is written,
+and the index is only written while holding a lock on a file next to it, so
+any number of threads and processes can hash files at the same time.
+"""
+
+import os
+import json
+import hashlib
+import time
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CUR_PATH = Path(__file__).resolve().parent
+INDEX_PATH = Path(
+    os.environ.get(
+        "TAXDATA_HASH_INDEX", Path(CUR_PATH, "..", "data", "file_hashes.json")
+    )
+)
+BLOCKSIZE = 2**20
+# files modified this recently, in nanoseconds, aren't added to the index
+# because they could change again without changing their modification time
+RECENT = 2 * 10**9
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on the file at `path`, creating it if needed,
+    so that only one process at a time runs the enclosed code
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def sha256(path, blocksize=BLOCKSIZE):
+    """
+    SHA-256 hash of a file, read `blocksize` bytes at a time
+    """
+    sha = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def read_index(index_path):
+    try:
+        return json.loads(Path(index_path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_index(index_path, entries):
+    """
+    Add `entries` to the index and drop the files that no longer exist. The
+    index is replaced in one step so that other processes never read a
+    partly written file
+    """
+    index_path = Path(index_path)
+    try:
+        with file_lock(index_path.with_name(f"{index_path.name}.lock")):
+            index = read_index(index_path)
+            index.update(entries)
+            index = {
+                key: entry
+                for key, entry in index.items()
+                if os.path.exists(key)
+            }
+            with tempfile.NamedTemporaryFile(
+                "w", dir=index_path.parent, delete=False, suffix=".tmp"
+            ) as f:
+                json.dump(index, f)
+            os.replace(f.name, index_path)
+    except OSError:
+        # hashes just won't be reused if the index can't be written
+        pass
+
+
+def file_hashes(paths, workers=1, index_path=None):
+    """
+    SHA-256 hashes of several files
+
+    Parameters
+    ----------
+    paths: list of path-like objects
+    workers: number of files hashed at the same time
+    index_path: index of previously computed hashes. Defaults to INDEX_PATH
+
+    Returns
+    -------
+    dictionary mapping each path, as given, to its hash
+    """
+    index_path = index_path or INDEX_PATH
+    index = read_index(index_path)
+    hashes = {}
+    missing = {}
+    for path in paths:
+        key = str(Path(path).resolve())
+        stat = os.stat(path)
+        entry = index.get(key)
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            hashes[path] = entry[2]
+        else:
+            missing[path] = (key, stat)
+    if not missing:
+        return hashes
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        new_hashes = dict(zip(missing, executor.map(sha256, missing)))
+    hashes.update(new_hashes)
+    now = time.time_ns()
+    entries = {
+        key: [stat.st_size, stat.st_mtime_ns, new_hashes[path]]
+        for path, (key, stat) in missing.items()
+        if now - stat.st_mtime_ns > RECENT
+    }
+    if entries:
+        write_index(index_path, entries)
+    return {path: hashes[path] for path in paths}
+
+
+def file_hash(path, index_path=None):
+    """
+    SHA-256 hash of a single file. See `file_hashes`
+    """
+    return file_hashes([path], index_path=index_path)[path]
@@ -0,0 +1,64 @@
+"""
+Cache for the solutions to the stage 2 linear programs.
+
+Each year's LP is identified by a fingerprint of its inputs: the A1, A2, and
+b arrays, the year, the solver script, which holds the solver options, and
+the Julia Project.toml and Manifest.toml files, which pin the solver
+versions. Solved r and s vectors are saved under that fingerprint, so a
+year is only solved again when one of its inputs changes.
+"""
+
+import hashlib
+import numpy as np
+from pathlib import Path
+
+
+def fingerprint(A1, A2, b, year, solver_path, project_path=None):
+    """
+    SHA-256 hash of everything that determines the solution to one year's LP
+
+    Parameters
+    ----------
+    A1, A2: coefficient matrices for r and s
+    b: targets
+    year: year the LP is solved for. Included because the solver's
+          tolerance can differ by year
+    solver_path: path-like object to the solver script
+    project_path: path-like object to the Julia Project.toml the solver runs
+                  with. It and the Manifest.toml next to it are included
+                  if they exist
+    """
+    sha = hashlib.sha256()
+    for name, array in [("A1", A1), ("A2", A2), ("b", b)]:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        sha.update(f"{name}{array.shape}".encode())
+        sha.update(array.tobytes())
+    sha.update(str(year).encode())
+    sha.update(Path(solver_path).read_bytes())
+    if project_path is not None:
+        project_path = Path(project_path)
+        for path in [project_path, project_path.with_name("Manifest.toml")]:
+            sha.update(path.name.encode())
+            if path.exists():
+                sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+def read_solution(cache_path, key):
+    """
+    Return the cached r and s vectors for `key`, or None if the LP hasn't
+    been solved
+    """
+    path = Path(cache_path, f"{key}.npz")
+    if not path.exists():
+        return None
+    with np.load(path) as array:
+        return array["r"], array["s"]
+
+
+def save_solution(cache_path, key, r, s):
+    """
+    Save the r and s vectors that solve the LP identified by `key`
+    """
+    Path(cache_path).mkdir(parents=True, exist_ok=True)
+    np.savez(Path(cache_path, f"{key}.npz"), r=r, s=s)
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import statsmodels.api as sm
 
@@ -9,24 +10,31 @@ def counts(df, groupby, wt):
     return pd.concat([count, wt["wt"]], axis=1, sort=False)
 
 
-def reg(df, dep_var, indep_vars, wt):
-    if "const" not in indep_vars:
-        indep_vars.append("const")
-    model = sm.WLS(df[dep_var], df[indep_vars], weights=df[wt])
+def reg(y, x, wt):
+    """
+    Coefficients of a weighted regression of `y` on the columns of `x`
+    """
+    model = sm.WLS(y, x, weights=wt)
     results = model.fit()
-    return results.params
+    return np.asarray(results.params)
 
 
-def predict(df, indep_vars):
+def predict(x, params):
     """
-    Assumes that both the independent variables and parameters
-    are in the DataFrame
+    Predicted values for the rows of `x` given the parameters used for each
+    row
     """
-    params = list("param_" + pd.Series(indep_vars))
-    x = df[indep_vars]
-    p = df[params]
-    yhat = x.mul(p.values, axis="index").sum(axis=1)
-    return yhat
+    return (x * params).sum(axis=1)
+
+
+def match_matrix(df, store, match_on):
+    """
+    Array with the `match_on` variables for each record, read from `store`
+    if it's given and from `df` otherwise
+    """
+    if store is not None:
+        return store.matrix(match_on)
+    return df[match_on].to_numpy(dtype=np.float64)
 
 
 def match(
@@ -40,6 +48,8 @@ def match(
     match_on: list,
     groupby: list = None,
     eps=0.001,
+    recipient_features=None,
+    donor_features=None,
 ):
     """
     Function to iterate through both files and match them with their
@@ -56,13 +66,26 @@ def match(
     match_on: list of variables to match on
     groupby: optional list of variables to partition the data on
     eps: tolerance for using up the weights
+    recipient_features: optional FeatureStore with the `match_on` variables
+                        for each record in `recipient`, in the same order.
+                        The variables are read from `recipient` if it's not
+                        given
+    donor_features: optional FeatureStore with the `match_on` variables for
+                    each record in `donor`
 
     Returns
     -------
     A DataFrame containing the new weights for each record and the match IDs
     """
+    if "const" not in match_on:
+        match_on = match_on + ["const"]
+    recipient_x = match_matrix(recipient, recipient_features, match_on)
+    donor_x = match_matrix(donor, donor_features, match_on)
     recipient = recipient.copy()
     donor = donor.copy()
+    # position of each record in the arrays of match variables
+    recipient["_row"] = np.arange(len(recipient))
+    donor["_row"] = np.arange(len(donor))
     donor_list = []  # list to store IDs from donor file
     recipient_list = []  # list to store IDs from recipient
     cwt_list = []  # list to hold the new weights
@@ -93,17 +116,22 @@ def match(
     donor[donor_wt] *= donor["factor"]
 
     # run regression on each cell id
-    gdf = recipient.groupby("cellid", as_index=False)
-    params = gdf.apply(
-        reg, dep_var=predict_var, indep_vars=match_on, wt=recipient_wt
+    params = {}
+    for cid, cell in recipient.groupby("cellid"):
+        params[cid] = reg(
+            cell[predict_var],
+            recipient_x[cell["_row"].to_numpy()],
+            cell[recipient_wt],
+        )
+    donor = donor[donor["cellid"].isin(params)]
+    recipient_x = recipient_x[recipient["_row"].to_numpy()]
+    donor_x = donor_x[donor["_row"].to_numpy()]
+    recipient["yhat"] = predict(
+        recipient_x, np.array([params[cid] for cid in recipient["cellid"]])
+    )
+    donor["yhat"] = predict(
+        donor_x, np.array([params[cid] for cid in donor["cellid"]])
     )
-    params = params.add_prefix("param_")
-    params["cellid"] = params.index + 1
-    donor = pd.merge(donor, params, on="cellid", how="inner")
-    recipient = pd.merge(recipient, params, on="cellid", how="inner")
-
-    donor["yhat"] = predict(donor, match_on)
-    recipient["yhat"] = predict(recipient, match_on)
 
     # loop through each cell ID and find matches
     cell_ids = recipient["cellid"].unique()
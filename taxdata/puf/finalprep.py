@@ -3,6 +3,8 @@ import pandas as pd
 import taxcalc as tc
 from .impute_pencon import impute_pension_contributions
 from .constants import UNUSED_READ_VARS
+from ..datafiles import apply_schema
+from ..rng import generator
 from pathlib import Path
 
 CUR_PATH = Path(__file__).resolve().parent
@@ -78,6 +80,9 @@ def finalprep(data):
     # - Sort columns to ensure every PUF is the same
     data.sort_index(axis=1, inplace=True)
 
+    # - Use the smallest dtypes allowed by records_metadata.json
+    data = apply_schema(data)
+
     return data
 
 
@@ -97,14 +102,14 @@ def age_consistency(data):
     Construct age_head from agerange if available; otherwise use CPS value.
     Construct age_spouse as a normally-distributed agediff from age_head.
     """
-    # set random-number-generator seed so that always get same random numbers
-    np.random.seed(seed=123456789)
+    # use a dedicated generator so that always get same random numbers
+    rng = generator("age_consistency")
     # generate random integers to smooth age distribution in agerange
     shape = data["age_head"].shape
-    agefuzz8 = np.random.randint(0, 9, size=shape)
-    agefuzz9 = np.random.randint(0, 10, size=shape)
-    agefuzz10 = np.random.randint(0, 11, size=shape)
-    agefuzz15 = np.random.randint(0, 16, size=shape)
+    agefuzz8 = rng.integers(0, 9, size=shape)
+    agefuzz9 = rng.integers(0, 10, size=shape)
+    agefuzz10 = rng.integers(0, 11, size=shape)
+    agefuzz15 = rng.integers(0, 16, size=shape)
 
     # assign age_head using agerange midpoint or CPS age if agerange absent
     data["age_head"] = np.where(
@@ -167,7 +172,7 @@ def age_consistency(data):
     # if head is not married, set age_spouse to zero;
     # if head is married but has unknown age, set age_spouse to one;
     # do not specify age_spouse values below 15
-    adiff = np.random.normal(0.0, 4.0, size=shape)
+    adiff = rng.normal(0.0, 4.0, size=shape)
     agediff = np.int_(adiff.round())
     age_sp = data["age_head"] + agediff
     age_spouse = np.where(age_sp < 15, 15, age_sp)
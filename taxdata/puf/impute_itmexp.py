@@ -37,6 +37,8 @@ from __future__ import print_function
 import numpy as np
 import pandas as pd
 import statsmodels.api as sm
+from ..rng import generator
+from .. import features
 
 DUMP0 = False
 DUMP1 = False
@@ -51,28 +53,33 @@ def impute(
     exogenous_vars,
     itemizer_data,
     nonitemizer_data,
+    itemizer_x,
+    nonitemizer_x,
 ):
     """
     Function that estimates imputation equations for ievar with itemizer_data
     using the list of exogenous variables.  The estimated equations are then
     used (along with the two additive factors) to impute amounts for ievar
     for nonitemizers with the imputed nonitemizer amounts being returned.
+    The exogenous variables are read from the feature stores itemizer_x and
+    nonitemizer_x.
     """
     if DUMP1:
         print("****** IMPUTE {} ******".format(ievar))
     # estimate Logit parameters for probability of having a positive amount
     logit_y = (itemizer_data[ievar] > 0).astype(int)
-    logit_x = itemizer_data[exogenous_vars]
+    logit_x = itemizer_x.matrix(exogenous_vars)
+    nonitemizer_exog = nonitemizer_x.matrix(exogenous_vars)
     logit_res = sm.Logit(logit_y, logit_x).fit(disp=0)
-    x_b = logit_res.predict(nonitemizer_data[exogenous_vars], linear=True)
+    x_b = logit_res.predict(nonitemizer_exog, which="linear")
     exp_x_b = np.exp(x_b + logit_prob_af[ievar])
     adj_prob = exp_x_b / (1.0 + exp_x_b)
-    np.random.seed(int(ievar[1:]))
-    urn = np.random.uniform(size=len(x_b))
+    rng = generator("itemized_expenses", ievar)
+    urn = rng.uniform(size=len(x_b))
     positive_imputed = np.where(urn < adj_prob, True, False)
     if DUMP1:
         print(logit_res.summary())
-        print(adj_prob.head())
+        print(adj_prob[:5])
         print(round(positive_imputed.mean(), 4))
         print(len(nonitemizer_data))
     # estimate OLS parameters for the positive amount using a sample of
@@ -81,16 +88,15 @@ def impute(
     # (1) This sample limitation is one part of an ad hoc procedure to deal
     # with the Heckman sample selection problems present in this imputation
     # process.
-    tpi_data = itemizer_data[
-        (itemizer_data[ievar] > 0)
-        & (itemizer_data[ievar] < itemizer_data["stdded"])
-    ]
-    ols_y = np.log(tpi_data[ievar])
-    ols_x = tpi_data[exogenous_vars]
+    in_sample = (itemizer_data[ievar] > 0) & (
+        itemizer_data[ievar] < itemizer_data["stdded"]
+    )
+    ols_y = np.log(itemizer_data[ievar][in_sample])
+    ols_x = logit_x[in_sample.to_numpy()]
     ols_res = sm.OLS(ols_y, ols_x).fit()
     ols_se = np.sqrt(ols_res.scale)
-    error = np.random.normal(loc=0.0, scale=ols_se, size=len(nonitemizer_data))
-    raw_imputed_amt = ols_res.predict(nonitemizer_data[exogenous_vars]) + error
+    error = rng.normal(loc=0.0, scale=ols_se, size=len(nonitemizer_data))
+    raw_imputed_amt = ols_res.predict(nonitemizer_exog) + error
     # (2) Limiting the imputed amount to be no more than the standard
     # deduction is a second part of the ad hoc procedure to deal with the
     # Heckman sample selection problems present in this imputation process.
@@ -196,14 +202,24 @@ def impute_itemized_expenses(alldata):
     data["stdded"] = data.apply(standard_deduction, axis=1)
     data["sum_itmexp"] = data[iev_names].sum(axis=1)
     data["itemizer"] = np.where(data["sum_itmexp"] > data["stdded"], 1, 0)
-    data["constant"] = 1
-    data["MARS2"] = np.where(data["MARS"] == 2, 1, 0)
-    data["MARS3"] = np.where(data["MARS"] == 3, 1, 0)
-    data["MARS4"] = np.where(data["MARS"] == 4, 1, 0)
+    # exogenous variables, including the itemized expenses that are used
+    # once they've been imputed
+    _features = {
+        "constant": 1,
+        "MARS2": np.where(data["MARS"] == 2, 1, 0),
+        "MARS3": np.where(data["MARS"] == 3, 1, 0),
+        "MARS4": np.where(data["MARS"] == 4, 1, 0),
+    }
+    for var in ["XTOT", "e00200", "e00600", "e00900", "e02000"] + iev_names:
+        _features[var] = data[var]
+    store = features.build(_features, len(data))
 
     # separate all the data into data for itemizers and data for nonitemizers
-    itemizer_data = data[data["itemizer"] == 1].copy()
-    nonitemizer_data = data[data["itemizer"] == 0].copy()
+    is_itemizer = (data["itemizer"] == 1).to_numpy()
+    itemizer_data = data[is_itemizer].copy()
+    nonitemizer_data = data[~is_itemizer].copy()
+    itemizer_x = store.take(np.flatnonzero(is_itemizer))
+    nonitemizer_x = store.take(np.flatnonzero(~is_itemizer))
 
     # descriptive statistics for the data variables
     if DUMP0:
@@ -312,10 +328,13 @@ def impute_itemized_expenses(alldata):
                 exogenous_vars,
                 itemizer_data,
                 nonitemizer_data,
+                itemizer_x,
+                nonitemizer_x,
             )
             errmsg += check(iev, nonitemizer_data, target_cnt, target_amt)
-            # add imputed variable to exogenous variable list in order
-            # to better estimate correlation between the imputed variables
+        nonitemizer_x.update(iev, slice(None), nonitemizer_data[iev])
+        # add imputed variable to exogenous variable list in order
+        # to better estimate correlation between the imputed variables
         exogenous_vars.append(iev)
     if errmsg:
         if CALIBRATING:
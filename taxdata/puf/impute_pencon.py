@@ -44,6 +44,7 @@ import sys
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from ..rng import generator
 
 if sys.version_info[0] < 3:
     from StringIO import StringIO
@@ -295,8 +296,8 @@ def impute_pension_contributions(alldata, year):
     del idata_s
     # ... construct variables that never change over the imputation process
     idata["agegrp"] = idata.apply(age_group, axis=1)
-    np.random.seed(111_111)
-    idata["urn"] = np.random.uniform(size=len(idata.index))
+    rng = generator("pension_contributions")
+    idata["urn"] = rng.uniform(size=len(idata.index))
     # ... initialize pension contributions to zero
     idata["pencon"] = np.zeros(len(idata.index), dtype=np.int64)
     if DUMP0:
@@ -0,0 +1,36 @@
+"""
+Random number generators for the stochastic steps used to build taxdata.
+
+Each step draws from its own numpy.random.Generator instead of seeding the
+global NumPy random state. The generators are derived from ROOT_SEED with a
+SeedSequence keyed by the name of the step, any sub-step (like the variable
+being imputed), and the chunk of records being processed. A step's random
+numbers therefore don't depend on which steps ran before it, and steps or
+chunks of records can be run in any order, or in parallel, and still give
+the same results.
+"""
+
+import zlib
+import numpy as np
+
+ROOT_SEED = 5410
+
+
+def generator(*keys, chunk=0, seed=ROOT_SEED):
+    """
+    Random number generator for one step of taxdata
+
+    Parameters
+    ----------
+    keys: names identifying the step, e.g. "cps_imputation", "CGAGIX"
+    chunk: index of the chunk of records the generator is used for
+    seed: root seed all of the generators are derived from
+
+    Returns
+    -------
+    numpy.random.Generator
+    """
+    spawn_key = [zlib.crc32(str(key).encode()) for key in keys] + [chunk]
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=spawn_key)
+    )
@@ -3,12 +3,145 @@ import json
 import pytest
 import pandas as pd
 from pathlib import Path
+from taxdata.datafiles import read_data
+from taxdata.cps.create import PARSE_DICT
+from taxdata.cps.cps_meta import CPS_META_DATA
 
 # TODO: revise the following constants when using new or revised CPS/PUF data
 CPS_START_YEAR = 2014
 PUF_START_YEAR = 2011
 PUF_COUNT = 252868
 LAST_YEAR = 2030
+# households written to the synthetic CPS file. Each household has its
+# household record fields and a list of families, each a list of people
+SYNTHETIC_CPS_YEAR = 2016
+# the same households are also written for these years to test runs with
+# more than one CPS file
+SYNTHETIC_CPS_YEARS = [SYNTHETIC_CPS_YEAR, 2017]
+SYNTHETIC_HOUSEHOLDS = [
+    # married couple filing jointly with two children, a working student who
+    # has to file, and a widowed grandparent who doesn't file
+    {
+        "household": {"gestfips": 6, "h_tenure": 1, "hpres_mort": 1},
+        "families": [
+            [
+                {
+                    "a_age": 45,
+                    "a_maritl": 1,
+                    "a_spouse": 2,
+                    "a_famrel": 1,
+                    "a_exprrp": 1,
+                    "filestat": 1,
+                    "wsal_val": 62000,
+                    "int_val": 300,
+                },
+                {
+                    "a_age": 43,
+                    "a_maritl": 1,
+                    "a_spouse": 1,
+                    "a_famrel": 2,
+                    "a_exprrp": 3,
+                    "filestat": 1,
+                    "wsal_val": 31000,
+                },
+                {
+                    "a_age": 12,
+                    "dep_stat": 1,
+                    "a_parent": 1,
+                    "a_famrel": 3,
+                    "a_exprrp": 5,
+                },
+                {
+                    "a_age": 19,
+                    "a_ftpt": 1,
+                    "dep_stat": 1,
+                    "a_parent": 1,
+                    "a_famrel": 3,
+                    "a_exprrp": 5,
+                    "filestat": 5,
+                    "wsal_val": 9000,
+                },
+                {
+                    "a_age": 72,
+                    "a_maritl": 4,
+                    "a_famrel": 4,
+                    "a_exprrp": 8,
+                    "filestat": 6,
+                    "ss_val": 9500,
+                },
+            ]
+        ],
+    },
+    # single parent filing as head of household
+    {
+        "household": {"gestfips": 36, "h_tenure": 2, "hpres_mort": 2},
+        "families": [
+            [
+                {
+                    "a_age": 31,
+                    "a_maritl": 6,
+                    "a_famrel": 1,
+                    "a_exprrp": 1,
+                    "filestat": 4,
+                    "wsal_val": 27000,
+                },
+                {
+                    "a_age": 4,
+                    "dep_stat": 1,
+                    "a_parent": 1,
+                    "a_famrel": 3,
+                    "a_exprrp": 5,
+                },
+            ]
+        ],
+    },
+    # adult without income who doesn't file and an unrelated family with a
+    # dependent relative
+    {
+        "household": {"gestfips": 48, "h_tenure": 2, "hpres_mort": 2},
+        "families": [
+            [{"a_age": 25, "a_famrel": 1, "a_exprrp": 1, "filestat": 6}],
+            [
+                {
+                    "a_age": 52,
+                    "a_famrel": 1,
+                    "a_exprrp": 12,
+                    "filestat": 5,
+                    "wsal_val": 48000,
+                },
+                {"a_age": 16, "dep_stat": 2, "a_famrel": 3, "a_exprrp": 9},
+            ],
+        ],
+    },
+    # elderly married couple where only one spouse has income
+    {
+        "household": {"gestfips": 12, "h_tenure": 1, "hpres_mort": 2},
+        "families": [
+            [
+                {
+                    "a_age": 68,
+                    "a_maritl": 1,
+                    "a_spouse": 2,
+                    "a_famrel": 1,
+                    "a_exprrp": 1,
+                    "filestat": 3,
+                    "ss_val": 21000,
+                    "int_val": 1200,
+                },
+                {
+                    "a_age": 66,
+                    "a_maritl": 1,
+                    "a_spouse": 1,
+                    "a_famrel": 2,
+                    "a_exprrp": 3,
+                    "filestat": 3,
+                },
+            ]
+        ],
+    },
+]
+# values of the person fields not given in SYNTHETIC_HOUSEHOLDS
+PERSON_DEFAULTS = {"a_maritl": 7, "filestat": 6, "a_ftpt": 0, "pediseye": 2}
 
 
 @pytest.fixture(scope="session")
@@ -41,12 +174,12 @@ def cps_benefit_metadata(test_path):
 
 @pytest.fixture(scope="session")
 def cps(test_path, cps_path):
-    return pd.read_csv(cps_path)
+    return read_data(cps_path)
 
 
 @pytest.fixture(scope="session")
 def cps_count(test_path, cps_path):
-    cps_df = pd.read_csv(cps_path)
+    cps_df = read_data(cps_path)
     return cps_df.shape[0]
 
 
@@ -63,7 +196,7 @@ def puf_path(test_path):
 @pytest.fixture(scope="session")
 def puf(puf_path):
     if os.path.isfile(puf_path):
-        return pd.read_csv(puf_path)
+        return read_data(puf_path)
     else:
         return None
 
@@ -71,7 +204,7 @@ def puf(puf_path):
 @pytest.fixture(scope="session")
 def puf_count(puf_path):
     if os.path.isfile(puf_path):
-        puf_df = pd.read_csv(puf_path)
+        puf_df = read_data(puf_path)
         count = puf_df.shape[0]
         if count != PUF_COUNT:
             msg = "puf.shape[0] = {} not equal to PUF_COUNT = {}"
@@ -94,13 +227,13 @@ def last_year():
 @pytest.fixture(scope="session")
 def cps_weights(test_path):
     cpsw_path = Path(test_path, "..", "cps_stage2", "cps_weights.csv.gz")
-    return pd.read_csv(cpsw_path)
+    return read_data(cpsw_path)
 
 
 @pytest.fixture(scope="session")
 def puf_weights(test_path):
     pufw_path = Path(test_path, "..", "puf_stage2", "puf_weights.csv.gz")
-    return pd.read_csv(pufw_path)
+    return read_data(pufw_path)
 
 
 @pytest.fixture(scope="session")
@@ -114,3 +247,83 @@ def cps_ratios(test_path):
 def puf_ratios(test_path):
     pufr_path = Path(test_path, "..", "puf_stage3", "puf_ratios.csv")
     return pd.read_csv(pufr_path, index_col=0)
+
+
+def write_dat(path, households, parsing_dict):
+    """
+    Write `households` as a fixed-width .DAT file laid out by `parsing_dict`.
+    Fields that aren't given are zero
+    """
+    width = max(
+        end
+        for fields in parsing_dict.values()
+        for _, end, _ in fields.values()
+    )
+
+    def record(rec_type, spec, values):
+        line = bytearray(b"0" * width)
+        line[0] = ord(rec_type)
+        for var, value in values.items():
+            start, end, _ = spec[var]
+            line[start:end] = str(value).rjust(end - start, "0").encode()
+        return line.decode()
+
+    lines = []
+    for h_seq, household in enumerate(households, start=1):
+        lines.append(
+            record(
+                "1",
+                parsing_dict["household"],
+                {"h_seq": h_seq, **household["household"]},
+            )
+        )
+        lineno = 0
+        for ffpos, family in enumerate(household["families"], start=1):
+            lines.append(
+                record(
+                    "2",
+                    parsing_dict["family"],
+                    {"fh_seq": h_seq, "ffpos": ffpos},
+                )
+            )
+            for person in family:
+                lineno += 1
+                income = sum(
+                    person.get(var, 0)
+                    for var in ["wsal_val", "int_val", "ss_val"]
+                )
+                values = {
+                    **PERSON_DEFAULTS,
+                    "ph_seq": h_seq,
+                    "a_lineno": lineno,
+                    "peridnum": 10**20 + h_seq * 100 + lineno,
+                    "ptotval": income,
+                    **person,
+                }
+                lines.append(record("3", parsing_dict["person"], values))
+    Path(path).write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture(scope="session")
+def synthetic_cps_path(tmp_path_factory):
+    """
+    Directory with a small synthetic CPS file for each of
+    SYNTHETIC_CPS_YEARS
+    """
+    data_path = tmp_path_factory.mktemp("cps")
+    for year in SYNTHETIC_CPS_YEARS:
+        dat_file = CPS_META_DATA[year]["dat_file"]
+        write_dat(
+            Path(data_path, dat_file), SYNTHETIC_HOUSEHOLDS, PARSE_DICT[year]
+        )
+    return data_path
+
+
+@pytest.fixture(scope="session")
+def synthetic_cps_year():
+    return SYNTHETIC_CPS_YEAR
+
+
+@pytest.fixture(scope="session")
+def synthetic_cps_years():
+    return SYNTHETIC_CPS_YEARS
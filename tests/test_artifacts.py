@@ -0,0 +1,105 @@
+"""
+Test the local artifact store
+"""
+
+import os
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from taxdata import artifacts, hashing
+from taxdata.hashing import file_hash, file_hashes, read_index
+
+
+@pytest.fixture(autouse=True)
+def index_path(monkeypatch, tmp_path):
+    index_path = tmp_path / "index" / "file_hashes.json"
+    monkeypatch.setattr(hashing, "INDEX_PATH", index_path)
+    return index_path
+
+
+def old_file(path, text):
+    """
+    Write `text` to `path` with a modification time old enough for its hash
+    to be saved in the index
+    """
+    path.write_text(text)
+    os.utime(path, ns=(0, 0))
+    return path
+
+
+@pytest.fixture
+def artifact(monkeypatch, tmp_path):
+    source = tmp_path / "state.csv"
+    source.write_text("STATE,AGI_STUB\nUS,0\n")
+    monkeypatch.setitem(
+        artifacts.ARTIFACTS,
+        "test_artifact",
+        {"url": "https://example.com/state.csv", "sha256": None},
+    )
+    return source
+
+
+def test_offline_resolve(artifact, tmp_path):
+    store = tmp_path / "store"
+    with pytest.raises(FileNotFoundError):
+        artifacts.resolve("test_artifact", store, offline=True)
+    stored = artifacts.add("test_artifact", artifact, store)
+    assert stored.name == file_hash(artifact)
+    path = artifacts.resolve("test_artifact", store, offline=True)
+    assert path.read_text() == artifact.read_text()
+    # a corrupted copy in the store is never served
+    path.write_text("STATE,AGI_STUB\n")
+    with pytest.raises(ValueError):
+        artifacts.resolve("test_artifact", store, offline=True)
+
+
+def test_pinned_hash(artifact, tmp_path):
+    artifacts.ARTIFACTS["test_artifact"]["sha256"] = "0" * 64
+    with pytest.raises(ValueError):
+        artifacts.add("test_artifact", artifact, tmp_path)
+
+
+def test_concurrent_refs(tmp_path):
+    """
+    Check that refs written by several processes at once are all kept
+    """
+    names = [f"artifact{i}" for i in range(16)]
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(
+            executor.map(
+                artifacts.write_ref,
+                [tmp_path] * len(names),
+                names,
+                [str(i) * 64 for i in range(len(names))],
+            )
+        )
+    refs = artifacts.read_refs(tmp_path)
+    assert refs == {name: str(i) * 64 for i, name in enumerate(names)}
+
+
+def test_index_pruned(index_path, tmp_path):
+    """
+    Check that files that no longer exist are dropped from the index
+    """
+    first = old_file(tmp_path / "first.txt", "first")
+    second = old_file(tmp_path / "second.txt", "second")
+    file_hashes([first, second])
+    assert set(read_index(index_path)) == {str(first), str(second)}
+    first.unlink()
+    third = old_file(tmp_path / "third.txt", "third")
+    file_hash(third)
+    assert set(read_index(index_path)) == {str(second), str(third)}
+
+
+def test_concurrent_index(index_path, tmp_path):
+    """
+    Check that hashes saved by several processes at once are all kept
+    """
+    paths = [old_file(tmp_path / f"{i}.txt", str(i)) for i in range(16)]
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        hashes = list(
+            executor.map(file_hash, paths, [index_path] * len(paths))
+        )
+    index = read_index(index_path)
+    assert {key: entry[2] for key, entry in index.items()} == {
+        str(path): _hash for path, _hash in zip(paths, hashes)
+    }
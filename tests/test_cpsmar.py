@@ -0,0 +1,169 @@
+"""
+Test the cached version of the converted CPS.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from taxdata import hashing
+from taxdata.cps import helpers
+from taxdata.cps.create import PARSE_DICT
+from taxdata.cps.cps_meta import CPS_META_DATA
+from taxdata.cps.cpsmar import (
+    CPSHouseholds,
+    cache_metadata,
+    parse,
+    read_cache,
+    read_dat,
+)
+from taxdata.cps.transform_sas import compile_year
+
+YEAR = 2015
+
+
+def test_cache_tracks_ctam_files(tmp_path, monkeypatch):
+    """
+    Check that the cache is out of date once a C-TAM file changes
+    """
+    monkeypatch.setattr(hashing, "INDEX_PATH", Path(tmp_path, "index.json"))
+    ctam_path = Path(tmp_path, "ctam")
+    ctam_path.mkdir()
+    monkeypatch.setattr(helpers, "DATA_PATH", ctam_path)
+    for path in helpers.benefit_files(YEAR, ctam_path):
+        path.write_text("peridnum,value\n1,100\n")
+    dat_file = Path(tmp_path, "cps.dat")
+    dat_file.write_text("1\n")
+    parsing_dict = {"person": {"a_age": [0, 2, 0]}}
+    people = pd.DataFrame({"h_seq": [1, 1], "peridnum": [10**20, 10**20 + 1]})
+    cps = CPSHouseholds(people, np.array([0, 2]))
+    cache_path = Path(tmp_path, f"cpsmar{YEAR}.arrow")
+    cps.to_arrow(
+        cache_path, **cache_metadata(dat_file, parsing_dict, True, YEAR)
+    )
+
+    cached = read_cache(cache_path, dat_file, parsing_dict, True, YEAR)
+    assert cached is not None
+    pd.testing.assert_frame_equal(cached.people, people)
+    # the benefits setting is part of the cache
+    assert read_cache(cache_path, dat_file, parsing_dict, False, YEAR) is None
+
+    ctam_file = helpers.benefit_files(YEAR, ctam_path)[0]
+    ctam_file.write_text("peridnum,value\n1,200\n")
+    assert read_cache(cache_path, dat_file, parsing_dict, True, YEAR) is None
+
+
+def test_read_arrow_matches_people(tmp_path):
+    """
+    Check that households read from the memory mapped cache match the ones
+    they were saved from
+    """
+    people = pd.DataFrame(
+        {
+            "h_seq": [1, 1, 2, 3, 3, 3],
+            "a_age": [40, 38, 70, 30, 5, 2],
+            "peridnum": [10**20 + i for i in range(6)],
+        }
+    )
+    cps = CPSHouseholds(people, np.array([0, 2, 3, 6]))
+    cache_path = Path(tmp_path, "cps.arrow")
+    cps.to_arrow(cache_path, year=YEAR)
+    assert CPSHouseholds.arrow_metadata(cache_path) == {"year": YEAR}
+    cached, metadata = CPSHouseholds.read_arrow(cache_path)
+    assert metadata == {"year": YEAR}
+    assert len(cached) == len(cps)
+    assert cached[-1] == cps[-1]
+    assert list(cached[1:3]) == list(cps[1:3])
+    assert list(cached) == list(cps)
+    pd.testing.assert_frame_equal(cached[1:].people, cps[1:].people)
+    pd.testing.assert_frame_equal(cached.people, people)
+
+
+def parse_line(rec, parse_dict):
+    """
+    Parse one line of the .DAT file the way taxdata did before the records
+    were decoded column-wise
+    """
+    record = {}
+    for var in parse_dict.keys():
+        start, end, decimals = parse_dict[var]
+        value = int(rec[start:end])
+        if decimals != 0:
+            value /= int("1" + ("0" * decimals))
+        record[var] = value
+    return record
+
+
+def test_parse_matches_lines(synthetic_cps_path, synthetic_cps_year):
+    """
+    Check that parsing the synthetic CPS column-wise gives the same values
+    as parsing it one line at a time
+    """
+    year = synthetic_cps_year
+    dat_file = Path(synthetic_cps_path, CPS_META_DATA[year]["dat_file"])
+    records = read_dat(dat_file)
+    plans = compile_year(PARSE_DICT[year])
+    lines = dat_file.read_text().splitlines()
+    rec_types = {"1": "household", "2": "family", "3": "person"}
+    for code, rec_type in rec_types.items():
+        rows = [i for i, line in enumerate(lines) if line[0] == code]
+        expected = pd.DataFrame(
+            [parse_line(lines[i], PARSE_DICT[year][rec_type]) for i in rows]
+        )
+        parsed = parse(records, np.array(rows), plans[rec_type])
+        pd.testing.assert_frame_equal(parsed, expected, check_dtype=False)
+
+
+def test_read_dat_without_newline(tmp_path):
+    """
+    Check that a file with a single record and no newline can be read
+    """
+    dat_file = Path(tmp_path, "cps.dat")
+    dat_file.write_text("3 12-4")
+    records = read_dat(dat_file)
+    assert records.shape == (1, 6)
+    assert bytes(records[0]) == b"3 12-4"
+    dat_file.write_text("3 12\n3 1-4")
+    assert bytes(read_dat(dat_file)[1]) == b"3 1-4"
+
+
+def write_ctam_files(ctam_path, value):
+    """
+    Write C-TAM imputation files for YEAR where person 10**20 receives
+    `value` from every program
+    """
+    peridnum = 10**20
+    for prefix, file_var, _ in helpers.PERSON_BENEFITS:
+        Path(ctam_path, f"{prefix}{YEAR}.csv").write_text(
+            f"peridnum,{file_var}\n{peridnum},{value}\n"
+        )
+    for group in ["children", "infants", "women"]:
+        Path(
+            ctam_path, f"WIC_imputation_{group}_logreg_{YEAR}.csv"
+        ).write_text(f"peridnum,WIC_impute\n{peridnum},{value}\n")
+    Path(ctam_path, f"SNAP_Imputation_{YEAR}.csv").write_text(
+        f"h_seq,snap_impute\n1,{value}\n"
+    )
+    Path(ctam_path, f"Housing_Imputation_logreg_{YEAR}.csv").write_text(
+        f"fh_seq,ffpos,housing_impute\n1,1,{value}\n"
+    )
+
+
+def test_read_benefits(tmp_path, monkeypatch):
+    """
+    Check that the benefit tables can't be changed through a copy returned
+    by read_benefits and are read again once a C-TAM file changes
+    """
+    monkeypatch.setattr(hashing, "INDEX_PATH", Path(tmp_path, "index.json"))
+    write_ctam_files(tmp_path, 100)
+    tables = helpers.read_benefits(YEAR, tmp_path)
+    assert tables.snap["snap_impute"].tolist() == [100]
+    tables.snap.loc[1, "snap_impute"] = 0
+    tables.person["wic_impute"] = 0
+    tables = helpers.read_benefits(YEAR, tmp_path)
+    assert tables.snap["snap_impute"].tolist() == [100]
+    assert tables.person["wic_impute"].tolist() == [300]
+
+    write_ctam_files(tmp_path, 200)
+    tables = helpers.read_benefits(YEAR, tmp_path)
+    assert tables.snap["snap_impute"].tolist() == [200]
+    assert tables.person["MedicaidX"].tolist() == [200]
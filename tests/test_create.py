@@ -0,0 +1,67 @@
+"""
+Test creating the tax units for one year of the CPS.
+"""
+
+import importlib
+import pytest
+import pandas as pd
+from taxdata.cps.create import create_year, stream_year
+
+# taxdata.cps.create is shadowed by the create function in taxdata.cps
+create_module = importlib.import_module("taxdata.cps.create")
+
+
+@pytest.mark.parametrize("engine", ["record", "vectorized"])
+@pytest.mark.parametrize("chunksize", [1, 3])
+def test_stream_year(
+    synthetic_cps_path, synthetic_cps_year, chunksize, engine
+):
+    """
+    Check that the tax units streamed in chunks of households match the tax
+    units created from the whole file
+    """
+    units = create_year(
+        synthetic_cps_year, synthetic_cps_path, benefits=False, engine=engine
+    )
+    chunks = list(
+        stream_year(
+            synthetic_cps_year,
+            synthetic_cps_path,
+            benefits=False,
+            chunksize=chunksize,
+            engine=engine,
+        )
+    )
+    # the households are split across chunks
+    assert len(chunks) > 1
+    streamed = pd.concat(chunks, ignore_index=True)
+    list_cols = ["BENEFIT_TUPLES", "deps_spouses"]
+    for col in list_cols:
+        assert streamed[col].tolist() == units[col].tolist()
+    pd.testing.assert_frame_equal(
+        streamed.drop(columns=list_cols), units.drop(columns=list_cols)
+    )
+
+
+def test_create_workers(synthetic_cps_path, synthetic_cps_years, monkeypatch):
+    """
+    Check that converting each year in its own process gives the same file
+    as converting the years one after the other
+    """
+    # the synthetic CPS has no income for some of the variables targeted to
+    # state totals, so its state factors aren't defined
+    monkeypatch.setattr(create_module, "resolve", lambda name: None)
+    monkeypatch.setattr(create_module, "target", lambda data, *args: data)
+    kwargs = {
+        "exportraw": False,
+        "benefits": False,
+        "cps_files": synthetic_cps_years,
+    }
+    serial = create_module.create(synthetic_cps_path, **kwargs)
+    parallel = create_module.create(synthetic_cps_path, workers=2, **kwargs)
+    # both years have the same households
+    one_year = create_year(
+        synthetic_cps_years[0], synthetic_cps_path, benefits=False
+    )
+    assert len(serial) == 2 * len(one_year)
+    pd.testing.assert_frame_equal(parallel, serial)
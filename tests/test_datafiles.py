@@ -0,0 +1,74 @@
+"""
+Test reading and writing the files made by taxdata.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+from taxdata.datafiles import apply_schema, parquet_path, read_data, write_data
+
+
+@pytest.mark.parametrize("index", [True, False])
+def test_read_data_matches_csv(tmp_path, index):
+    """
+    Check that read_data gives the same frame as pandas.read_csv when it
+    reads the Parquet file
+    """
+    data = pd.DataFrame(
+        {
+            "XTOT": np.array([1, 3, 2], dtype=np.int8),
+            # an integer variable in records_metadata.json saved as floats
+            "nu18": [1.0, 2.0, 3.0],
+            "e00200": [1000.0, np.nan, 2.5],
+            "s006": np.array([10, 20, 30], dtype=np.int64),
+            "filer": [True, False, True],
+            "deps": [[1, 2], [], [3]],
+            "pairs": [[("ssi_val", "ssi_ben")], [], None],
+            "state": ["AL", "CA", None],
+        },
+        index=[5, 5, 6],
+    )
+    csv_path = Path(tmp_path, "data.csv.gz")
+    write_data(data, csv_path, index=index)
+    assert parquet_path(csv_path).exists()
+    pd.testing.assert_frame_equal(read_data(csv_path), pd.read_csv(csv_path))
+
+
+def test_apply_schema():
+    """
+    Check that apply_schema only narrows integer variables bounded in the
+    metadata below int32
+    """
+    metadata = {
+        "MARS": {"type": "int", "range": {"min": 1, "max": 5}},
+        "nu18": {"type": "int", "range": {"min": 0, "max": 9e99}},
+        "e00200": {"type": "float", "range": {"min": -9e99, "max": 9e99}},
+    }
+    data = pd.DataFrame(
+        {
+            "MARS": [1, 2, 4],
+            "nu18": [0.0, 2.0, 1.0],
+            "agi": [100, -5, 30],
+            "fam_size": [1, 3, 2],
+            "big": [0, 2**40, 1],
+            "e00200": [1000.0, 0.0, 2.5],
+            "s006": [0.5, 1.0, 2.0],
+            "filer": [True, False, True],
+        }
+    )
+    result = apply_schema(data, metadata)
+    expected = {
+        "MARS": np.int8,
+        "nu18": np.int32,
+        "agi": np.int32,
+        "fam_size": np.int32,
+        "big": np.int64,
+        "e00200": np.float64,
+        "s006": np.float64,
+        "filer": np.bool_,
+    }
+    assert result.dtypes.to_dict() == {
+        col: np.dtype(dtype) for col, dtype in expected.items()
+    }
+    pd.testing.assert_frame_equal(result, data, check_dtype=False)
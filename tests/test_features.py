@@ -0,0 +1,35 @@
+"""
+Test the feature store used for the imputations and the statistical match.
+"""
+
+import numpy as np
+import pytest
+from taxdata import features
+
+
+def test_build():
+    store = features.build(
+        {"constant": 1, "flag": np.array([0, 1, 1]), "x": [0.5, 2.0, 3.0]}, 3
+    )
+    assert store.names == ["constant", "flag", "x"]
+    # every value fits in a float32
+    assert store.values.dtype == np.float32
+    assert store.column("x").dtype == np.float64
+    np.testing.assert_array_equal(
+        store.matrix(["x", "constant"]), [[0.5, 1], [2, 1], [3, 1]]
+    )
+    store = features.build({"x": [0.1, 2**30 + 1]}, 2)
+    assert store.values.dtype == np.float64
+    np.testing.assert_array_equal(store.column("x"), [0.1, 2**30 + 1])
+
+
+def test_take_and_update():
+    store = features.build({"a": [1, 2, 3], "b": [4, 5, 6]}, 3)
+    part = store.take([0, 2])
+    np.testing.assert_array_equal(part.column("b"), [4, 6])
+    part.update("a", slice(None), [7, 8])
+    np.testing.assert_array_equal(part.column("a"), [7, 8])
+    # the original store isn't changed
+    np.testing.assert_array_equal(store.column("a"), [1, 2, 3])
+    with pytest.raises(ValueError):
+        part.update("a", 0, 0.1)
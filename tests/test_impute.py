@@ -0,0 +1,83 @@
+"""
+Test the CPS imputations on a small synthetic file.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from taxdata.cps.helpers import filingparams, cps_yr_idx
+from taxdata.cps.impute import imputation, regressors
+
+CPS_DATA_PATH = Path(
+    Path(__file__).resolve().parent, "..", "taxdata", "cps", "data"
+)
+
+
+def synthetic_units():
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame(
+        {
+            "mars": rng.choice([1, 2, 4], n),
+            "XTOT": rng.integers(1, 9, n),
+            "fam_size": rng.integers(1, 9, n),
+            "age_head": rng.integers(18, 90, n),
+            "age_spouse": rng.integers(0, 90, n),
+            "tot_inc": rng.integers(0, 500_000, n),
+            "interest": rng.integers(0, 5000, n),
+            "divs": rng.integers(0, 5000, n),
+            "e01500": rng.integers(0, 20000, n),
+            "e00900": rng.integers(-5000, 50000, n),
+            "rents": rng.integers(-5000, 5000, n),
+            "home_owner": rng.integers(0, 2, n),
+        }
+    )
+
+
+def test_imputation_regressors():
+    """
+    Check the regressors used in the imputations and that agede, which is
+    used in the statistical match, is the only one added to the data
+    """
+    units = synthetic_units()
+    store = regressors(units.copy())
+    np.testing.assert_array_equal(
+        store.column("fam_size"), np.minimum(units["XTOT"], 5)
+    )
+    np.testing.assert_array_equal(
+        store.column("joint_filer"), units["mars"] == 2
+    )
+    np.testing.assert_array_equal(store.column("constant"), 1.0)
+
+    logit_betas = pd.read_csv(
+        Path(CPS_DATA_PATH, "logit_betas.csv"), index_col=0
+    )
+    ols_betas = pd.read_csv(Path(CPS_DATA_PATH, "ols_betas.csv"), index_col=0)
+    data = imputation(units.copy(), logit_betas, ols_betas)
+    assert len(data) == len(units)
+    elderly_age = filingparams.elderly_age[cps_yr_idx]
+    elderly = (units["age_head"] >= elderly_age).astype(int) + (
+        units["age_spouse"] >= elderly_age
+    ).astype(int)
+    np.testing.assert_array_equal(data["agede"], elderly)
+    np.testing.assert_array_equal(store.column("agede"), elderly)
+    added = set(data.columns) - set(units.columns)
+    assert added == {
+        "agede",
+        "CGAGIX",
+        "TIRAD",
+        "ADJIRA",
+        "KEOGH",
+        "SEHEALTH",
+        "SLINT",
+        "CDC",
+        "MEDEX",
+        "CHARITABLE",
+        "MISCITEM",
+        "DPAD",
+        "e19200",
+        "realest",
+    }
+    np.testing.assert_array_equal(data["fam_size"], units["fam_size"])
+    for var in ["CGAGIX", "TIRAD", "CHARITABLE", "DPAD", "e19200"]:
+        assert np.isfinite(data[var]).all()
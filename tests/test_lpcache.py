@@ -0,0 +1,87 @@
+"""
+Test the cache for the solutions to the stage 2 linear programs.
+"""
+
+import numpy as np
+from pathlib import Path
+from taxdata.lpcache import fingerprint, read_solution, save_solution
+
+
+class StubSolver:
+    """
+    Stands in for solver.jl. Records the years it solves
+    """
+
+    def __init__(self):
+        self.solved = []
+
+    def __call__(self, A1, A2, b, year):
+        self.solved.append(year)
+        return A1.sum(axis=1) / b.sum(), A2.sum(axis=1) / b.sum()
+
+
+def solve(lps, solver, cache_path, solver_path, project_path):
+    """
+    Solve each year's LP the way stage2.py does, using cached solutions
+    when they exist
+    """
+    solutions = {}
+    for year, (A1, A2, b) in lps.items():
+        key = fingerprint(A1, A2, b, year, solver_path, project_path)
+        solution = read_solution(cache_path, key)
+        if solution is None:
+            solution = solver(A1, A2, b, year)
+            save_solution(cache_path, key, *solution)
+        solutions[year] = solution
+    return solutions
+
+
+def test_cache(tmp_path):
+    """
+    Check that years are only solved again once their inputs, the solver
+    script, or the Julia environment change
+    """
+    cache_path = Path(tmp_path, "lp_cache")
+    solver_path = Path(tmp_path, "solver.jl")
+    solver_path.write_text("tol = 1e-8\n")
+    project_path = Path(tmp_path, "Project.toml")
+    project_path.write_text('[deps]\nJuMP = "4076af6c"\n')
+    manifest_path = Path(tmp_path, "Manifest.toml")
+    manifest_path.write_text('[[deps.JuMP]]\nversion = "1.0.0"\n')
+    rng = np.random.default_rng(0)
+    lps = {
+        year: (rng.random((3, 4)), rng.random((3, 4)), rng.random(4))
+        for year in [2014, 2015]
+    }
+    solver = StubSolver()
+
+    def run():
+        return solve(lps, solver, cache_path, solver_path, project_path)
+
+    # misses, then hits with the same solutions
+    first = run()
+    assert solver.solved == [2014, 2015]
+    second = run()
+    assert solver.solved == [2014, 2015]
+    for year in lps:
+        for expected, cached in zip(first[year], second[year]):
+            np.testing.assert_array_equal(cached, expected)
+
+    # changing one year's targets only invalidates that year
+    A1, A2, b = lps[2015]
+    lps[2015] = (A1, A2, b * 2)
+    run()
+    assert solver.solved == [2014, 2015, 2015]
+
+    # the solver script and the Julia environment invalidate every year
+    for path, text in [
+        (solver_path, "tol = 1e-9\n"),
+        (project_path, '[deps]\nHiGHS = "87dc4568"\n'),
+        (manifest_path, '[[deps.JuMP]]\nversion = "1.1.0"\n'),
+    ]:
+        solver.solved = []
+        path.write_text(text)
+        run()
+        assert solver.solved == [2014, 2015]
+        run()
+        assert solver.solved == [2014, 2015]
@@ -0,0 +1,100 @@
+"""
+Test that the pipeline only runs the stages whose files changed.
+"""
+
+import json
+import pytest
+from pathlib import Path
+import pipeline
+from taxdata import hashing
+
+
+@pytest.fixture
+def graph(tmp_path, monkeypatch):
+    """
+    Two stage pipeline in `tmp_path`. The first stage copies a.txt to
+    b.txt and the second stage combines b.txt with the config files into
+    c.txt. Returns the names of the stages in the order they ran
+    """
+    monkeypatch.setattr(pipeline, "CUR_PATH", tmp_path)
+    monkeypatch.setattr(pipeline, "STATE_PATH", Path(tmp_path, "state.json"))
+    monkeypatch.setattr(pipeline, "STAGES", {})
+    monkeypatch.setattr(pipeline, "TARGETS", {"all": ["first", "second"]})
+    monkeypatch.setattr(hashing, "INDEX_PATH", Path(tmp_path, "index.json"))
+    Path(tmp_path, "a.txt").write_text("a")
+    Path(tmp_path, "second_1.cfg").write_text("1")
+    ran = []
+
+    @pipeline.stage(inputs=["a.txt"], outputs=["b.txt"])
+    def first():
+        ran.append("first")
+        text = Path(tmp_path, "a.txt").read_text()
+        Path(tmp_path, "b.txt").write_text(text.upper())
+
+    @pipeline.stage(inputs=["b.txt", "second_*.cfg"], outputs=["c.txt"])
+    def second():
+        ran.append("second")
+        text = Path(tmp_path, "b.txt").read_text()
+        for path in sorted(tmp_path.glob("second_*.cfg")):
+            text += path.read_text()
+        Path(tmp_path, "c.txt").write_text(text)
+
+    return ran
+
+
+def test_dependencies(graph):
+    deps = pipeline.dependencies(pipeline.STAGES)
+    assert deps == {"first": set(), "second": {"first"}}
+    assert pipeline.required(["second"], deps) == {"first", "second"}
+    assert pipeline.required(["first"], deps) == {"first"}
+
+
+def test_run(graph, tmp_path):
+    # asking for the second stage runs the first stage it depends on
+    pipeline.run(["second"])
+    assert graph == ["first", "second"]
+    assert Path(tmp_path, "c.txt").read_text() == "A1"
+    state = json.loads(pipeline.STATE_PATH.read_text())
+    for _stage in pipeline.STAGES.values():
+        assert pipeline.is_current(_stage, state)
+
+    # nothing changed
+    graph.clear()
+    pipeline.run()
+    assert graph == []
+
+    # a new file matching the second stage's inputs only reruns that stage
+    Path(tmp_path, "second_2.cfg").write_text("2")
+    pipeline.run()
+    assert graph == ["second"]
+    assert Path(tmp_path, "c.txt").read_text() == "A12"
+
+    # changing the first stage's input reruns both stages
+    graph.clear()
+    Path(tmp_path, "a.txt").write_text("b")
+    state = json.loads(pipeline.STATE_PATH.read_text())
+    assert not pipeline.is_current(pipeline.STAGES["first"], state)
+    pipeline.run(["all"])
+    assert graph == ["first", "second"]
+    assert Path(tmp_path, "c.txt").read_text() == "B12"
+
+    # deleting an output reruns the stage that writes it
+    graph.clear()
+    Path(tmp_path, "c.txt").unlink()
+    pipeline.run()
+    assert graph == ["second"]
+
+
+def test_dry_run_and_force(graph):
+    pipeline.run(dry_run=True)
+    assert graph == []
+    assert not pipeline.STATE_PATH.exists()
+    pipeline.run()
+    graph.clear()
+    pipeline.run(force=True)
+    assert graph == ["first", "second"]
+
+
+def test_unknown_target(graph):
+    with pytest.raises(KeyError):
+        pipeline.run(["third"])
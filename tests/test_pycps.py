@@ -0,0 +1,114 @@
+"""
+Test that the vectorized tax unit engine matches the record-by-record engine.
+"""
+
+import pytest
+import pandas as pd
+from pathlib import Path
+from taxdata.cps.create import PARSE_DICT
+from taxdata.cps.cps_meta import CPS_META_DATA, C_TAM_YEARS
+from taxdata.cps.cpsmar import create_cps, read_cache
+from taxdata.cps.pycps import pycps
+
+
+@pytest.fixture(scope="session")
+def cps_data_path(test_path):
+    return Path(test_path, "..", "data")
+
+
+def load_cps(year, data_path):
+    """
+    Load one year of the CPS from its cached file or the original .dat file
+    """
+    benefits = year in C_TAM_YEARS
+    dat_path = Path(data_path, CPS_META_DATA[year]["dat_file"])
+    cache_path = Path(data_path, f"cpsmar{year}.arrow")
+    cps = read_cache(cache_path, dat_path, PARSE_DICT[year], benefits, year)
+    if cps is None:
+        if not dat_path.exists():
+            pytest.skip(f"CPS file for {year} not found")
+        cps = create_cps(
+            dat_path,
+            year=year,
+            parsing_dict=PARSE_DICT[year],
+            benefits=benefits,
+            exportcache=False,
+            exportcsv=False,
+        )
+    return cps
+
+
+@pytest.mark.parametrize("year", sorted(CPS_META_DATA))
+def test_vectorized_engine(year, cps_data_path):
+    """
+    Check that both engines create the same tax units in the same order
+    """
+    cps = load_cps(year, cps_data_path)
+    record = pycps(cps, year, False)
+    vectorized = pycps(cps, year, False, engine="vectorized")
+    assert list(record.columns) == list(vectorized.columns)
+    # columns that hold lists
+    list_cols = ["BENEFIT_TUPLES", "deps_spouses"]
+    for col in list_cols:
+        assert record[col].tolist() == vectorized[col].tolist()
+    pd.testing.assert_frame_equal(
+        record.drop(columns=list_cols),
+        vectorized.drop(columns=list_cols),
+        check_dtype=False,
+    )
+
+
+def test_vectorized_engine_synthetic(synthetic_cps_path, synthetic_cps_year):
+    """
+    Check that both engines create the same tax units from a small synthetic
+    CPS with married couples, dependents, and adults who don't file
+    """
+    year = synthetic_cps_year
+    cps = create_cps(
+        Path(synthetic_cps_path, CPS_META_DATA[year]["dat_file"]),
+        year=year,
+        parsing_dict=PARSE_DICT[year],
+        benefits=False,
+        exportcache=False,
+        exportcsv=False,
+    )
+    record = pycps(cps, year, False)
+    vectorized = pycps(cps, year, False, engine="vectorized")
+    # each household's units, the dependent who files, and the adults who
+    # don't file
+    units = list(zip(record["h_seq"], record["a_lineno"]))
+    assert units == [(1, 1), (1, 5), (1, 4), (2, 1), (3, 1), (3, 2), (4, 1)]
+    assert record["mars"].tolist() == [2, 1, 1, 4, 1, 1, 2]
+    assert record["dep_stat"].tolist() == [0, 0, 1, 0, 0, 0, 0]
+    assert record["filer"].tolist() == [1, 0, 1, 1, 0, 1, 1]
+    list_cols = ["BENEFIT_TUPLES", "deps_spouses"]
+    for col in list_cols:
+        assert record[col].tolist() == vectorized[col].tolist()
+    pd.testing.assert_frame_equal(
+        record.drop(columns=list_cols), vectorized.drop(columns=list_cols)
+    )
+
+
+@pytest.mark.parametrize("engine", ["record", "vectorized"])
+def test_workers(synthetic_cps_path, synthetic_cps_year, engine):
+    """
+    Check that creating the tax units from shards in several processes gives
+    the same tax units as creating them in one
+    """
+    year = synthetic_cps_year
+    cps = create_cps(
+        Path(synthetic_cps_path, CPS_META_DATA[year]["dat_file"]),
+        year=year,
+        parsing_dict=PARSE_DICT[year],
+        benefits=False,
+        exportcache=False,
+        exportcsv=False,
+    )
+    serial = pycps(cps, year, False, engine=engine)
+    parallel = pycps(cps, year, False, workers=2, chunksize=1, engine=engine)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_engine_name():
+    with pytest.raises(ValueError):
+        pycps([], 2016, False, engine="dataframe")
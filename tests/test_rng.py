@@ -0,0 +1,42 @@
+"""
+Test the random number generators used to build taxdata.
+"""
+
+import itertools
+import numpy as np
+from taxdata.rng import generator
+
+SIZE = 10000
+
+
+def test_same_keys():
+    """
+    Check that the same keys, chunk, and seed always give the same draws
+    """
+    for keys, chunk, seed in [
+        (("cps_imputation", "CGAGIX"), 0, 5410),
+        (("finalprep",), 3, 5410),
+        (("cps_imputation", "CGAGIX"), 0, 1),
+    ]:
+        first = generator(*keys, chunk=chunk, seed=seed).random(SIZE)
+        second = generator(*keys, chunk=chunk, seed=seed).random(SIZE)
+        np.testing.assert_array_equal(first, second)
+
+
+def test_independent_streams():
+    """
+    Check that changing the keys, their order, the chunk, or the seed gives
+    a different stream that isn't correlated with the others
+    """
+    streams = [
+        generator("cps_imputation", "CGAGIX").random(SIZE),
+        generator("cps_imputation", "TIRAD").random(SIZE),
+        generator("TIRAD", "cps_imputation").random(SIZE),
+        generator("cps_imputation").random(SIZE),
+        generator("cps_imputation", "CGAGIX", chunk=1).random(SIZE),
+        generator("cps_imputation", "CGAGIX", seed=1).random(SIZE),
+    ]
+    for first, second in itertools.combinations(streams, 2):
+        assert not np.any(first == second)
+        # the correlation of independent streams is about 1 / sqrt(SIZE)
+        assert abs(np.corrcoef(first, second)[0, 1]) < 5 / np.sqrt(SIZE)
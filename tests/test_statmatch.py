@@ -0,0 +1,52 @@
+"""
+Test the statistical match.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from taxdata import features
+
+statmatch = pytest.importorskip("taxdata.matching.statmatch")
+MATCH_ON = ["const", "x1", "x2"]
+
+
+def synthetic_file(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": np.arange(1, n + 1),
+            "wt": rng.uniform(1, 100, n),
+            "const": 1,
+            "x1": rng.normal(size=n),
+            "x2": rng.integers(0, 1000, n),
+            "y": rng.normal(size=n) * 10,
+            "grp": rng.integers(0, 3, n),
+        }
+    )
+
+
+def test_match_features():
+    """
+    Check that matching on variables in feature stores gives the same match
+    as matching on the columns of the files
+    """
+    recipient = synthetic_file(300, 1)
+    donor = synthetic_file(500, 2)
+    args = ["id", "id", "wt", "wt", "y", MATCH_ON, ["grp"]]
+    expected = statmatch.match(recipient, donor, *args)
+    # the recipient's weight is used up
+    total = expected.groupby("recip")["matched_weight"].sum()
+    np.testing.assert_allclose(total.sort_index(), recipient["wt"], atol=0.01)
+
+    def store(data):
+        return features.build({var: data[var] for var in MATCH_ON}, len(data))
+
+    result = statmatch.match(
+        recipient.drop(columns=["x1", "x2"]),
+        donor.drop(columns=["x1", "x2"]),
+        *args,
+        recipient_features=store(recipient),
+        donor_features=store(donor),
+    )
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,126 @@
+"""
+Test targeting the CPS to state level totals.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+from taxdata.cps import targeting
+
+STATES = {"CA": 6, "NY": 36}
+VAR_MAP = {
+    "A00200": ["e00200p", "e00200s"],
+    "A00300": ["e00300"],
+    "A00600": ["divs"],
+    "A00650": ["e00650"],
+    "A00900": ["e00900p", "e00900s"],
+    "A02300": ["e02300"],
+    "A03240": ["DPAD"],
+    "A01400": ["TIRAD"],
+    "A03270": ["SEHEALTH"],
+    "A03210": ["SLINT"],
+    "A07180": ["CDC"],
+}
+OTHER_VARS = [
+    "e00400",
+    "e00800",
+    "e01500",
+    "rents",
+    "e02100p",
+    "e02100s",
+    "e02400",
+    "CGAGIX",
+]
+
+
+@pytest.fixture
+def state_data(tmp_path, monkeypatch):
+    """
+    IRS state data for two states, with a row for an AGI bin that must be
+    ignored
+    """
+    monkeypatch.setattr(targeting, "FIPS_DICT", STATES)
+    rows = []
+    for i, state in enumerate(STATES):
+        for agi_stub in [0, 1]:
+            row = {"STATE": state, "AGI_STUB": agi_stub}
+            for j, var in enumerate(VAR_MAP):
+                row[var] = f"{(i + 1) * (j + 1) * 1000 + agi_stub:,}"
+            rows.append(row)
+    path = Path(tmp_path, "state_data.csv")
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def cps():
+    rng = np.random.default_rng(0)
+    size = 20
+    data = {
+        var: rng.integers(1, 5000, size).astype(float)
+        for cps_vars in VAR_MAP.values()
+        for var in cps_vars + OTHER_VARS
+    }
+    data["fips"] = np.tile(list(STATES.values()), size // 2)
+    data["filer"] = rng.integers(0, 2, size)
+    data["s006"] = rng.uniform(100, 1000, size)
+    return pd.DataFrame(data)
+
+
+def loop_factors(cps, state_data_path):
+    """
+    Factors for each state found with the per-state loop target used to
+    run
+    """
+    state_data = pd.read_csv(state_data_path, index_col="STATE", thousands=",")
+    state_data = state_data[state_data["AGI_STUB"] == 0].copy()
+    factor_dict = {}
+    for var, cps_vars in VAR_MAP.items():
+        factor_dict[var] = []
+        for state, fips in STATES.items():
+            sub_cps = cps[cps["fips"] == fips]
+            target = state_data[var][state] * 1000
+            cps_uw_total = sub_cps[cps_vars].sum(axis=1) * sub_cps["filer"]
+            cps_sum = (cps_uw_total * sub_cps["s006"]).sum()
+            factor_dict[var].append(target / cps_sum)
+    factor_df = pd.DataFrame(factor_dict)
+    factor_df.index = STATES.values()
+    return factor_df
+
+
+def test_target(cps, state_data, tmp_path):
+    """
+    Check that the factors match the ones found with the per-state loop and
+    are applied to each unit's state
+    """
+    expected = loop_factors(cps, state_data)
+    factors_path = Path(tmp_path, "state_factors.csv")
+    result = targeting.target(cps.copy(), state_data, factors_path)
+    factors = pd.read_csv(factors_path, index_col=0)
+    pd.testing.assert_frame_equal(factors, expected, check_exact=False)
+
+    targeted = {}
+    for var, cps_vars in VAR_MAP.items():
+        factor = expected.loc[cps["fips"], var].to_numpy()
+        for cps_var in cps_vars:
+            targeted[cps_var] = cps[cps_var] * factor
+    # qualified dividends can't be more than total dividends
+    targeted["e00650"] = np.minimum(targeted["divs"], targeted["e00650"])
+    for cps_var, values in targeted.items():
+        np.testing.assert_allclose(result[cps_var], values, rtol=1e-12)
+    np.testing.assert_allclose(
+        result["e00200"], result["e00200p"] + result["e00200s"]
+    )
+
+
+def test_target_without_factors_path(cps, state_data, tmp_path):
+    """
+    Check that the factors are only saved when asked for and that units in
+    states without IRS data are an error
+    """
+    targeting.target(cps.copy(), state_data)
+    assert list(tmp_path.glob("*factors*")) == []
+    cps.loc[0, "fips"] = 1
+    with pytest.raises(KeyError):
+        targeting.target(cps, state_data)
@@ -0,0 +1,60 @@
+"""
+Test the checks that every person in the CPS is counted in a tax unit.
+"""
+
+import importlib
+import pytest
+import pandas as pd
+from pathlib import Path
+from taxdata.cps import validation
+from taxdata.cps.create import PARSE_DICT
+from taxdata.cps.cps_meta import CPS_META_DATA
+from taxdata.cps.cpsmar import create_cps
+from taxdata.cps.pycps import pycps
+
+# taxdata.cps.create is shadowed by the create function in taxdata.cps
+create_module = importlib.import_module("taxdata.cps.create")
+
+
+def test_compare(
+    synthetic_cps_path, synthetic_cps_year, tmp_path, monkeypatch
+):
+    """
+    Check that households whose tax units don't add up to their people are
+    reported and saved to errors{year}.csv
+    """
+    year = synthetic_cps_year
+    cps = create_cps(
+        Path(synthetic_cps_path, CPS_META_DATA[year]["dat_file"]),
+        year=year,
+        parsing_dict=PARSE_DICT[year],
+        benefits=False,
+        exportcache=False,
+        exportcsv=False,
+    )
+    units = pycps(cps, year, False)
+    assert validation.compare(cps.people, units, year).empty
+
+    # leave the child in household 3 out of its tax unit and triple the
+    # wages in household 2
+    child = (units["h_seq"] == 3) & (units["nu18"] == 1)
+    units.loc[child, "nu18"] = 0
+    units.loc[units["h_seq"] == 2, "e00200"] *= 3
+    report = validation.compare(cps.people, units, year)
+    expected = pd.DataFrame(
+        {
+            "var": ["nu18", "wsal_val"],
+            "year": year,
+            "h_seq": [3, 2],
+            "pycps": [0.0, 81000.0],
+            "cps": [1.0, 27000.0],
+            "error": [True, False],
+        }
+    )
+    pd.testing.assert_frame_equal(report, expected, check_dtype=False)
+
+    monkeypatch.setattr(create_module, "CUR_PATH", tmp_path)
+    with pytest.raises(RuntimeError):
+        create_module.validate_cps_units(cps, units, year)
+    errors = pd.read_csv(Path(tmp_path, f"errors{year}.csv"))
+    pd.testing.assert_frame_equal(errors, expected, check_dtype=False)